@@ -1,6 +1,6 @@
 # analyzer/admin.py
 from django.contrib import admin
-from .models import Dataset, AnalysisReport
+from .models import Dataset, AnalysisReport, UserStats
 
 
 @admin.register(Dataset)
@@ -8,21 +8,31 @@ class DatasetAdmin(admin.ModelAdmin):
     list_display = ['filename', 'user', 'total_records', 'uploaded_at']
     list_filter = ['uploaded_at', 'user']
     search_fields = ['filename', 'user__username']
-    readonly_fields = ['uploaded_at', 'total_records', 'summary_stats', 'equipment_types', 'file_size', 'columns']
+    readonly_fields = ['uploaded_at', 'total_records', 'summary_stats', 'equipment_types', 'type_stats', 'histograms', 'stats_version', 'file_size', 'stored_size', 'columns', 'validation_report']
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('user', 'filename', 'file', 'uploaded_at')
         }),
         ('Statistics', {
-            'fields': ('total_records', 'file_size', 'columns', 'summary_stats', 'equipment_types')
+            'fields': ('total_records', 'file_size', 'stored_size', 'columns', 'summary_stats', 'equipment_types', 'type_stats', 'histograms', 'stats_version')
+        }),
+        ('Validation', {
+            'fields': ('validation_report',)
         }),
     )
 
 
 @admin.register(AnalysisReport)
 class AnalysisReportAdmin(admin.ModelAdmin):
-    list_display = ['dataset', 'user', 'report_type', 'generated_at']
+    list_display = ['dataset', 'user', 'report_type', 'file_size', 'generated_at']
     list_filter = ['generated_at', 'report_type', 'user']
     search_fields = ['dataset__filename', 'user__username']
-    readonly_fields = ['generated_at']
+    readonly_fields = ['generated_at', 'file_size']
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'dataset_count', 'report_count', 'dataset_bytes', 'report_bytes']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'dataset_count', 'report_count', 'dataset_bytes', 'report_bytes']
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analyzer'
+
+    def ready(self):
+        from . import authentication, counters, db, response_cache
+        db.connect_signals()
+        authentication.connect_signals()
+        counters.connect_signals()
+        response_cache.connect_signals()
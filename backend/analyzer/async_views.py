@@ -0,0 +1,257 @@
+# analyzer/async_views.py
+"""
+Async variants of the upload, summary, data and job events endpoints for
+ASGI servers.
+
+Under ASGI the request body is read by the server before the view runs, and
+these views never block the event loop while a request is processed:
+- multipart parsing and writing the stored file run on the I/O executor
+- CSV parsing, analysis and page reads run on the analysis executor
+- database access goes through sync_to_async
+
+Identical concurrent summary and data requests await one shared task (see
+singleflight.py).
+
+Both executors are bounded (ASYNC_IO_WORKERS, ASYNC_ANALYSIS_WORKERS), so
+thousands of slow clients hold only cheap coroutines, not worker threads.
+Responses match the DRF views in views.py.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import CachedTokenAuthentication
+from .counters import storage_remaining
+from .models import Dataset
+from .progress import (
+    ProgressReporter, aevent_stream, is_job_id, job_id_from, last_event_id, stream_headers
+)
+from .query import QueryError
+from .response_cache import dataset_scope, lookup, store
+from .singleflight import acoalesce, coalesce, flight_key
+from .serializers import DatasetSerializer, DatasetUploadSerializer
+from .services import (
+    parse_data_query, process_upload, read_data_page, save_dataset, type_summary
+)
+from .utils import STATS_VERSION, refresh_dataset_stats
+
+
+_io_executor = ThreadPoolExecutor(settings.ASYNC_IO_WORKERS, thread_name_prefix='async-io')
+_analysis_executor = ThreadPoolExecutor(settings.ASYNC_ANALYSIS_WORKERS,
+                                        thread_name_prefix='async-analysis')
+
+_authenticator = CachedTokenAuthentication()
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def _response(data, status_code=status.HTTP_200_OK):
+    # Same renderer as the DRF views, so payloads are byte-for-byte identical
+    return HttpResponse(JSONRenderer().render(data), status=status_code,
+                        content_type='application/json')
+
+
+def async_api_view(methods):
+    """
+    Method check and token authentication for an async view
+
+    DRF's @api_view cannot wrap coroutines; this does the parts these views
+    need and answers with DRF's error payloads.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _response({'detail': f'Method "{request.method}" not allowed.'},
+                                 status.HTTP_405_METHOD_NOT_ALLOWED)
+
+            # DRF's header parsing (case-insensitive keyword) and cached lookup
+            try:
+                credentials = await sync_to_async(_authenticator.authenticate)(request)
+            except AuthenticationFailed as e:
+                return _response({'detail': str(e.detail)}, status.HTTP_401_UNAUTHORIZED)
+            if credentials is None:
+                return _response({'detail': 'Authentication credentials were not provided.'},
+                                 status.HTTP_401_UNAUTHORIZED)
+            request.user, request.auth = credentials
+
+            return await view(request, *args, **kwargs)
+
+        # Token-authenticated like the DRF views; Django 4.2's csrf_exempt
+        # decorator does not support coroutines, so set its flag directly
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def _get_dataset(request, pk):
+    try:
+        return await Dataset.objects.filter(user=request.user).aget(pk=pk)
+    except Dataset.DoesNotExist:
+        return None
+
+
+async def _shared(key, executor, func):
+    # Coalesce within the event loop, then across threads and workers
+    return await acoalesce(key, lambda: _run(executor, coalesce, key, func))
+
+
+def _save_and_serialize(dataset, request):
+    save_dataset(dataset, request.user)
+    return DatasetSerializer(dataset, context={'request': request}).data
+
+
+@async_api_view(['POST'])
+async def upload(request):
+    """
+    Upload and analyze a CSV file (progress events with an X-Job-Id header)
+
+    No bytes_received events: the ASGI server has buffered the whole body
+    before the view runs, so they would only time multipart parsing.
+    """
+    progress = ProgressReporter(job_id_from(request), request.user.id)
+    files = await _run(_io_executor, lambda: request.FILES)
+    serializer = DatasetUploadSerializer(data={'file': files.get('file')})
+
+    if not serializer.is_valid():
+        await _run(_io_executor, progress, 'error', message='Invalid upload')
+        return _response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    file = serializer.validated_data['file']
+
+    remaining = await sync_to_async(storage_remaining)(request.user)
+    if remaining is not None and file.size > remaining:
+        await _run(_io_executor, progress, 'error', message='Storage quota exceeded')
+        return _response({
+            'error': 'Storage quota exceeded'
+        }, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Parse, validate and clean, then analyze the valid rows
+        upload = await _run(_analysis_executor, process_upload, file, progress)
+        if upload['analysis'] is None:
+            await _run(_io_executor, progress, 'error', message='CSV file contains no valid rows')
+            return _response({
+                'error': 'CSV file contains no valid rows',
+                'validation_report': upload['validation_report']
+            }, status.HTTP_400_BAD_REQUEST)
+
+        content = upload['content']
+        dataset = Dataset(
+            user=request.user,
+            filename=file.name,
+            file_size=file.size,
+            stored_size=len(content),
+            validation_report=upload['validation_report'],
+            zone_map=upload['zone_map']
+        )
+        dataset.apply_analysis(upload['analysis'])
+
+        # Write the file first so the database thread only runs the INSERT
+        await _run(_io_executor, dataset.file.save, file.name + upload['extension'],
+                   ContentFile(content), save=False)
+        dataset_data = await sync_to_async(_save_and_serialize)(dataset, request)
+        await _run(_io_executor, progress, 'done', dataset_id=dataset.id)
+
+        return _response({
+            'message': 'File uploaded and analyzed successfully',
+            'dataset': dataset_data,
+            'summary': dataset.get_stats_payload()
+        }, status.HTTP_201_CREATED)
+
+    except Exception as e:
+        await _run(_io_executor, progress, 'error', message=str(e))
+        return _response({
+            'error': f'Error processing CSV file: {str(e)}'
+        }, status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['GET'])
+async def summary(request, pk):
+    """Stored stats payload of a dataset, or ?type= stats from its zone-map blocks"""
+    dataset = await _get_dataset(request, pk)
+    if dataset is None:
+        return _response({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+    try:
+        equipment_type = request.GET.get('type')
+        params = {'type': equipment_type} if equipment_type else {}
+        key, payload = await _run(_io_executor, lookup, 'summary', dataset_scope(dataset.id), **params)
+        if payload is not None:
+            return _response(payload)
+
+        if equipment_type:
+            analysis_result = await _shared(
+                flight_key(dataset, 'summary', type=equipment_type), _analysis_executor,
+                lambda: type_summary(dataset, equipment_type))
+            if analysis_result is None:
+                return _response({
+                    'error': 'Dataset has no Type column'
+                }, status.HTTP_400_BAD_REQUEST)
+            await _run(_io_executor, store, key, analysis_result)
+            return _response(analysis_result)
+
+        # Only datasets stored before the current stats format re-read the CSV
+        if dataset.stats_version < STATS_VERSION:
+            dataset = await acoalesce(
+                flight_key(dataset, 'refresh'),
+                lambda: sync_to_async(refresh_dataset_stats)(dataset))
+        payload = dataset.get_stats_payload()
+        await _run(_io_executor, store, key, payload)
+        return _response(payload)
+
+    except Exception as e:
+        return _response({
+            'error': f'Error reading dataset: {str(e)}'
+        }, status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['GET'])
+async def data(request, pk):
+    """Paginated rows with optional filter, sort and columns (see query.py)"""
+    dataset = await _get_dataset(request, pk)
+    if dataset is None:
+        return _response({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+    try:
+        query = parse_data_query(request.GET, dataset.columns)
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 100))
+
+        key = flight_key(dataset, 'data', page=page, page_size=page_size,
+                         **{name: request.GET.get(name, '')
+                            for name in ('filter', 'sort', 'columns')})
+        return _response(await _shared(key, _analysis_executor,
+                                       lambda: read_data_page(dataset, query, page, page_size)))
+
+    except QueryError as e:
+        return _response({
+            'error': f'Invalid query: {str(e)}'
+        }, status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _response({
+            'error': f'Error reading dataset: {str(e)}'
+        }, status.HTTP_400_BAD_REQUEST)
+
+
+@async_api_view(['GET'])
+async def job_events(request, job_id):
+    """Progress events of an upload or report job as Server-Sent Events"""
+    if not is_job_id(job_id):
+        return _response({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+    return stream_headers(StreamingHttpResponse(
+        aevent_stream(job_id, request.user.id, last_event_id(request)),
+        content_type='text/event-stream'
+    ))
@@ -0,0 +1,95 @@
+# analyzer/authentication.py
+"""
+Token authentication with a token -> user cache.
+
+DRF's TokenAuthentication loads the Token and its User on every request.
+CachedTokenAuthentication keeps that pair in a bounded, expiring cache, so
+repeat requests with the same token run no authentication queries. Entries
+are dropped when a token is deleted (logout) and when its user is saved or
+deleted.
+
+With TOKEN_CACHE_ALIAS (the "shared" cache whenever REDIS_URL is set) that
+invalidation reaches every worker at once. Without it each process keeps its
+own cache, and only the process that handled the logout or deactivation
+drops its entry; other workers keep accepting the token for up to
+TOKEN_CACHE_TTL seconds, which is why the per-process default is short.
+
+Every request gets its own copy of the cached user, so attributes set on
+request.user never leak into other requests or threads.
+"""
+import copy
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import TTLCache
+
+
+_local_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def _cache_key(key):
+    # Token keys are credentials; never use them verbatim as cache keys
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _get(key):
+    if settings.TOKEN_CACHE_ALIAS:
+        # Unpickled on every get, so already a fresh copy
+        return caches[settings.TOKEN_CACHE_ALIAS].get(_cache_key(key))
+    credentials = _local_cache.get(_cache_key(key))
+    return _copy(credentials) if credentials is not None else None
+
+
+def _set(key, credentials):
+    if settings.TOKEN_CACHE_ALIAS:
+        caches[settings.TOKEN_CACHE_ALIAS].set(_cache_key(key), credentials, settings.TOKEN_CACHE_TTL)
+    else:
+        # The request that filled the entry keeps the originals
+        _local_cache.set(_cache_key(key), _copy(credentials))
+
+
+def _copy(credentials):
+    """(user, token) copies whose token.user is the copied user"""
+    user, token = copy.copy(credentials[0]), copy.copy(credentials[1])
+    token.user = user
+    return user, token
+
+
+def invalidate_token(key):
+    """Forget a cached token so its next use goes back to the database"""
+    if settings.TOKEN_CACHE_ALIAS:
+        caches[settings.TOKEN_CACHE_ALIAS].delete(_cache_key(key))
+    else:
+        _local_cache.delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves known tokens from the token cache"""
+
+    def authenticate_credentials(self, key):
+        credentials = _get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            _set(key, credentials)
+        return credentials
+
+
+def _token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def _user_changed(sender, instance, **kwargs):
+    # A cached user may have been deactivated or changed; drop its token
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+def connect_signals():
+    post_delete.connect(_token_deleted, sender=Token, dispatch_uid='analyzer.token_deleted')
+    post_save.connect(_user_changed, sender=get_user_model(), dispatch_uid='analyzer.user_saved')
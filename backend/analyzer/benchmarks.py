@@ -0,0 +1,256 @@
+# analyzer/benchmarks.py
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# Equipment types and typical operating ranges taken from
+# public/sample_equipment_data.csv: (flowrate, pressure, temperature)
+SAMPLE_EQUIPMENT_TYPES = {
+    'Reactor': (157.0, 46.8, 357.0),
+    'Heat Exchanger': (205.0, 31.2, 178.0),
+    'Pump': (178.0, 53.5, 72.6),
+    'Distillation': (225.0, 26.4, 228.0),
+    'Compressor': (97.6, 87.5, 97.8),
+    'Mixer': (142.9, 21.0, 62.6),
+    'Separator': (177.5, 36.9, 152.5),
+    'Dryer': (110.5, 15.5, 280.0),
+    'Crystallizer': (125.3, 22.7, 65.0),
+    'Filter': (160.0, 18.5, 50.5),
+    'Evaporator': (190.5, 28.0, 195.0),
+    'Centrifuge': (135.0, 40.5, 55.0),
+}
+
+BASE_METRICS = ['Flowrate', 'Pressure', 'Temperature']
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def _equipment_types(type_cardinality, rng):
+    """Return (names, means) for the requested number of equipment types"""
+    names = list(SAMPLE_EQUIPMENT_TYPES)[:type_cardinality]
+    means = [SAMPLE_EQUIPMENT_TYPES[name] for name in names]
+
+    # Synthesize extra types beyond the ones present in the sample file
+    for i in range(len(names), type_cardinality):
+        names.append(f"Unit-{i + 1}")
+        means.append((
+            float(rng.uniform(90, 230)),
+            float(rng.uniform(15, 90)),
+            float(rng.uniform(50, 370)),
+        ))
+
+    return names, np.array(means)
+
+
+def generate_equipment_csv(path, rows, numeric_columns=3, type_cardinality=12,
+                           seed=0, chunk_size=1_000_000):
+    """
+    Write a synthetic equipment CSV modeled on the sample dataset
+
+    Args:
+        path: Destination file path
+        rows: Number of data rows to generate
+        numeric_columns: Total numeric columns (Flowrate, Pressure and
+            Temperature first, then extra Sensor_N columns)
+        type_cardinality: Number of distinct values in the Type column
+        seed: Random seed so runs are reproducible
+        chunk_size: Rows generated and written per chunk
+
+    Returns:
+        str: Path to the generated file
+    """
+    if type_cardinality < 1:
+        raise ValueError("type_cardinality must be at least 1")
+
+    rng = np.random.default_rng(seed)
+    type_names, type_means = _equipment_types(type_cardinality, rng)
+    type_names = np.array(type_names, dtype=object)
+
+    metric_names = BASE_METRICS[:numeric_columns]
+    metric_names += [f"Sensor_{i}" for i in range(1, numeric_columns - len(metric_names) + 1)]
+
+    written = 0
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(['Equipment Name', 'Type'] + metric_names) + '\n')
+
+        while written < rows:
+            n = min(chunk_size, rows - written)
+            type_idx = rng.integers(0, type_cardinality, size=n)
+            serial = np.arange(written + 1, written + n + 1)
+
+            chunk = {
+                'Equipment Name': pd.Series(type_names[type_idx]) + '-' + pd.Series(serial).astype(str),
+                'Type': type_names[type_idx],
+            }
+            for j, metric in enumerate(metric_names):
+                if j < len(BASE_METRICS):
+                    centre = type_means[type_idx, j]
+                else:
+                    centre = np.full(n, 100.0)
+                values = centre * (1 + 0.08 * rng.standard_normal(n))
+                chunk[metric] = np.round(values, 1)
+
+            pd.DataFrame(chunk).to_csv(f, header=False, index=False)
+            written += n
+
+    return path
+
+
+def summarize_timings(timings):
+    """min/median/mean/max of a list of durations in seconds"""
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+        'runs': len(timings),
+    }
+
+
+def time_call(func, repeat=3, setup=None):
+    """
+    Time a callable several times
+
+    Args:
+        func: Callable to time
+        repeat: Number of timed runs
+        setup: Optional callable run (untimed) before each run
+
+    Returns:
+        dict: min/median/mean/max wall time in seconds and the run count
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return summarize_timings(timings)
+
+
+def run_concurrently(read, write, readers=4, writers=2, duration=5.0, teardown=None):
+    """
+    Run read and write callables from several threads for a fixed time
+
+    Each callable is called in a loop until `duration` seconds have passed;
+    exceptions are counted instead of stopping the run. `teardown` runs at
+    the end of every thread (e.g. to close its database connection).
+
+    Returns:
+        dict: Read latency summary plus reads/writes per second and error counts
+    """
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    read_times = []
+    counts = {'writes': 0, 'read_errors': 0, 'write_errors': 0}
+
+    def loop(func, is_read):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception:
+                with lock:
+                    counts['read_errors' if is_read else 'write_errors'] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                if is_read:
+                    read_times.append(elapsed)
+                else:
+                    counts['writes'] += 1
+        if teardown is not None:
+            teardown()
+
+    threads = ([threading.Thread(target=loop, args=(read, True)) for _ in range(readers)] +
+               [threading.Thread(target=loop, args=(write, False)) for _ in range(writers)])
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = summarize_timings(read_times) if read_times else {'median': 0.0, 'runs': 0}
+    result.update({
+        'reads_per_sec': len(read_times) / elapsed,
+        'writes_per_sec': counts['writes'] / elapsed,
+        'read_errors': counts['read_errors'],
+        'write_errors': counts['write_errors'],
+    })
+    return result
+
+
+def environment_info():
+    """Describe the machine and code revision a benchmark ran against"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    Compare two benchmark result documents
+
+    Args:
+        baseline: Result dict loaded from a previous run
+        current: Result dict from this run
+        threshold: Relative slowdown of the median that counts as a regression
+
+    Returns:
+        list: One dict per (size, operation) present in both runs
+    """
+    comparisons = []
+    for size, operations in current.get('results', {}).items():
+        base_operations = baseline.get('results', {}).get(size, {})
+        for name, timing in operations.items():
+            base_timing = base_operations.get(name)
+            if not isinstance(timing, dict) or not isinstance(base_timing, dict):
+                continue
+            ratio = timing['median'] / base_timing['median'] if base_timing['median'] else float('inf')
+            comparisons.append({
+                'rows': size,
+                'operation': name,
+                'baseline': base_timing['median'],
+                'current': timing['median'],
+                'ratio': ratio,
+                'regression': ratio > 1 + threshold,
+            })
+    return comparisons
+
+
+def load_results(path):
+    """Load a benchmark result document written by save_results"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_results(path, results):
+    """Write a benchmark result document as JSON"""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
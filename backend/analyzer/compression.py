@@ -0,0 +1,189 @@
+# analyzer/compression.py
+"""
+Compressed storage of dataset CSVs.
+
+Stored files are a sequence of independently compressed frames: one for the
+header line and one per zone-map block (see zonemap.py). The frames
+concatenated form a valid multi-frame zstd or multi-member gzip stream, so:
+- whole-file readers decompress it as one stream straight into read_csv
+- block reads seek to a block's frame and decompress only that frame
+- downloads can send the stored bytes as they are, with Content-Encoding
+
+zstd is used when the `zstandard` package is installed, gzip otherwise
+(DATASET_COMPRESSION picks one explicitly, or 'none'). The codec of a file
+is taken from its name (.csv.zst, .csv.gz), so uncompressed files from
+before this format keep working.
+"""
+import gzip
+import io
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Codec -> (file extension, HTTP Content-Encoding)
+CODECS = {
+    'zstd': ('.zst', 'zstd'),
+    'gzip': ('.gz', 'gzip'),
+}
+
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+# Frame size for files without a zone map
+FALLBACK_FRAME_BYTES = 4 * 1024 * 1024
+
+
+def storage_codec():
+    """Codec new uploads are stored with, or None for plain CSV"""
+    codec = settings.DATASET_COMPRESSION
+    if codec == 'auto':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if codec == 'none':
+        return None
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError("DATASET_COMPRESSION=zstd requires the zstandard package")
+    return codec
+
+
+def codec_for(name):
+    """Codec of a stored file, from its name; None for plain CSV"""
+    for codec, (extension, _) in CODECS.items():
+        if name.endswith(extension):
+            return codec
+    return None
+
+
+def content_encoding(codec):
+    return CODECS[codec][1]
+
+
+def _compress_frame(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    # mtime=0 keeps identical content byte-identical (content-hashed names)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress(codec, data):
+    """Decompress one or more concatenated frames"""
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(data), read_across_frames=True).read()
+    return gzip.decompress(data)
+
+
+def compress_csv(data, zone_map):
+    """
+    Compress a CSV for storage, one frame per zone-map block
+
+    Args:
+        data: Canonical CSV bytes (see ingest.py)
+        zone_map: Zone map built on data; {} when there is none
+
+    Returns:
+        tuple: (bytes to store, zone map with frame offsets, file extension);
+               data, zone_map and '' unchanged when compression is off
+    """
+    codec = storage_codec()
+    if codec is None:
+        return data, zone_map, ''
+
+    if zone_map:
+        header_length = zone_map['header_length']
+        ranges = [(0, header_length)] + [
+            (block['offset'], block['offset'] + block['length']) for block in zone_map['blocks']
+        ]
+    else:
+        ranges = [(start, min(start + FALLBACK_FRAME_BYTES, len(data)))
+                  for start in range(0, len(data), FALLBACK_FRAME_BYTES)]
+
+    frames = [_compress_frame(codec, data[start:stop]) for start, stop in ranges]
+
+    if zone_map:
+        zone_map = dict(zone_map, header_frame_length=len(frames[0]))
+        blocks, position = [], len(frames[0])
+        for block, frame in zip(zone_map['blocks'], frames[1:]):
+            blocks.append(dict(block, frame_offset=position, frame_length=len(frame)))
+            position += len(frame)
+        zone_map['blocks'] = blocks
+
+    return b''.join(frames), zone_map, CODECS[codec][0]
+
+
+def open_csv(path):
+    """
+    Binary file object yielding the decompressed CSV of a stored file
+
+    Decompresses as it is read, so the whole file is never in memory.
+    """
+    codec = codec_for(str(path))
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                          closefd=True)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_csv(path, **kwargs):
+    """pd.read_csv of a stored dataset file, compressed or not"""
+    with open_csv(path) as f:
+        return pd.read_csv(f, **kwargs)
+
+
+def read_block_range(f, codec, zone_map, first, last):
+    """
+    Decompressed bytes of blocks first..last of an open stored file
+
+    Args:
+        f: Stored file opened in binary mode
+        codec: codec_for(name), None for plain CSV
+        zone_map: The dataset's zone map
+        first, last: Block indices (inclusive)
+    """
+    blocks = zone_map['blocks']
+    if codec is None:
+        offset_key, length_key = 'offset', 'length'
+    else:
+        offset_key, length_key = 'frame_offset', 'frame_length'
+    start = blocks[first][offset_key]
+    f.seek(start)
+    data = f.read(blocks[last][offset_key] + blocks[last][length_key] - start)
+    return data if codec is None else decompress(codec, data)
+
+
+def read_header(f, codec, zone_map):
+    """Decompressed header line of an open stored file"""
+    f.seek(0)
+    if codec is None:
+        return f.read(zone_map['header_length'])
+    return decompress(codec, f.read(zone_map['header_frame_length']))
+
+
+def iter_csv(path, chunk_size=256 * 1024):
+    """Decompressed CSV bytes of a stored file, chunk by chunk"""
+    with open_csv(path) as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def accepts_encoding(header, encoding):
+    """True when an Accept-Encoding header allows encoding (q > 0)"""
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        if token.strip().lower() not in (encoding, '*'):
+            continue
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
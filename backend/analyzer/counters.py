@@ -0,0 +1,114 @@
+# analyzer/counters.py
+"""
+Per-user dataset/report counts and bytes (UserStats).
+
+Dataset bytes are counted as uploaded (Dataset.file_size, before
+compression), report bytes as the PDF size; the quota applies to their sum.
+
+Every Dataset and AnalysisReport insert or delete adjusts its owner's row
+with a single UPDATE ... SET n = n + 1 in the transaction that made the
+change, so upload, report creation, cleanup and cascading deletes keep the
+counters exact without locking or re-counting. A missing row is rebuilt from
+the tables the first time it is read. `python manage.py reconcile_user_stats`
+repairs rows changed outside the ORM (raw SQL, restored backups).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save
+
+from .models import AnalysisReport, Dataset, UserStats
+
+
+COUNTER_FIELDS = ['dataset_count', 'report_count', 'dataset_bytes', 'report_bytes']
+
+
+def adjust(user_id, **deltas):
+    """Add deltas to a user's counters (no-op until the row exists)"""
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+
+
+def compute(user_id):
+    """Counters of a user counted from the dataset and report tables"""
+    datasets = Dataset.objects.filter(user_id=user_id).aggregate(n=Count('id'), size=Sum('file_size'))
+    reports = AnalysisReport.objects.filter(user_id=user_id).aggregate(n=Count('id'), size=Sum('file_size'))
+    return {
+        'dataset_count': datasets['n'],
+        'dataset_bytes': datasets['size'] or 0,
+        'report_count': reports['n'],
+        'report_bytes': reports['size'] or 0,
+    }
+
+
+def reconcile(user_id):
+    """
+    Recount a user's counters and store them
+
+    Returns:
+        tuple: (stored counters before, or None without a row; counters after)
+    """
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().filter(user_id=user_id).first()
+        before = {name: getattr(stats, name) for name in COUNTER_FIELDS} if stats else None
+        after = compute(user_id)
+        if stats is None:
+            UserStats.objects.create(user_id=user_id, **after)
+        elif before != after:
+            UserStats.objects.filter(user_id=user_id).update(**after)
+    return before, after
+
+
+def get_user_stats(user):
+    """A user's UserStats row, rebuilt from the tables when missing"""
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        pass
+    try:
+        reconcile(user.pk)
+    except IntegrityError:
+        # A concurrent request created the row first
+        pass
+    return UserStats.objects.get(user=user)
+
+
+def storage_remaining(user):
+    """Bytes a user may still store under USER_STORAGE_QUOTA, or None when unlimited"""
+    quota = settings.USER_STORAGE_QUOTA
+    if not quota:
+        return None
+    return quota - get_user_stats(user).total_bytes
+
+
+def _dataset_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust(instance.user_id, dataset_count=1, dataset_bytes=instance.file_size)
+
+
+def _dataset_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, dataset_count=-1, dataset_bytes=-instance.file_size)
+
+
+def _report_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust(instance.user_id, report_count=1, report_bytes=instance.file_size)
+
+
+def _report_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, report_count=-1, report_bytes=-instance.file_size)
+
+
+def _user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def connect_signals():
+    post_save.connect(_dataset_saved, sender=Dataset, dispatch_uid='analyzer.counters.dataset_saved')
+    post_delete.connect(_dataset_deleted, sender=Dataset, dispatch_uid='analyzer.counters.dataset_deleted')
+    post_save.connect(_report_saved, sender=AnalysisReport, dispatch_uid='analyzer.counters.report_saved')
+    post_delete.connect(_report_deleted, sender=AnalysisReport, dispatch_uid='analyzer.counters.report_deleted')
+    post_save.connect(_user_saved, sender=get_user_model(), dispatch_uid='analyzer.counters.user_saved')
@@ -0,0 +1,190 @@
+# analyzer/csv_sniff.py
+"""
+CSV dialect sniffing on a bounded prefix.
+
+Only the first SNIFF_BYTES of a file are inspected to pick the encoding,
+delimiter, decimal separator and header row, so the file itself is parsed
+exactly once with the right options. A file whose prefix is UTF-8 but whose
+later bytes are not is parsed a second time as latin-1 (see fallback_dialect).
+
+The module has no Django dependency; the desktop app loads this same file
+through desktop/gui/csv_sniff.py.
+"""
+import codecs
+import csv
+import re
+from collections import Counter
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+
+# Bytes inspected to pick the dialect
+SNIFF_BYTES = 64 * 1024
+
+# Candidate delimiters, in order of preference on ties
+DELIMITERS = [',', ';', '\t', '|']
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+_COMMA_DECIMAL = re.compile(r'^[+-]?\d+,\d+$')
+_POINT_DECIMAL = re.compile(r'^[+-]?\d*\.\d+$')
+
+
+def detect_encoding(prefix):
+    """
+    Pick an encoding from the first bytes of a file
+
+    A byte-order mark wins; otherwise the prefix (cut at its last newline so a
+    multi-byte character is never split) must decode as UTF-8, and anything
+    else is read as latin-1, which accepts every byte.
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    cut = prefix.rfind(b'\n')
+    sample = prefix[:cut + 1] if cut >= 0 and len(prefix) >= SNIFF_BYTES else prefix
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _sample_rows(prefix, encoding, delimiter):
+    """Non-blank rows of the prefix split on `delimiter`, without a cut-off last line"""
+    text = prefix.decode(encoding, errors='replace')
+    lines = text.splitlines()
+    if len(prefix) >= SNIFF_BYTES and not text.endswith(('\n', '\r')):
+        lines = lines[:-1]
+    return [row for row in csv.reader(lines, delimiter=delimiter) if any(row)]
+
+
+def _modal_width(rows):
+    """(most common field count, rows having it)"""
+    widths = Counter(len(row) for row in rows)
+    return widths.most_common(1)[0] if widths else (0, 0)
+
+
+def detect_delimiter(prefix, encoding):
+    """
+    Pick the delimiter that splits the most rows into the same number of fields
+
+    Returns:
+        tuple: (delimiter, sample rows split on it)
+    """
+    best, best_score, best_rows = ',', (0, 0), []
+    for delimiter in DELIMITERS:
+        rows = _sample_rows(prefix, encoding, delimiter)
+        width, count = _modal_width(rows)
+        score = (count, width) if width > 1 else (0, 0)
+        if score > best_score:
+            best, best_score, best_rows = delimiter, score, rows
+    return best, best_rows
+
+
+def detect_header_row(rows):
+    """
+    Index of the header among non-blank rows
+
+    Exports that start with title or timestamp lines have fewer fields than
+    the table; the header is the first row as wide as the data rows.
+    """
+    width, _ = _modal_width(rows)
+    for index, row in enumerate(rows):
+        if len(row) == width:
+            return index
+    return 0
+
+
+def detect_decimal(rows, delimiter):
+    """',' when data fields use decimal commas (only possible with another delimiter)"""
+    if delimiter == ',':
+        return '.'
+    comma = point = 0
+    for row in rows[1:]:
+        for field in row:
+            field = field.strip()
+            if _COMMA_DECIMAL.match(field):
+                comma += 1
+            elif _POINT_DECIMAL.match(field):
+                point += 1
+    return ',' if comma > point else '.'
+
+
+def sniff(prefix):
+    """
+    Detect the CSV dialect from the first bytes of a file
+
+    Args:
+        prefix: Up to SNIFF_BYTES bytes from the start of the file
+
+    Returns:
+        dict: encoding, delimiter, decimal and header_row (index among
+              non-blank rows, as read_csv's `header` counts them)
+    """
+    encoding = detect_encoding(prefix)
+    delimiter, rows = detect_delimiter(prefix, encoding)
+    header_row = detect_header_row(rows)
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'decimal': detect_decimal(rows[header_row:], delimiter),
+        'header_row': header_row,
+    }
+
+
+def check_decoded(df):
+    """
+    Raise UnicodeDecodeError if the pyarrow parser left undecodable text
+
+    Instead of failing, pyarrow returns a column holding invalid UTF-8 as
+    raw bytes values.
+    """
+    for col in df.select_dtypes(include='object').columns:
+        first = df[col].first_valid_index()
+        if first is not None and isinstance(df[col].loc[first], bytes):
+            raise UnicodeDecodeError('utf-8', b'', 0, 0, f'invalid UTF-8 in column {col!r}')
+
+
+def fallback_dialect(dialect, error):
+    """
+    The dialect to parse with again after `error`, or None to give up
+
+    The encoding is chosen from the prefix only, so non-UTF-8 bytes further
+    into a file fail the parse (see check_decoded for the pyarrow parser);
+    the file is then read as latin-1, which accepts every byte.
+    """
+    if dialect['encoding'] != 'utf-8' or not isinstance(error, UnicodeDecodeError):
+        return None
+    return dict(dialect, encoding='latin-1')
+
+
+def is_default_dialect(dialect):
+    """True when a plain pd.read_csv(path) reads the file the same way"""
+    return (dialect['encoding'] == 'utf-8' and dialect['delimiter'] == ','
+            and dialect['decimal'] == '.' and dialect['header_row'] == 0)
+
+
+def read_options(dialect):
+    """
+    pd.read_csv keyword arguments for a sniffed dialect
+
+    The header row is passed as `header` rather than `skiprows`, which the
+    pyarrow engine only honours for headerless files.
+    """
+    return {
+        'encoding': dialect['encoding'],
+        'sep': dialect['delimiter'],
+        'decimal': dialect['decimal'],
+        'header': dialect['header_row'],
+        'engine': CSV_ENGINE,
+    }
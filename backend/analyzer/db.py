@@ -0,0 +1,24 @@
+# analyzer/db.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to every new SQLite connection
+
+    WAL lets readers proceed while an upload or cleanup is writing, and
+    busy_timeout makes writers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_signals():
+    connection_created.connect(configure_sqlite, dispatch_uid='analyzer.configure_sqlite')
@@ -0,0 +1,197 @@
+# analyzer/downloads.py
+"""
+Permission-checked downloads of dataset and report files.
+
+file_url and report_url point at the download actions with a signed,
+expiring ?signature= for that one record. Browser tabs and plain HTTP
+clients can therefore fetch a file without the Token header. Owners can
+always download with their token.
+
+serve_file answers conditional requests (ETag, Last-Modified) and then:
+- with DOWNLOAD_OFFLOAD set, replies with X-Accel-Redirect (nginx) or
+  X-Sendfile (Apache, lighttpd), so the front server sends the file and
+  handles Range itself
+- otherwise serves single byte ranges (206/416) from Python, or the whole
+  file through FileResponse, which WSGI servers can hand to sendfile()
+
+Compressed datasets are sent as stored with Content-Encoding when the
+client accepts it (see compression.py). For other clients they are
+decompressed in Python as the response streams; those responses do not
+support ranges.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .compression import accepts_encoding, codec_for, content_encoding, iter_csv
+from .storage import is_sharded
+
+
+SIGNATURE_SALT = 'analyzer.downloads'
+
+# Bytes read per chunk when serving a range from Python
+RANGE_CHUNK_BYTES = 256 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def signed_url(request, route, pk):
+    """
+    Absolute download URL of one record, valid for DOWNLOAD_URL_MAX_AGE
+
+    Args:
+        request: Request used to build the absolute URL (None for a path)
+        route: URL name of the download action, e.g. 'dataset-download'
+        pk: Primary key of the record
+    """
+    signature = signing.TimestampSigner(salt=SIGNATURE_SALT).sign(f'{route}:{pk}')
+    url = f"{reverse(route, args=[pk])}?signature={quote(signature)}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def has_valid_signature(request, route, pk):
+    signature = request.query_params.get('signature')
+    if not signature:
+        return False
+    try:
+        value = signing.TimestampSigner(salt=SIGNATURE_SALT).unsign(
+            signature, max_age=settings.DOWNLOAD_URL_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == f'{route}:{pk}'
+
+
+def parse_range(header, size):
+    """
+    The (start, stop) byte span of a single-range Range header
+
+    Returns:
+        tuple or None: None when the whole file should be sent (no header,
+                       several ranges or a unit other than bytes)
+
+    Raises:
+        RangeNotSatisfiable: When the range lies outside the file
+    """
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size
+    start = int(first)
+    stop = min(int(last) + 1, size) if last else size
+    if start >= size or stop <= start:
+        raise RangeNotSatisfiable()
+    return start, stop
+
+
+def _etag(name, stat, variant=''):
+    if is_sharded(name):
+        # Sharded names already are a hash of the stored bytes
+        tag = os.path.basename(name).split('.')[0]
+    else:
+        tag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+    return f'"{tag}{variant}"'
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _read_range(path, start, stop):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload(name, path, content_type):
+    # An empty response; the front server replaces the body with the file
+    response = HttpResponse(content_type=content_type)
+    if settings.DOWNLOAD_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_file(request, file_field, filename, content_type):
+    """
+    Response for one stored file
+
+    Args:
+        request: The download request
+        file_field: FieldFile of the record (Dataset.file, AnalysisReport.report_file)
+        filename: Name offered to the client in Content-Disposition
+        content_type: Content-Type of the (decompressed) file
+    """
+    name, path = file_field.name, file_field.path
+    stat = os.stat(path)
+
+    codec = codec_for(name) if content_type == 'text/csv' else None
+    encoded = codec is not None and accepts_encoding(
+        request.headers.get('Accept-Encoding', ''), content_encoding(codec))
+    decompress = codec is not None and not encoded
+
+    etag = _etag(name, stat, '-identity' if decompress else '')
+    last_modified = stat.st_mtime
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+
+    if response is None and decompress:
+        response = StreamingHttpResponse(iter_csv(path), content_type=content_type)
+        response['Accept-Ranges'] = 'none'
+    elif response is None and settings.DOWNLOAD_OFFLOAD:
+        response = _offload(name, path, content_type)
+    elif response is None:
+        try:
+            span = parse_range(request.headers.get('Range', ''), stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if span is not None and _if_range_passes(request, etag, last_modified):
+            start, stop = span
+            response = StreamingHttpResponse(_read_range(path, start, stop), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{stop - 1}/{stat.st_size}'
+            response['Content-Length'] = str(stop - start)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if response.status_code != 304:
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        if encoded:
+            response['Content-Encoding'] = content_encoding(codec)
+    if codec is not None:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,185 @@
+# analyzer/export.py
+"""
+Streaming export of a dataset's rows as CSV, NDJSON or Parquet.
+
+Rows are read one zone-map block at a time (BLOCK_ROWS rows; blocks that
+cannot match the filter are skipped), or in chunks of the same size from
+the decompressed stream when a file has no zone map. Each chunk is filtered
+and projected, encoded and yielded before the next one is read, so memory
+stays constant whatever the dataset size. Sorting needs every row at once
+and is not offered here.
+
+Parquet needs pyarrow; each chunk becomes one row group. Its schema is fixed
+before the first row is read and every chunk is cast to it, so a block whose
+column is all missing cannot change a column's type halfway through.
+"""
+import numpy as np
+import pandas as pd
+
+from .compression import open_csv
+from .query import QueryError, apply_query
+from .zonemap import BLOCK_ROWS, blocks_for_clauses, read_blocks
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# output query param -> (Content-Type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+
+def check_export(output, query):
+    """
+    Validate an export request
+
+    Raises:
+        QueryError: Unknown format, a sort, or Parquet without pyarrow
+    """
+    if output not in EXPORT_FORMATS:
+        raise QueryError(f"Unknown output '{output}' (use {', '.join(EXPORT_FORMATS)})")
+    if query['sort_keys']:
+        raise QueryError("sort is not supported for exports")
+    if output == 'parquet' and pyarrow is None:
+        raise QueryError("Parquet export requires the pyarrow package")
+
+
+def iter_chunks(dataset, query):
+    """Filtered, projected DataFrames of at most BLOCK_ROWS rows, in file order"""
+    clauses, columns, usecols = query['clauses'], query['columns'], query['usecols']
+    zone_map = dataset.zone_map
+    path = dataset.file.path
+
+    if zone_map:
+        indices = blocks_for_clauses(zone_map, clauses)
+        if not indices:
+            # An empty, typed chunk still gives the export its header/schema
+            yield apply_query(read_blocks(path, zone_map, [], usecols), columns=columns)
+        for index in indices:
+            yield apply_query(read_blocks(path, zone_map, [index], usecols), clauses, columns=columns)
+        return
+
+    with open_csv(path) as f:
+        for chunk in pd.read_csv(f, usecols=usecols, chunksize=BLOCK_ROWS):
+            yield apply_query(chunk, clauses, columns=columns)
+
+
+def _csv(chunks, columns):
+    header = True
+    for chunk in chunks:
+        if chunk.empty and not header:
+            continue
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+    if header:
+        # Nothing read at all: still send the header line
+        yield (','.join(columns) + '\n').encode()
+
+
+def _ndjson(chunks):
+    for chunk in chunks:
+        if not chunk.empty:
+            yield chunk.to_json(orient='records', lines=True, date_format='iso').encode()
+
+
+class _ChunkSink:
+    """Write-only file object collecting what ParquetWriter writes between drains"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _arrow_type(dtype):
+    """Arrow type for a column dtype name; text for anything non-numeric"""
+    try:
+        dtype = np.dtype(dtype)
+    except TypeError:
+        return pyarrow.string()
+    return pyarrow.from_numpy_dtype(dtype) if dtype.kind in 'biuf' else pyarrow.string()
+
+
+def parquet_schema(dataset, columns):
+    """
+    Arrow schema of a Parquet export
+
+    Column types come from the dtypes the whole file was parsed with (the
+    zone map) or, for files without one, from which columns were analyzed
+    as numeric.
+    """
+    dtypes = (dataset.zone_map or {}).get('dtypes', {})
+    return pyarrow.schema([
+        pyarrow.field(col, _arrow_type(
+            dtypes.get(col) or ('float64' if col in dataset.summary_stats else 'str')))
+        for col in columns
+    ])
+
+
+def _cast(chunk, schema):
+    """A chunk with every column converted to its schema type"""
+    converted = {}
+    for field in schema:
+        values = chunk[field.name]
+        if pyarrow.types.is_string(field.type):
+            converted[field.name] = values.astype('string')
+        elif not pd.api.types.is_numeric_dtype(values):
+            converted[field.name] = pd.to_numeric(values, errors='coerce')
+    return chunk.assign(**converted) if converted else chunk
+
+
+def _parquet(chunks, schema):
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for chunk in chunks:
+        if not chunk.empty:
+            writer.write_table(pyarrow.Table.from_pandas(_cast(chunk, schema), schema=schema,
+                                                         preserve_index=False))
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_rows(dataset, query, output):
+    """
+    Encoded export of a dataset, chunk by chunk
+
+    Args:
+        dataset: Dataset instance (only its file and zone map are used)
+        query: Output of parse_data_query, checked with check_export
+        output: Key of EXPORT_FORMATS
+
+    Yields:
+        bytes: Consecutive pieces of the exported file
+    """
+    chunks = iter_chunks(dataset, query)
+    columns = query['columns'] or dataset.columns
+    if output == 'csv':
+        return _csv(chunks, columns)
+    if output == 'ndjson':
+        return _ndjson(chunks)
+    return _parquet(chunks, parquet_schema(dataset, columns))
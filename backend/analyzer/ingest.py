@@ -0,0 +1,204 @@
+# analyzer/ingest.py
+"""
+Upload ingest: dialect sniffing, parsing, coercion, range checks and
+quarantine, run once per upload before the dataset is analyzed.
+
+The upload is read straight from the uploaded file in chunks of
+CHUNK_ROWS rows (the C parser; the pyarrow parser has no chunked reader
+and parses the file in one go). Each chunk is coerced and checked column by
+column and only its valid rows are kept, with the counters summed across
+chunks. Rows that fail a check are removed from the dataset and listed, up
+to QUARANTINE_SAMPLE of them, in the validation report stored on the
+Dataset. A file that stops decoding as UTF-8 after the sniffed prefix is
+parsed again from the start as latin-1.
+"""
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .csv_sniff import (
+    SNIFF_BYTES, check_decoded, fallback_dialect, is_default_dialect, read_options, sniff
+)
+
+
+# Quarantined cells listed in the report; counts are always complete
+QUARANTINE_SAMPLE = 50
+
+# Rows parsed, coerced and checked at a time
+CHUNK_ROWS = 100_000
+
+
+_SKIPPED_LINE = re.compile(r'Skipping line (\d+)')
+
+
+def iter_csv_counting_bad_lines(buffer, chunk_rows=CHUNK_ROWS, **options):
+    """
+    Chunked read_csv that skips malformed lines and reports their line numbers
+
+    The C parser reports skipped lines as ParserWarnings and the pyarrow
+    parser passes them to a row handler; either way the parse stays a
+    single pass.
+
+    Yields:
+        tuple: (DataFrame of up to chunk_rows rows, line numbers skipped while reading it)
+    """
+    if options.get('engine') == 'pyarrow':
+        bad_lines = []
+
+        def skip_row(row):
+            bad_lines.append(row.number if row.number is not None else -1)
+            return 'skip'
+        df = pd.read_csv(buffer, on_bad_lines=skip_row, **options)
+        check_decoded(df)
+        yield df, bad_lines
+        return
+
+    with pd.read_csv(buffer, on_bad_lines='warn', chunksize=chunk_rows, **options) as reader:
+        while True:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always', pd.errors.ParserWarning)
+                try:
+                    chunk = next(reader)
+                except StopIteration:
+                    return
+            bad_lines = []
+            for warning in caught:
+                if issubclass(warning.category, pd.errors.ParserWarning):
+                    bad_lines.extend(int(n) for n in _SKIPPED_LINE.findall(str(warning.message)))
+            yield chunk, bad_lines
+
+
+def coerce_and_check(df, ranges, decimal='.', offset=0, sample_room=QUARANTINE_SAMPLE):
+    """
+    Coerce expected numeric columns and apply range checks
+
+    Args:
+        df: Parsed DataFrame (or one chunk of it)
+        ranges: {column: (low, high)} with None for an open bound
+        decimal: Decimal separator of the file, for columns the parser left as text
+        offset: Row number of the chunk's first row, for the samples
+        sample_room: Quarantine samples still wanted
+
+    Returns:
+        tuple: (cleaned DataFrame, per-column counts, bad-row mask, quarantine samples)
+    """
+    bad_rows = np.zeros(len(df), dtype=bool)
+    column_report = {}
+    samples = []
+
+    for col, (low, high) in ranges.items():
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        text = raw
+        if decimal != '.' and not pd.api.types.is_numeric_dtype(raw):
+            text = raw.str.replace(decimal, '.', regex=False)
+        values = pd.to_numeric(text, errors='coerce')
+        not_numeric = (values.isna() & raw.notna()).to_numpy()
+
+        numbers = values.to_numpy(dtype=float)
+        out_of_range = np.zeros(len(df), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if low is not None:
+                out_of_range |= numbers < low
+            if high is not None:
+                out_of_range |= numbers > high
+
+        column_report[col] = {
+            'coercion_errors': int(not_numeric.sum()),
+            'out_of_range': int(out_of_range.sum()),
+        }
+        for reason, mask in (('not numeric', not_numeric), ('out of range', out_of_range)):
+            room = sample_room - len(samples)
+            if room > 0:
+                for row in np.flatnonzero(mask)[:room]:
+                    samples.append({'row': offset + int(row), 'column': col,
+                                    'value': str(raw.iloc[row]), 'reason': reason})
+
+        bad_rows |= not_numeric | out_of_range
+        df[col] = values
+
+    return df, column_report, bad_rows, samples
+
+
+def _parse_chunks(buffer, dialect, ranges):
+    """Parse, coerce and check the whole file, summing the counters across chunks"""
+    buffer.seek(0)
+    frames, bad_lines, samples = [], [], []
+    column_report = {}
+    parsed = 0
+    for chunk, chunk_bad_lines in iter_csv_counting_bad_lines(
+            buffer, chunk_rows=CHUNK_ROWS, **read_options(dialect)):
+        bad_lines.extend(chunk_bad_lines)
+        chunk, chunk_report, bad_rows, chunk_samples = coerce_and_check(
+            chunk, ranges, dialect['decimal'], offset=parsed,
+            sample_room=QUARANTINE_SAMPLE - len(samples))
+        samples.extend(chunk_samples)
+        for col, counts in chunk_report.items():
+            totals = column_report.setdefault(col, dict.fromkeys(counts, 0))
+            for key, value in counts.items():
+                totals[key] += value
+        parsed += len(chunk)
+        frames.append(chunk[~bad_rows] if bad_rows.any() else chunk)
+    return frames, bad_lines, samples, column_report, parsed
+
+
+def ingest_csv(file):
+    """
+    Parse and validate an uploaded CSV in one pass
+
+    Args:
+        file: Uploaded file object
+
+    Returns:
+        tuple: (DataFrame of valid rows, validation report, bytes to store:
+               the upload itself, or a cleaned UTF-8 CSV when rows were
+               dropped or the file was not a plain comma-separated UTF-8 CSV)
+    """
+    file.seek(0)
+    dialect = sniff(file.read(SNIFF_BYTES))
+    # The underlying binary file: pandas takes Django's File wrapper for text
+    buffer = getattr(file, 'file', file)
+
+    ranges = settings.VALIDATION_RANGES
+    try:
+        frames, bad_lines, samples, column_report, parsed = _parse_chunks(buffer, dialect, ranges)
+    except UnicodeDecodeError as e:
+        fallback = fallback_dialect(dialect, e)
+        if fallback is None:
+            raise
+        dialect = fallback
+        frames, bad_lines, samples, column_report, parsed = _parse_chunks(buffer, dialect, ranges)
+
+    malformed = len(bad_lines)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+    quarantined = parsed - len(df)
+
+    report = {
+        'encoding': dialect['encoding'],
+        'delimiter': dialect['delimiter'],
+        'decimal': dialect['decimal'],
+        'header_row': dialect['header_row'],
+        'parsed_rows': len(df) + quarantined,
+        'malformed_rows': malformed,
+        'malformed_lines': bad_lines[:QUARANTINE_SAMPLE],
+        'quarantined_rows': quarantined,
+        'valid_rows': len(df),
+        'columns': column_report,
+        'quarantine': samples,
+    }
+
+    # Store what was analyzed as a plain UTF-8 CSV, without skipped or
+    # quarantined rows, so later reads need no dialect options
+    cleaned = bool(quarantined or malformed or not is_default_dialect(dialect))
+    if cleaned:
+        data = df.to_csv(index=False).encode('utf-8')
+    else:
+        file.seek(0)
+        data = file.read()
+    report['cleaned'] = cleaned
+
+    return df, report, data
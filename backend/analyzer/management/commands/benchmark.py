@@ -0,0 +1,277 @@
+# analyzer/management/commands/benchmark.py
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from analyzer.benchmarks import (
+    DEFAULT_SIZES, compare_results, environment_info, generate_equipment_csv,
+    load_results, run_concurrently, save_results, time_call
+)
+from analyzer.models import Dataset
+from analyzer.utils import analyze_csv_data, generate_pdf_report, cleanup_old_datasets
+
+
+OPERATIONS = ['read_csv', 'analyze', 'analyze_parallel', 'report', 'upload', 'data_page', 'cleanup', 'concurrent']
+
+# Rows in the small file uploaded by writer threads in the concurrent benchmark
+CONCURRENT_UPLOAD_ROWS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark CSV ingest, analysis, pagination, report generation and "
+        "retention cleanup on synthetic equipment data, writing JSON results"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                            help='Row counts to benchmark (default: 1e3 to 1e7)')
+        parser.add_argument('--numeric-columns', type=int, default=3,
+                            help='Number of numeric columns in the generated CSV')
+        parser.add_argument('--types', type=int, default=12,
+                            help='Number of distinct equipment types')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Timed runs per operation')
+        parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS,
+                            help='Subset of operations to run')
+        parser.add_argument('--page-size', type=int, default=100,
+                            help='Page size used for the data endpoint')
+        parser.add_argument('--cleanup-datasets', type=int, default=50,
+                            help='Datasets created before each cleanup run')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes for analyze_parallel (the pool is sized once per process)')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Reader threads in the concurrent benchmark')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Uploading threads in the concurrent benchmark')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds the concurrent benchmark runs')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write JSON results to this file')
+        parser.add_argument('--compare', help='Baseline JSON file to compare against')
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help='Relative median slowdown reported as a regression')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='chemflow-bench-')
+        results = {
+            'environment': environment_info(),
+            'parameters': {
+                'sizes': options['sizes'],
+                'numeric_columns': options['numeric_columns'],
+                'types': options['types'],
+                'repeat': options['repeat'],
+                'page_size': options['page_size'],
+                'cleanup_datasets': options['cleanup_datasets'],
+                'workers': options['workers'],
+                'readers': options['readers'],
+                'writers': options['writers'],
+                'duration': options['duration'],
+                'seed': options['seed'],
+            },
+            'results': {},
+        }
+
+        # Run against a throwaway database and media root so nothing real is touched
+        old_db_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            # A file database, so WAL and cross-thread access behave as in production
+            connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            with override_settings(MEDIA_ROOT=os.path.join(workdir, 'media'),
+                                   MAX_UPLOAD_SIZE=float('inf')):
+                user = User.objects.create_user(username='benchmark', password='benchmark')
+                token = Token.objects.create(user=user)
+                client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+                for size in options['sizes']:
+                    self.stdout.write(f"Benchmarking {size:,} rows...")
+                    csv_path = os.path.join(workdir, f'equipment_{size}.csv')
+                    generate_equipment_csv(
+                        csv_path, size,
+                        numeric_columns=options['numeric_columns'],
+                        type_cardinality=options['types'],
+                        seed=options['seed'],
+                    )
+                    results['results'][str(size)] = self.run_size(
+                        csv_path, size, user, client, workdir, options
+                    )
+                    os.remove(csv_path)
+        finally:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['output']:
+            save_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            self.report_comparison(load_results(options['compare']), results, options['threshold'])
+
+    def run_size(self, csv_path, size, user, client, workdir, options):
+        """Run every selected operation for one generated file"""
+        operations = options['operations']
+        repeat = options['repeat']
+        size_results = {'file_size': os.path.getsize(csv_path)}
+
+        df = pd.read_csv(csv_path)
+
+        if 'read_csv' in operations:
+            size_results['read_csv'] = self.timed('read_csv', lambda: pd.read_csv(csv_path), repeat)
+
+        if 'analyze' in operations:
+            size_results['analyze'] = self.timed('analyze', lambda: analyze_csv_data(df), repeat)
+
+        if 'analyze_parallel' in operations:
+            from analyzer.parallel import analyze_csv_data_parallel
+            workers = options['workers']
+            size_results['analyze_parallel'] = self.timed(
+                'analyze_parallel', lambda: analyze_csv_data_parallel(df, workers=workers), repeat,
+                # Start the pool outside the timed runs
+                setup=lambda: analyze_csv_data_parallel(df.head(100), workers=workers)
+            )
+
+        if 'report' in operations:
+            analysis = analyze_csv_data(df)
+            dataset = Dataset.objects.create(
+                user=user, filename=os.path.basename(csv_path),
+                total_records=analysis['total_records'],
+                summary_stats=analysis['summary_stats'],
+                equipment_types=analysis['equipment_types'],
+                columns=analysis['columns'],
+            )
+
+            def report():
+                os.remove(generate_pdf_report(dataset, df, user))
+
+            size_results['report'] = self.timed('report', report, repeat)
+            dataset.delete()
+
+        del df
+
+        dataset_id = None
+        if 'upload' in operations or 'data_page' in operations:
+            def upload():
+                nonlocal dataset_id
+                with open(csv_path, 'rb') as f:
+                    response = client.post('/api/datasets/upload/', {'file': f})
+                if response.status_code != 201:
+                    raise CommandError(f"Upload failed ({response.status_code}): {response.content[:200]!r}")
+                dataset_id = response.json()['dataset']['id']
+
+            timing = self.timed('upload', upload, repeat if 'upload' in operations else 1)
+            if 'upload' in operations:
+                size_results['upload'] = timing
+
+        if 'data_page' in operations:
+            page_size = options['page_size']
+            last_page = max(1, (size + page_size - 1) // page_size)
+            for label, page in (('data_page_first', 1), ('data_page_last', last_page)):
+                url = f'/api/datasets/{dataset_id}/data/?page={page}&page_size={page_size}'
+
+                def fetch(url=url):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f"Data request failed ({response.status_code})")
+
+                size_results[label] = self.timed(label, fetch, repeat)
+
+        if 'cleanup' in operations:
+            size_results['cleanup'] = self.timed(
+                'cleanup', lambda: cleanup_old_datasets(user, max_count=settings.MAX_DATASET_HISTORY),
+                repeat, setup=lambda: self.seed_datasets(user, csv_path, workdir, options['cleanup_datasets'])
+            )
+
+        if 'concurrent' in operations:
+            size_results['concurrent'] = self.concurrent_load(client, csv_path, options)
+
+        Dataset.objects.filter(user=user).delete()
+        return size_results
+
+    def concurrent_load(self, client, csv_path, options):
+        """Read latency and throughput on the generated file while other threads upload"""
+        upload_path = os.path.join(os.path.dirname(csv_path), 'concurrent_upload.csv')
+        if not os.path.exists(upload_path):
+            generate_equipment_csv(upload_path, CONCURRENT_UPLOAD_ROWS,
+                                   numeric_columns=options['numeric_columns'],
+                                   type_cardinality=options['types'], seed=options['seed'])
+
+        with open(csv_path, 'rb') as f:
+            response = client.post('/api/datasets/upload/', {'file': f})
+        if response.status_code != 201:
+            raise CommandError(f"Upload failed ({response.status_code}): {response.content[:200]!r}")
+        dataset_id = response.json()['dataset']['id']
+        token = Token.objects.get(user__username='benchmark').key
+        urls = ['/api/datasets/history/', f'/api/datasets/{dataset_id}/summary/']
+
+        def read():
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            for url in urls:
+                if client.get(url).status_code != 200:
+                    raise RuntimeError(f"Read failed: {url}")
+
+        def write():
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            with open(upload_path, 'rb') as f:
+                response = client.post('/api/datasets/upload/', {'file': f})
+            if response.status_code != 201:
+                raise RuntimeError(f"Upload failed ({response.status_code})")
+
+        # Keep the dataset being read out of the writers' retention window
+        with override_settings(MAX_DATASET_HISTORY=10 ** 6):
+            result = run_concurrently(read, write, readers=options['readers'],
+                                      writers=options['writers'], duration=options['duration'],
+                                      teardown=lambda: connection.close())
+        self.stdout.write(
+            f"  {'concurrent':<16} {result['reads_per_sec']:8.1f} reads/s "
+            f"{result['writes_per_sec']:6.1f} writes/s  read median {result['median'] * 1000:.2f} ms  "
+            f"errors {result['read_errors']}/{result['write_errors']}"
+        )
+        return result
+
+    def seed_datasets(self, user, csv_path, workdir, count):
+        """Create datasets backed by hard links to the generated file"""
+        datasets_dir = os.path.join(settings.MEDIA_ROOT, 'datasets')
+        os.makedirs(datasets_dir, exist_ok=True)
+
+        for i in range(count):
+            name = f'seed_{i}_{os.path.basename(csv_path)}'
+            target = os.path.join(datasets_dir, name)
+            if not os.path.exists(target):
+                try:
+                    os.link(csv_path, target)
+                except OSError:
+                    shutil.copyfile(csv_path, target)
+            Dataset.objects.create(user=user, filename=name, file=f'datasets/{name}')
+
+    def timed(self, label, func, repeat, setup=None):
+        timing = time_call(func, repeat=repeat, setup=setup)
+        self.stdout.write(f"  {label:<16} median {timing['median'] * 1000:10.2f} ms")
+        return timing
+
+    def report_comparison(self, baseline, current, threshold):
+        comparisons = compare_results(baseline, current, threshold)
+        regressions = [c for c in comparisons if c['regression']]
+
+        for c in comparisons:
+            line = (f"{c['rows']:>10} {c['operation']:<16} "
+                    f"{c['baseline'] * 1000:10.2f} ms -> {c['current'] * 1000:10.2f} ms "
+                    f"({c['ratio']:.2f}x)")
+            self.stdout.write(self.style.ERROR(line) if c['regression'] else line)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark(s) regressed by more than {threshold:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions detected"))
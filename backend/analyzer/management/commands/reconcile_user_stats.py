@@ -0,0 +1,49 @@
+# analyzer/management/commands/reconcile_user_stats.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.counters import COUNTER_FIELDS, compute, reconcile
+from analyzer.models import UserStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount each user's datasets, reports and bytes (as uploaded) and fix "
+        "UserStats rows that drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only reconcile this user (repeatable)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        checked = drifted = 0
+        for user_id, username in users.values_list('id', 'username').iterator():
+            checked += 1
+            if options['dry_run']:
+                stats = UserStats.objects.filter(user_id=user_id).values(*COUNTER_FIELDS).first()
+                before, after = stats, compute(user_id)
+            else:
+                before, after = reconcile(user_id)
+            if before == after:
+                continue
+
+            drifted += 1
+            if before is None:
+                self.stdout.write(f"{username}: no stats row, counted {after}")
+            else:
+                changes = ', '.join(f"{name} {before[name]} -> {after[name]}"
+                                    for name in COUNTER_FIELDS if before[name] != after[name])
+                self.stdout.write(f"{username}: {changes}")
+
+        verb = 'would fix' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, {verb} {drifted}"))
@@ -0,0 +1,89 @@
+# analyzer/management/commands/relocate_media.py
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from analyzer.models import AnalysisReport, Dataset
+from analyzer.storage import ShardedStorage, is_sharded
+
+
+# (model, file field) pairs whose files are relocated
+FILE_FIELDS = [(Dataset, 'file'), (AnalysisReport, 'report_file')]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move dataset and report files from the flat media layout into the "
+        "sharded, content-hashed layout, in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Records updated per transaction')
+        parser.add_argument('--limit', type=int,
+                            help='Stop after relocating this many files')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the files that would move without moving them')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ShardedStorage):
+            raise CommandError("The default storage is not analyzer.storage.ShardedStorage")
+
+        remaining = options['limit']
+        for model, field in FILE_FIELDS:
+            moved, missing = self.relocate_model(model, field, options['batch_size'],
+                                                 remaining, options['dry_run'])
+            verb = 'would move' if options['dry_run'] else 'moved'
+            self.stdout.write(f"{model.__name__}: {verb} {moved} files, {missing} missing")
+            if remaining is not None:
+                remaining -= moved
+                if remaining <= 0:
+                    break
+
+    def relocate_model(self, model, field, batch_size, limit, dry_run):
+        moved = missing = 0
+        last_pk = 0
+        while limit is None or moved < limit:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).exclude(**{field: ''})
+                .order_by('pk').values_list('pk', field)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            updates = []
+            for pk, name in batch:
+                if is_sharded(name):
+                    continue
+                if limit is not None and moved + len(updates) >= limit:
+                    break
+                if not default_storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"{model.__name__} {pk}: {name} not found")
+                    continue
+                updates.append((pk, name, None if dry_run else default_storage.relocate(name)))
+
+            if not dry_run and updates:
+                unreferenced = []
+                with transaction.atomic():
+                    for pk, name, new_name in updates:
+                        # Only records still pointing at the old file move; for
+                        # the others (deleted meanwhile) drop the new copy
+                        if model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name}):
+                            unreferenced.append(name)
+                        else:
+                            unreferenced.append(new_name)
+                    # The old files are unreferenced once the new names commit
+                    transaction.on_commit(lambda names=unreferenced: self.remove(names))
+            moved += len(updates)
+        return moved, missing
+
+    def remove(self, names):
+        for name in names:
+            try:
+                os.remove(default_storage.path(name))
+            except OSError as e:
+                self.stderr.write(f"Error deleting {name}: {e}")
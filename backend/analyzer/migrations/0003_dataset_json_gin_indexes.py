@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# GIN indexes (default jsonb_ops, so has_key lookups can use them) only
+# exist on PostgreSQL; other backends skip this migration
+GIN_INDEXES = [
+    ('analyzer_dataset_summary_stats_gin', 'summary_stats'),
+    ('analyzer_dataset_equipment_types_gin', 'equipment_types'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON analyzer_dataset '
+            f'USING gin ({column})'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_dataset_stats_payload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
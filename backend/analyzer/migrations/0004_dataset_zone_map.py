@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_dataset_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='zone_map',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
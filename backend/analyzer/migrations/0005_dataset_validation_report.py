@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_dataset_zone_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='validation_report',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def backfill_user_stats(apps, schema_editor):
+    """Record existing report sizes and build every user's counters"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Dataset = apps.get_model('analyzer', 'Dataset')
+    AnalysisReport = apps.get_model('analyzer', 'AnalysisReport')
+    UserStats = apps.get_model('analyzer', 'UserStats')
+
+    for report in AnalysisReport.objects.exclude(report_file=''):
+        try:
+            report.file_size = report.report_file.size
+        except OSError:
+            continue
+        report.save(update_fields=['file_size'])
+
+    datasets = {row['user']: row for row in
+                Dataset.objects.values('user').annotate(n=Count('id'), size=Sum('file_size'))}
+    reports = {row['user']: row for row in
+               AnalysisReport.objects.values('user').annotate(n=Count('id'), size=Sum('file_size'))}
+    empty = {'n': 0, 'size': 0}
+    UserStats.objects.bulk_create([
+        UserStats(
+            user_id=user_id,
+            dataset_count=datasets.get(user_id, empty)['n'],
+            dataset_bytes=datasets.get(user_id, empty)['size'] or 0,
+            report_count=reports.get(user_id, empty)['n'],
+            report_bytes=reports.get(user_id, empty)['size'] or 0,
+        )
+        for user_id in User.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('analyzer', '0005_dataset_validation_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('dataset_count', models.IntegerField(default=0)),
+                ('report_count', models.IntegerField(default=0)),
+                ('dataset_bytes', models.BigIntegerField(default=0)),
+                ('report_bytes', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='analysisreport',
+            name='file_size',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:00
+
+from django.db import migrations, models
+
+
+def backfill_stored_size(apps, schema_editor):
+    """Record the on-disk size of existing dataset files"""
+    Dataset = apps.get_model('analyzer', 'Dataset')
+    for dataset in Dataset.objects.exclude(file='').iterator():
+        try:
+            dataset.stored_size = dataset.file.size
+        except OSError:
+            continue
+        dataset.save(update_fields=['stored_size'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='stored_size',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_stored_size, migrations.RunPython.noop),
+    ]
@@ -16,9 +16,19 @@ class Dataset(models.Model):
     total_records = models.IntegerField(default=0)
     summary_stats = models.JSONField(default=dict, blank=True)
     equipment_types = models.JSONField(default=dict, blank=True)
+    type_stats = models.JSONField(default=dict, blank=True)
+    histograms = models.JSONField(default=dict, blank=True)
+    stats_version = models.IntegerField(default=0)
+    
+    # Encoding, coercion/range error counts and quarantined rows (see ingest.py)
+    validation_report = models.JSONField(default=dict, blank=True)
+    
+    # Per-block min/max/null counts and Type sets (see zonemap.py)
+    zone_map = models.JSONField(default=dict, blank=True)
     
     # Metadata
-    file_size = models.IntegerField(default=0)  # in bytes
+    file_size = models.IntegerField(default=0)  # in bytes, as uploaded
+    stored_size = models.IntegerField(default=0)  # in bytes on disk (compressed)
     columns = models.JSONField(default=list, blank=True)
     
     class Meta:
@@ -43,6 +53,29 @@ class Dataset(models.Model):
             'summary_stats': self.summary_stats,
             'equipment_types': self.equipment_types,
         }
+    
+    def apply_analysis(self, analysis):
+        """Copy the output of analyze_csv_data onto this dataset (not saved)"""
+        self.total_records = analysis['total_records']
+        self.columns = analysis['columns']
+        self.summary_stats = analysis['summary_stats']
+        self.equipment_types = analysis['equipment_types']
+        self.type_stats = analysis['type_stats']
+        self.histograms = analysis['histograms']
+        self.stats_version = analysis['stats_version']
+    
+    def get_stats_payload(self):
+        """Return the canonical stats payload shared by the web and desktop clients"""
+        return {
+            'stats_version': self.stats_version,
+            'dataset_id': self.id,
+            'total_records': self.total_records,
+            'columns': self.columns,
+            'summary_stats': self.summary_stats,
+            'equipment_types': self.equipment_types,
+            'type_stats': self.type_stats,
+            'histograms': self.histograms,
+        }
 
 
 class AnalysisReport(models.Model):
@@ -52,9 +85,35 @@ class AnalysisReport(models.Model):
     report_file = models.FileField(upload_to='reports/')
     generated_at = models.DateTimeField(default=timezone.now)
     report_type = models.CharField(max_length=50, default='summary')
+    file_size = models.IntegerField(default=0)  # in bytes
     
     class Meta:
         ordering = ['-generated_at']
     
     def __str__(self):
         return f"Report for {self.dataset.filename} - {self.generated_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class UserStats(models.Model):
+    """
+    Per-user dataset and report counts and bytes
+    
+    Kept current in the same transaction as every dataset or report insert and
+    delete (see counters.py), so profile and quota checks read one row.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='stats')
+    dataset_count = models.IntegerField(default=0)
+    report_count = models.IntegerField(default=0)
+    dataset_bytes = models.BigIntegerField(default=0)  # sum of Dataset.file_size (as uploaded)
+    report_bytes = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'user stats'
+    
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+    
+    @property
+    def total_bytes(self):
+        return self.dataset_bytes + self.report_bytes
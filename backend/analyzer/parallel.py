@@ -0,0 +1,263 @@
+# analyzer/parallel.py
+"""
+Multiprocess version of analyze_csv_data for very large datasets
+
+The numeric columns (and the Type codes) are copied once into a shared
+memory block; worker processes attach to it by name and compute partial
+statistics over row chunks, so no arrays are pickled between processes.
+The parent merges the partials:
+
+- count/mean/std/min/max per column and per type merge exactly through
+  merge_summary_stats
+- histograms are computed in a second pass against the global min/max and
+  their counts summed
+- medians do not merge, so each one is a separate per-column task
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .utils import STATS_VERSION, _finite, merge_summary_stats
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers):
+    """
+    Process pool shared by all requests in this server process
+
+    The pool is sized by the first caller and then kept for the life of the
+    process; later callers share it whatever `workers` they ask for, so a
+    running analysis never has its pool shut down by another request.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers never inherit the server's threads or DB connections
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+def _attach(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+def _moments(values):
+    """count/mean/std/min/max of a 1-D array, ignoring NaN"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'std': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+
+
+def _chunk_stats(name, shape, start, stop, n_types):
+    """Partial stats of rows [start, stop) for every column, and per type"""
+    block, matrix = _attach(name, shape)
+    try:
+        # Last row holds Type codes when n_types > 0
+        n_cols = shape[0] - (1 if n_types else 0)
+        columns = [_moments(matrix[i, start:stop]) for i in range(n_cols)]
+
+        per_type = []
+        if n_types:
+            codes = matrix[-1, start:stop].astype(np.int64)
+            # Rows without a Type (code -1) belong to no group, as in pandas
+            known = codes >= 0
+            frame = pd.DataFrame(matrix[:n_cols, start:stop].T[known])
+            grouped = frame.groupby(codes[known]).agg(['count', 'mean', 'std', 'min', 'max'])
+            for code, row in grouped.iterrows():
+                per_type.append((int(code), [
+                    {
+                        'count': int(row[(i, 'count')]),
+                        'mean': float(row[(i, 'mean')]),
+                        'std': float(row[(i, 'std')]) if row[(i, 'count')] > 1 else 0.0,
+                        'min': float(row[(i, 'min')]),
+                        'max': float(row[(i, 'max')]),
+                    } if row[(i, 'count')] else None
+                    for i in range(n_cols)
+                ]))
+        return columns, per_type
+    finally:
+        del matrix
+        block.close()
+
+
+def _chunk_histograms(name, shape, start, stop, bins):
+    """Histogram counts of rows [start, stop) against global (n_bins, low, high)"""
+    block, matrix = _attach(name, shape)
+    try:
+        counts = []
+        for i, spec in enumerate(bins):
+            if spec is None:
+                counts.append(None)
+                continue
+            n_bins, low, high = spec
+            values = matrix[i, start:stop]
+            values = values[np.isfinite(values)]
+            counts.append(np.histogram(values, bins=n_bins, range=(low, high))[0])
+        return counts
+    finally:
+        del matrix
+        block.close()
+
+
+def _column_median(name, shape, index):
+    block, matrix = _attach(name, shape)
+    try:
+        values = matrix[index]
+        values = values[~np.isnan(values)]
+        return float(np.median(values)) if len(values) else None
+    finally:
+        del matrix
+        block.close()
+
+
+# ------------------------------------------------------------
+# Parent side
+# ------------------------------------------------------------
+def analyze_csv_data_parallel(df, workers=None, chunks=None):
+    """
+    Same result as analyze_csv_data, computed across worker processes
+
+    Args:
+        df: pandas DataFrame
+        workers: Worker processes (default: all cores); sizes the shared pool
+            only when this is the first call in the process
+        chunks: Row chunks (default: one per worker)
+
+    Returns:
+        dict: Analysis results in the analyze_csv_data format
+    """
+    workers = workers or default_workers()
+    chunks = chunks or workers
+    executor = get_executor(workers)
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    has_type = 'Type' in df.columns
+    n_rows = len(df)
+
+    type_names = []
+    type_codes = None
+    if has_type:
+        type_codes, type_names = pd.factorize(df['Type'], sort=False)
+
+    analysis = {
+        'stats_version': STATS_VERSION,
+        'total_records': n_rows,
+        'columns': df.columns.tolist(),
+    }
+
+    n_types = len(type_names) if has_type and numeric_cols else 0
+    shape = (len(numeric_cols) + (1 if n_types else 0), n_rows)
+    block = None
+    try:
+        if numeric_cols and n_rows:
+            block = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * n_rows * 8))
+            matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+            for i, col in enumerate(numeric_cols):
+                matrix[i] = df[col].to_numpy(dtype=np.float64)
+            if n_types:
+                # Missing Types keep factorize's code -1 (skipped by the workers)
+                matrix[-1] = type_codes
+            del matrix
+
+            bounds = np.linspace(0, n_rows, chunks + 1).astype(int)
+            ranges = [(bounds[i], bounds[i + 1]) for i in range(chunks) if bounds[i + 1] > bounds[i]]
+
+            stat_futures = [executor.submit(_chunk_stats, block.name, shape, a, b, n_types)
+                            for a, b in ranges]
+            median_futures = [executor.submit(_column_median, block.name, shape, i)
+                              for i in range(len(numeric_cols))]
+            partials = [f.result() for f in stat_futures]
+
+            merged = [merge_summary_stats(p[0][i] for p in partials) for i in range(len(numeric_cols))]
+
+            # Histogram pass against the global ranges (same rule as _histogram)
+            bins = []
+            for stats in merged:
+                if stats['count'] == 0:
+                    bins.append(None)
+                else:
+                    bins.append((min(20, max(5, stats['count'] // 3)), stats['min'], stats['max']))
+            hist_futures = [executor.submit(_chunk_histograms, block.name, shape, a, b, bins)
+                            for a, b in ranges]
+            hist_parts = [f.result() for f in hist_futures]
+            medians = [f.result() for f in median_futures]
+
+            summary_stats = {}
+            histograms = {}
+            for i, col in enumerate(numeric_cols):
+                stats = merged[i]
+                summary_stats[col] = {
+                    'mean': _finite(stats['mean']) if stats['mean'] is not None else None,
+                    'median': medians[i],
+                    'std': stats['std'],
+                    'min': stats['min'],
+                    'max': stats['max'],
+                    'count': int(stats['count']),
+                }
+                if bins[i] is None:
+                    histograms[col] = {'counts': [], 'edges': []}
+                else:
+                    n_bins, low, high = bins[i]
+                    counts = np.sum([part[i] for part in hist_parts], axis=0)
+                    edges = np.histogram_bin_edges([], bins=n_bins, range=(low, high))
+                    histograms[col] = {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+            type_stats = {}
+            if n_types:
+                by_code = {}
+                for _, per_type in partials:
+                    for code, stats in per_type:
+                        by_code.setdefault(code, []).append(stats)
+                for code in sorted(by_code):
+                    type_stats[str(type_names[code])] = {}
+                    for i, col in enumerate(numeric_cols):
+                        stats = merge_summary_stats(p[i] for p in by_code[code] if p[i] is not None)
+                        type_stats[str(type_names[code])][col] = {
+                            'mean': stats['mean'],
+                            'std': stats['std'],
+                            'min': stats['min'],
+                            'max': stats['max'],
+                            'count': int(stats['count']),
+                        }
+        else:
+            summary_stats, histograms, type_stats = {}, {}, {}
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    analysis['summary_stats'] = summary_stats
+    analysis['histograms'] = histograms
+
+    equipment_types = {}
+    if has_type:
+        type_counts = df['Type'].value_counts().to_dict()
+        equipment_types = {str(k): int(v) for k, v in type_counts.items()}
+    analysis['equipment_types'] = equipment_types
+    analysis['type_stats'] = type_stats
+
+    return analysis
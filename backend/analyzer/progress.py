@@ -0,0 +1,230 @@
+# analyzer/progress.py
+"""
+Progress events for uploads and report jobs, streamed as Server-Sent Events.
+
+A client picks a job id, sends it in the X-Job-Id header of the upload or
+generate_report request and reads /api/jobs/<job id>/events/ meanwhile.
+Job ids are scoped to the requesting user on the server, so two users
+choosing the same id never see each other's events.
+
+Each event is its own cache entry (PROGRESS_CACHE_ALIAS; use a shared
+backend when several workers serve requests), numbered by an atomic
+cache.incr on the job's counter, so concurrent writers never overwrite each
+other. The stream polls the counter until a terminal event arrives.
+
+SSE messages carry the event number as their id. The WSGI stream closes
+after SYNC_STREAM_TIMEOUT so it never holds a worker thread for long; the
+client reconnects with Last-Event-ID and the stream resumes after it. The
+ASGI stream waits without a thread and stays open up to STREAM_TIMEOUT.
+
+Events: bytes_received (WSGI uploads only), rows_parsed, stats_computed,
+pdf_page, done, error.
+"""
+import asyncio
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework.renderers import BaseRenderer
+
+
+# Seconds a job's events are kept after its last update
+PROGRESS_TTL = 600
+
+# Seconds between checks for new events, between keep-alive comments, and
+# before an unfinished stream is closed (WSGI streams close much sooner,
+# since each one holds a worker thread)
+POLL_INTERVAL = 0.25
+KEEPALIVE_INTERVAL = 15
+STREAM_TIMEOUT = PROGRESS_TTL
+SYNC_STREAM_TIMEOUT = 20
+
+# Milliseconds an SSE client waits before reconnecting to a closed stream
+RECONNECT_DELAY = 500
+
+TERMINAL_EVENTS = ('done', 'error')
+
+_JOB_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def _cache():
+    return caches[settings.PROGRESS_CACHE_ALIAS]
+
+
+def _key(user_id, job_id):
+    return f'progress:{user_id}:{job_id}'
+
+
+def is_job_id(value):
+    return bool(_JOB_ID.match(value or ''))
+
+
+def job_id_from(request):
+    """The X-Job-Id header of a request, or None when absent or malformed"""
+    job_id = request.headers.get('X-Job-Id', '')
+    return job_id if is_job_id(job_id) else None
+
+
+def last_event_id(request):
+    """Events a reconnecting SSE client already has (its Last-Event-ID header)"""
+    value = request.headers.get('Last-Event-ID', '')
+    return int(value) if value.isdigit() else 0
+
+
+class ProgressReporter:
+    """
+    Appends events to one job; a no-op without a job id
+
+    Args:
+        job_id: Client-chosen job id (see job_id_from)
+        user_id: Owner of the job; the id is only looked up under this user
+    """
+
+    def __init__(self, job_id, user_id):
+        self.job_id = job_id
+        self.user_id = user_id
+
+    def __call__(self, event, **data):
+        if not self.job_id:
+            return
+        cache = _cache()
+        key = _key(self.user_id, self.job_id)
+        cache.add(key, 0, PROGRESS_TTL)
+        number = cache.incr(key)
+        cache.touch(key, PROGRESS_TTL)
+        cache.set(f'{key}:{number}', dict(data, event=event), PROGRESS_TTL)
+
+
+def _event_keys(key, sent, count):
+    return [f'{key}:{number}' for number in range(sent + 1, count + 1)]
+
+
+def _in_order(keys, found):
+    # A number that was taken but whose event is not written yet ends the batch
+    events = []
+    for key in keys:
+        if key not in found:
+            break
+        events.append(found[key])
+    return events
+
+
+def read_events(job_id, user_id, sent=0):
+    """Events of a job after the first `sent`, in order"""
+    cache = _cache()
+    key = _key(user_id, job_id)
+    keys = _event_keys(key, sent, cache.get(key) or 0)
+    return _in_order(keys, cache.get_many(keys)) if keys else []
+
+
+async def aread_events(job_id, user_id, sent=0):
+    cache = _cache()
+    key = _key(user_id, job_id)
+    keys = _event_keys(key, sent, await cache.aget(key) or 0)
+    return _in_order(keys, await cache.aget_many(keys)) if keys else []
+
+
+def format_event(event, number):
+    """One event as an SSE message"""
+    return f"id: {number}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _is_finished(events):
+    return any(event['event'] in TERMINAL_EVENTS for event in events)
+
+
+def event_stream(job_id, user_id, sent=0, timeout=SYNC_STREAM_TIMEOUT):
+    """SSE messages for a job until a terminal event or `timeout` seconds"""
+    yield f'retry: {RECONNECT_DELAY}\n: connected\n\n'
+    last_write = time.monotonic()
+    deadline = last_write + timeout
+    while time.monotonic() < deadline:
+        events = read_events(job_id, user_id, sent)
+        for event in events:
+            sent += 1
+            yield format_event(event, sent)
+        if _is_finished(events):
+            return
+
+        now = time.monotonic()
+        if events:
+            last_write = now
+        elif now - last_write >= KEEPALIVE_INTERVAL:
+            last_write = now
+            yield ': keep-alive\n\n'
+        time.sleep(POLL_INTERVAL)
+
+
+async def aevent_stream(job_id, user_id, sent=0, timeout=STREAM_TIMEOUT):
+    """event_stream for ASGI, waiting without holding a thread"""
+    yield f'retry: {RECONNECT_DELAY}\n: connected\n\n'
+    last_write = time.monotonic()
+    deadline = last_write + timeout
+    while time.monotonic() < deadline:
+        events = await aread_events(job_id, user_id, sent)
+        for event in events:
+            sent += 1
+            yield format_event(event, sent)
+        if _is_finished(events):
+            return
+
+        now = time.monotonic()
+        if events:
+            last_write = now
+        elif now - last_write >= KEEPALIVE_INTERVAL:
+            last_write = now
+            yield ': keep-alive\n\n'
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def stream_headers(response):
+    """Headers that keep proxies from buffering or caching an event stream"""
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF accept `Accept: text/event-stream`
+
+    The stream itself bypasses renderers; only error payloads (401, 404)
+    are rendered here.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class ProgressUploadHandler(FileUploadHandler):
+    """Reports bytes_received while Django reads a multipart upload"""
+
+    # Report roughly every 5% of the request body
+    STEPS = 20
+
+    def __init__(self, request, reporter):
+        super().__init__(request)
+        self.reporter = reporter
+        self.received = 0
+        self.reported = 0
+        self.total = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.total = content_length
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if not self.total or self.received - self.reported >= self.total / self.STEPS:
+            self.reported = self.received
+            self.reporter('bytes_received', bytes=self.received, total=self.total)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.reported != self.received:
+            self.reporter('bytes_received', bytes=self.received, total=self.total)
+        return None
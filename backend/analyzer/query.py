@@ -0,0 +1,159 @@
+# analyzer/query.py
+"""
+Filter, sort and projection for dataset rows
+
+Query strings accepted by the data endpoint:
+
+    filter=Type == Pump and Pressure > 50
+    filter=Type in Pump,Valve and Temperature <= 80.5
+    sort=-Pressure,Type
+    columns=Equipment Name,Pressure
+
+Filters are clauses joined with "and"; each clause is evaluated as a NumPy
+boolean mask over the whole column, and the masks are combined with &.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class QueryError(ValueError):
+    """Raised for malformed or unsupported query strings"""
+
+
+# Longest operators first so ">=" is not read as ">"
+_CLAUSE = re.compile(r'^\s*(.+?)\s*(==|!=|>=|<=|>|<|\s+in\s+)\s*(.+?)\s*$', re.IGNORECASE)
+_AND = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+_COMPARISONS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+        return value[1:-1]
+    return value
+
+
+def parse_filter(expression):
+    """
+    Parse a filter expression into (column, operator, value) clauses
+
+    Returns:
+        list: Clauses; for "in" the value is a list of strings
+    """
+    clauses = []
+    for part in _AND.split(expression.strip()):
+        match = _CLAUSE.match(part)
+        if not match:
+            raise QueryError(f"Cannot parse filter clause '{part}'")
+        column, op, value = match.groups()
+        op = op.strip().lower()
+        if op == 'in':
+            value = [_unquote(v.strip()) for v in value.split(',') if v.strip()]
+        else:
+            value = _unquote(value)
+        clauses.append((_unquote(column), op, value))
+    return clauses
+
+
+def parse_sort(expression):
+    """Parse "-Pressure,Type" into [('Pressure', False), ('Type', True)]"""
+    keys = []
+    for part in expression.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if part[0] in '+-':
+            keys.append((part[1:].strip(), part[0] == '+'))
+        else:
+            keys.append((part, True))
+    return keys
+
+
+def parse_columns(expression):
+    return [c.strip() for c in expression.split(',') if c.strip()]
+
+
+def referenced_columns(clauses, sort_keys, columns):
+    """Columns that must be read to answer the query, in projection order"""
+    needed = list(columns)
+    for name in [c for c, _, _ in clauses] + [c for c, _ in sort_keys]:
+        if name not in needed:
+            needed.append(name)
+    return needed
+
+
+def validate_columns(names, available):
+    missing = [name for name in names if name not in available]
+    if missing:
+        raise QueryError(f"Unknown column(s): {', '.join(missing)}")
+
+
+def _clause_mask(series, op, value):
+    values = series.to_numpy()
+    numeric = pd.api.types.is_numeric_dtype(series)
+
+    if op == 'in':
+        if numeric:
+            try:
+                targets = [float(v) for v in value]
+            except ValueError:
+                raise QueryError(f"'{series.name}' is numeric; 'in' values must be numbers")
+            return np.isin(values, targets)
+        return series.astype(str).isin(value).to_numpy()
+
+    if numeric:
+        try:
+            target = float(value)
+        except ValueError:
+            raise QueryError(f"'{series.name}' is numeric; cannot compare with '{value}'")
+        # NaN compares False, so rows with missing values never match
+        with np.errstate(invalid='ignore'):
+            return _COMPARISONS[op](values, target)
+
+    if op not in ('==', '!='):
+        raise QueryError(f"Operator '{op}' is only supported on numeric columns")
+    mask = (series.astype(str) == value).to_numpy()
+    return mask if op == '==' else ~mask
+
+
+def filter_mask(df, clauses):
+    """Boolean mask of rows matching every clause"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in clauses:
+        mask &= _clause_mask(df[column], op, value)
+    return mask
+
+
+def apply_query(df, clauses=(), sort_keys=(), columns=()):
+    """
+    Filter, sort and project a DataFrame
+
+    Args:
+        df: DataFrame containing every referenced column
+        clauses: Output of parse_filter
+        sort_keys: Output of parse_sort
+        columns: Columns to keep (all when empty)
+
+    Returns:
+        DataFrame: Matching rows in the requested order
+    """
+    if clauses:
+        df = df[filter_mask(df, clauses)]
+    if sort_keys:
+        df = df.sort_values(
+            [c for c, _ in sort_keys],
+            ascending=[asc for _, asc in sort_keys],
+            kind='stable',
+        )
+    if columns:
+        df = df[list(columns)]
+    return df
@@ -0,0 +1,176 @@
+# analyzer/response_cache.py
+"""
+Two-tier cache for the summary, history and profile responses.
+
+Lookups go to an in-process LRU first (RESPONSE_CACHE_LOCAL_TTL, a few
+seconds) and then to a Django cache backend (RESPONSE_CACHE_ALIAS: locmem by
+default, Redis with several workers).
+
+Entries belong to a scope, either a user or a dataset. Each scope has a
+version stored in the shared tier and included in every key. Invalidating a
+scope stores a new version, so all of its entries are dropped at once
+without listing them. post_save/post_delete on Dataset and AnalysisReport
+(and on User, for the profile) invalidate the scopes they affect. Another
+worker may serve a stale entry from its local tier for at most
+RESPONSE_CACHE_LOCAL_TTL seconds.
+
+Hits and misses per endpoint and tier are counted in each process; see
+metrics() and the /api/cache/metrics/ endpoint.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import TTLCache
+
+
+_local = TTLCache(settings.RESPONSE_CACHE_LOCAL_SIZE, settings.RESPONSE_CACHE_LOCAL_TTL)
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def _shared():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _count(name, outcome):
+    with _counts_lock:
+        _counts[(name, outcome)] += 1
+
+
+def _version_key(scope):
+    return f'resp-version:{scope}'
+
+
+def _version(scope):
+    key = _version_key(scope)
+    version = _local.get(key)
+    if version is None:
+        version = _shared().get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            # add() so concurrent first requests agree on one version
+            if not _shared().add(key, version, None):
+                version = _shared().get(key, version)
+        _local.set(key, version)
+    return version
+
+
+def _key(name, scope, params):
+    # Params may hold any text (hosts, types); hash them into a safe key
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'resp:{name}:{scope}:{_version(scope)}:{digest}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def dataset_scope(dataset_id):
+    return f'dataset:{dataset_id}'
+
+
+def lookup(name, scope, **params):
+    """
+    Look up a cached response payload
+
+    Args:
+        name: Endpoint name, used for the key and the metrics
+        scope: user_scope() or dataset_scope() the payload depends on
+        **params: Anything else the payload depends on
+
+    Returns:
+        tuple: (key, payload), payload None on a miss; pass key to store()
+    """
+    key = _key(name, scope, params)
+    payload = _local.get(key)
+    if payload is not None:
+        _count(name, 'local_hit')
+        return key, payload
+
+    payload = _shared().get(key)
+    if payload is not None:
+        _count(name, 'shared_hit')
+        _local.set(key, payload)
+        return key, payload
+
+    _count(name, 'miss')
+    return key, None
+
+
+def store(key, payload):
+    """Cache a payload under a key returned by lookup()"""
+    _local.set(key, payload)
+    _shared().set(key, payload, settings.RESPONSE_CACHE_TTL)
+
+
+def cached(name, scope, compute, **params):
+    """Cached payload, or compute() stored on a miss"""
+    key, payload = lookup(name, scope, **params)
+    if payload is None:
+        payload = compute()
+        store(key, payload)
+    return payload
+
+
+def invalidate(scope):
+    """Drop every cached response of a scope, in all workers"""
+    version = uuid.uuid4().hex
+    _shared().set(_version_key(scope), version, None)
+    _local.set(_version_key(scope), version)
+
+
+def metrics():
+    """Per-endpoint hit/miss counts of this process"""
+    with _counts_lock:
+        counts = dict(_counts)
+    result = {}
+    for (name, outcome), value in sorted(counts.items()):
+        result.setdefault(name, {'local_hit': 0, 'shared_hit': 0, 'miss': 0})[outcome] = value
+    for entry in result.values():
+        total = sum(entry.values())
+        entry['hit_ratio'] = round((total - entry['miss']) / total, 4) if total else 0.0
+    return {'endpoints': result, 'local_entries': len(_local)}
+
+
+def _invalidate_on_commit(*scopes):
+    # A request recomputing before the commit would cache the old rows
+    # under the new version, so invalidate once the change is visible
+    transaction.on_commit(lambda: [invalidate(scope) for scope in scopes])
+
+
+def _dataset_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(dataset_scope(instance.pk), user_scope(instance.user_id))
+
+
+def _report_changed(sender, instance, **kwargs):
+    # Reports only show up in the profile's reports_count
+    _invalidate_on_commit(user_scope(instance.user_id))
+
+
+def _user_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(user_scope(instance.pk))
+
+
+def connect_signals():
+    from .models import AnalysisReport, Dataset
+
+    post_save.connect(_dataset_changed, sender=Dataset,
+                      dispatch_uid='analyzer.response_cache.dataset_saved')
+    post_delete.connect(_dataset_changed, sender=Dataset,
+                        dispatch_uid='analyzer.response_cache.dataset_deleted')
+    post_save.connect(_report_changed, sender=AnalysisReport,
+                      dispatch_uid='analyzer.response_cache.report_saved')
+    post_delete.connect(_report_changed, sender=AnalysisReport,
+                        dispatch_uid='analyzer.response_cache.report_deleted')
+    post_save.connect(_user_changed, sender=get_user_model(),
+                      dispatch_uid='analyzer.response_cache.user_saved')
@@ -1,6 +1,8 @@
 # analyzer/serializers.py
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from .downloads import signed_url
 from .models import Dataset, AnalysisReport
 
 
@@ -20,19 +22,17 @@ class DatasetSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'filename', 'file', 'file_url', 'uploaded_at',
             'total_records', 'summary_stats', 'equipment_types',
-            'file_size', 'columns'
+            'file_size', 'stored_size', 'columns', 'validation_report'
         ]
         read_only_fields = [
-            'uploaded_at', 'total_records', 'summary_stats',
-            'equipment_types', 'file_size', 'columns'
+            'uploaded_at', 'total_records', 'summary_stats', 'equipment_types',
+            'file_size', 'stored_size', 'columns', 'validation_report'
         ]
     
     def get_file_url(self, obj):
-        request = self.context.get('request')
-        if obj.file and hasattr(obj.file, 'url'):
-            if request is not None:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
+        # Signed, expiring download URL (see downloads.py)
+        if obj.file and obj.pk:
+            return signed_url(self.context.get('request'), 'dataset-download', obj.pk)
         return None
 
 
@@ -45,9 +45,12 @@ class DatasetUploadSerializer(serializers.Serializer):
         if not value.name.endswith('.csv'):
             raise serializers.ValidationError("Only CSV files are allowed.")
         
-        # Check file size (max 10MB)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("File size cannot exceed 10MB.")
+        # Check file size (max 10MB by default)
+        max_size = settings.MAX_UPLOAD_SIZE
+        if value.size > max_size:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {max_size // (1024 * 1024)}MB."
+            )
         
         return value
 
@@ -67,11 +70,9 @@ class AnalysisReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['generated_at']
     
     def get_report_url(self, obj):
-        request = self.context.get('request')
-        if obj.report_file and hasattr(obj.report_file, 'url'):
-            if request is not None:
-                return request.build_absolute_uri(obj.report_file.url)
-            return obj.report_file.url
+        # Signed, expiring download URL (see downloads.py)
+        if obj.report_file and obj.pk:
+            return signed_url(self.context.get('request'), 'report-download', obj.pk)
         return None
 
 
@@ -81,6 +82,9 @@ class DataSummarySerializer(serializers.Serializer):
     columns = serializers.ListField(child=serializers.CharField())
     summary_stats = serializers.DictField()
     equipment_types = serializers.DictField()
+    type_stats = serializers.DictField()
+    histograms = serializers.DictField()
+    stats_version = serializers.IntegerField()
     dataset_id = serializers.IntegerField()
 
 
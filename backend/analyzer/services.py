@@ -0,0 +1,162 @@
+# analyzer/services.py
+"""
+File and CPU work behind the upload, summary and data endpoints.
+
+Except for save_dataset, these functions only read files and DataFrames and
+never touch the database, so they can run on any thread. The DRF views call
+them directly; the async views in async_views.py run them on a bounded
+executor.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .compression import compress_csv, read_csv
+from .ingest import ingest_csv
+from .query import (
+    apply_query, parse_columns, parse_filter, parse_sort, referenced_columns,
+    validate_columns
+)
+from .utils import analyze_csv_data, cleanup_old_datasets
+from .zonemap import blocks_for_clauses, blocks_for_rows, build_zone_map, read_blocks
+
+
+def process_upload(file, progress=None):
+    """
+    Parse, validate, analyze and index an uploaded CSV
+
+    Args:
+        file: Uploaded file object
+        progress: Optional ProgressReporter (see progress.py)
+
+    Returns:
+        dict: validation_report, content (bytes to store, compressed per
+              DATASET_COMPRESSION), extension (appended to the stored file
+              name), analysis (None when no row is valid) and zone_map
+    """
+    progress = progress or (lambda event, **data: None)
+
+    df, validation_report, content = ingest_csv(file)
+    progress('rows_parsed', rows=validation_report['parsed_rows'],
+             valid_rows=validation_report['valid_rows'])
+    if df.empty:
+        return {'validation_report': validation_report, 'content': content,
+                'extension': '', 'analysis': None, 'zone_map': {}}
+
+    analysis = analyze_csv_data(df)
+    progress('stats_computed', columns=len(analysis['summary_stats']))
+
+    # Block index so filtered and paged reads can skip most of the file;
+    # each block is stored as its own compressed frame
+    stored, zone_map, extension = compress_csv(content, build_zone_map(content, df))
+
+    return {
+        'validation_report': validation_report,
+        'content': stored,
+        'extension': extension,
+        'analysis': analysis,
+        'zone_map': zone_map,
+    }
+
+
+def save_dataset(dataset, user):
+    """Insert a new dataset and apply the history limit in one transaction"""
+    # The INSERT comes first so SQLite takes the write lock up front
+    with transaction.atomic():
+        dataset.save()
+
+        # Cleanup old datasets (keep only last 5)
+        cleanup_old_datasets(user, max_count=settings.MAX_DATASET_HISTORY)
+    return dataset
+
+
+def type_summary(dataset, equipment_type):
+    """
+    Analyze only the rows of one equipment type
+
+    Reads just the blocks whose zone map lists the type.
+
+    Returns:
+        dict: analyze_csv_data output, or None when the file has no Type column
+    """
+    clauses = [('Type', '==', equipment_type)]
+    if dataset.zone_map:
+        df = read_blocks(dataset.file.path, dataset.zone_map,
+                         blocks_for_clauses(dataset.zone_map, clauses))
+    else:
+        df = read_csv(dataset.file.path)
+    if 'Type' not in df.columns:
+        return None
+
+    analysis_result = analyze_csv_data(apply_query(df, clauses))
+    analysis_result.update({'dataset_id': dataset.id, 'type': equipment_type})
+    return analysis_result
+
+
+def parse_data_query(params, available_columns):
+    """
+    Parse the filter, sort and columns query params of the data endpoint
+
+    Raises:
+        QueryError: On malformed expressions or unknown columns
+    """
+    clauses = parse_filter(params['filter']) if params.get('filter') else []
+    sort_keys = parse_sort(params.get('sort', ''))
+    columns = parse_columns(params.get('columns', ''))
+
+    usecols = None
+    needed = referenced_columns(clauses, sort_keys, columns)
+    if needed and available_columns:
+        validate_columns(needed, available_columns)
+        if columns:
+            usecols = needed
+
+    return {'clauses': clauses, 'sort_keys': sort_keys, 'columns': columns, 'usecols': usecols}
+
+
+def read_data_page(dataset, query, page, page_size):
+    """
+    Read one page of (filtered, sorted, projected) rows from a dataset file
+
+    Args:
+        dataset: Dataset instance (only its file and zone map are used)
+        query: Output of parse_data_query
+        page: 1-based page number
+        page_size: Rows per page
+
+    Returns:
+        dict: Response payload of the data endpoint
+    """
+    clauses, sort_keys = query['clauses'], query['sort_keys']
+    columns, usecols = query['columns'], query['usecols']
+
+    # Calculate pagination
+    start_idx = (page - 1) * page_size
+    end_idx = start_idx + page_size
+
+    zone_map = dataset.zone_map
+    if zone_map and not clauses and not sort_keys:
+        # Plain paging: parse only the blocks holding the requested rows
+        df = read_blocks(dataset.file.path, zone_map,
+                         blocks_for_rows(zone_map, start_idx, end_idx), usecols)
+        paginated_df = apply_query(df.loc[start_idx:end_idx - 1], columns=columns)
+        total = dataset.total_records
+    else:
+        if zone_map and clauses:
+            # Skip blocks whose min/max or Type set rule out every row
+            df = read_blocks(dataset.file.path, zone_map,
+                             blocks_for_clauses(zone_map, clauses), usecols)
+        else:
+            df = read_csv(dataset.file.path, usecols=usecols)
+        df = apply_query(df, clauses, sort_keys, columns)
+        paginated_df = df.iloc[start_idx:end_idx]
+        total = len(df)
+
+    return {
+        'total_records': total,
+        'page': page,
+        'page_size': page_size,
+        'total_pages': (total + page_size - 1) // page_size,
+        'columns': paginated_df.columns.tolist(),
+        'data': paginated_df.to_dict('records')
+    }
+
@@ -0,0 +1,185 @@
+# analyzer/singleflight.py
+"""
+Single-flight coalescing of identical heavy requests.
+
+When several clients ask for the same (dataset, operation, params) at once,
+for example everyone opening the dataset that was just uploaded, only the
+first request computes the result; the others wait for it and share it.
+
+Within a process this is a lock table of in-flight calls (and, for the async
+views, of in-flight tasks). With SINGLE_FLIGHT_LOCK_DIR set, the leader also
+takes a file lock for the key so workers on the same host coalesce too: a
+worker that finds the lock held waits for it and reads the result the holder
+left behind instead of recomputing it.
+
+Results are shared between workers as JSON only, never unpickled from the
+shared directory, and a waiter accepts a result file only if it was written
+for its own key after it started waiting. Results that are not JSON (model
+instances) stay in-process; a waiting worker recomputes them once the lock
+is free.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within each process only
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a result file (and an unused lock file) is kept for workers that
+# waited on it
+RESULT_TTL = 60
+
+
+def flight_key(dataset, operation, **params):
+    """Key identifying one computation on one stored dataset file"""
+    return json.dumps([dataset.id, dataset.file.name, operation, params],
+                      sort_keys=True, default=str)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+_tasks = {}
+
+
+def coalesce(key, func):
+    """
+    Run func() once for all concurrent callers with the same key
+
+    Args:
+        key: Output of flight_key
+        func: Zero-argument callable producing the shared result
+
+    Returns:
+        The result of func(); callers must not mutate it. Exceptions are
+        raised in every waiting caller.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_locked(key, func)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.done.set()
+
+
+async def acoalesce(key, make_coroutine):
+    """
+    coalesce() for the async views
+
+    Concurrent callers in the event loop await the first caller's task
+    instead of each occupying an executor thread while they wait.
+    """
+    task = _tasks.get(key)
+    if task is None:
+        task = asyncio.ensure_future(make_coroutine())
+        _tasks[key] = task
+        task.add_done_callback(lambda _: _tasks.pop(key, None))
+    # A cancelled waiter must not cancel the shared computation
+    return await asyncio.shield(task)
+
+
+def _run_locked(key, func):
+    lock_dir = settings.SINGLE_FLIGHT_LOCK_DIR
+    if not lock_dir or fcntl is None:
+        return func()
+
+    os.makedirs(lock_dir, mode=0o700, exist_ok=True)
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    lock_path = os.path.join(lock_dir, f'{digest}.lock')
+    result_path = os.path.join(lock_dir, f'{digest}.json')
+
+    started = time.time()
+    with open(lock_path, 'a+b') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another worker is computing this key; its result is waiting
+            # once the lock is released, unless it failed or was not JSON
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            found, result = _read_result(result_path, key, started)
+            if found:
+                return result
+
+        # Mark the lock file as in use so cleanup leaves it alone
+        os.utime(lock_path)
+        try:
+            result = func()
+            _write_result(lock_dir, result_path, key, result)
+            return result
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_result(path, key, since):
+    """(True, result) for this key's result written after `since`, else (False, None)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False, None
+    if not isinstance(record, dict) or record.get('key') != key:
+        return False, None
+    if not isinstance(record.get('written_at'), (int, float)) or record['written_at'] < since:
+        return False, None
+    return True, record.get('result')
+
+
+def _write_result(lock_dir, path, key, result):
+    try:
+        data = json.dumps({'key': key, 'written_at': time.time(), 'result': result})
+    except (TypeError, ValueError):
+        # Not JSON (e.g. a model instance): waiters compute their own
+        return
+
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Single-flight result not shared: %s", e)
+        return
+
+    # Drop results, and lock files unused as long, that no waiter can still want
+    cutoff = time.time() - RESULT_TTL
+    for entry in os.scandir(lock_dir):
+        if entry.name.endswith(('.json', '.lock')):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
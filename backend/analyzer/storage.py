@@ -0,0 +1,138 @@
+# analyzer/storage.py
+"""
+Content-hashed, sharded media storage.
+
+Files are stored as <upload_to>/<h0h1>/<h2h3>/<sha256><ext>, for example
+datasets/3f/a2/3fa2...c1.csv. Two levels of 256 directories keep every
+directory small even with millions of files. Names come from the content,
+so no random suffixes are needed. If another record already stored
+identical bytes, the name gets -1, -2, ... and each record still owns its
+own file, so deleting one never affects another.
+
+Writes go to a temporary file in the target tree. The file is hashed while
+it is written, fsynced, and then hard-linked into place. Readers never see
+a partial file, and an existing file is never overwritten.
+
+Files from the old flat layout (datasets/<name>) stay readable;
+`python manage.py relocate_media` moves them into the sharded layout.
+"""
+import hashlib
+import itertools
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+_SHARDED = re.compile(r'^[^/]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(-\d+)?(\.\w+)*$')
+
+# Compression suffixes kept together with the extension before them
+_COMPRESSION_EXTENSIONS = ('.gz', '.zst')
+
+
+def sharded_name(prefix, digest, ext, copy=0):
+    """Storage name of the copy-th file with this digest under prefix"""
+    suffix = f'-{copy}' if copy else ''
+    return f'{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}{ext}'
+
+
+def is_sharded(name):
+    return bool(_SHARDED.match(name or ''))
+
+
+def _extension(name):
+    """Lower-cased extension, e.g. .csv or .csv.gz"""
+    root, ext = os.path.splitext(name)
+    if ext.lower() in _COMPRESSION_EXTENSIONS:
+        ext = os.path.splitext(root)[1] + ext
+    return ext.lower()
+
+
+class ShardedStorage(FileSystemStorage):
+    """FileSystemStorage that stores files under content-hashed, sharded names"""
+
+    def get_available_name(self, name, max_length=None):
+        # _save picks the final name from the content
+        return name
+
+    def _save(self, name, content):
+        prefix = os.path.dirname(name).replace('\\', '/') or 'files'
+        ext = _extension(name)
+        tmp_dir = os.path.join(self.location, prefix)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix='.upload-')
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            return self.place(tmp_path, prefix, digest.hexdigest(), ext)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def place(self, source_path, prefix, digest, ext):
+        """
+        Hard-link a complete file to its sharded name
+
+        The source is left in place for the caller to remove.
+
+        Returns:
+            str: Storage name of the new file
+        """
+        for copy in itertools.count():
+            name = sharded_name(prefix, digest, ext, copy)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(source_path, full_path)
+            except FileExistsError:
+                continue
+            except OSError:
+                # No hard links on this filesystem: reserve the name, then
+                # rename a complete copy over the reservation
+                try:
+                    os.close(os.open(full_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                except FileExistsError:
+                    continue
+                _copy_into_place(source_path, full_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+            return name
+
+    def relocate(self, name):
+        """
+        Link an existing file into the sharded layout
+
+        Returns:
+            str: New storage name; the old file is left for the caller to remove
+        """
+        digest = hashlib.sha256()
+        with self.open(name, 'rb') as f:
+            for chunk in f.chunks():
+                digest.update(chunk)
+        prefix = os.path.dirname(name).replace('\\', '/') or 'files'
+        return self.place(self.path(name), prefix, digest.hexdigest(), _extension(name))
+
+
+def _copy_into_place(source_path, full_path):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix='.copy-')
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(source_path, 'rb') as src:
+            while chunk := src.read(1024 * 1024):
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -1,3 +1,1135 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import authentication, compression, export, ingest, progress, response_cache, singleflight
+from .authentication import CachedTokenAuthentication
+from .benchmarks import compare_results, generate_equipment_csv
+from .compression import compress_csv
+from .counters import COUNTER_FIELDS, compute, get_user_stats
+from .csv_sniff import SNIFF_BYTES, read_options
+from .downloads import RangeNotSatisfiable, _if_range_passes, parse_range
+from .models import AnalysisReport, Dataset, UserStats
+from .parallel import analyze_csv_data_parallel, get_executor
+from .progress import ProgressReporter, event_stream, read_events
+from .query import (
+    QueryError, apply_query, parse_columns, parse_filter, parse_sort, referenced_columns,
+    validate_columns
+)
+from .storage import ShardedStorage, is_sharded
+from .utils import analyze_csv_data, cleanup_old_datasets, merge_summary_stats
+from .management.commands.benchmark import Command as BenchmarkCommand
+from .zonemap import blocks_for_clauses, blocks_for_rows, build_zone_map, read_blocks
+
+
+def equipment_frame(n, missing_types=False, seed=0):
+    """Random equipment rows in the upload format"""
+    rng = np.random.default_rng(seed)
+    types = rng.choice(['Pump', 'Valve', 'Reactor', 'Compressor'], n).astype(object)
+    if missing_types:
+        types[::7] = None
+    pressure = rng.random(n) * 10
+    pressure[::11] = np.nan
+    return pd.DataFrame({
+        'Equipment Name': [f'E{i}' for i in range(n)],
+        'Type': types,
+        'Flowrate': rng.random(n) * 100,
+        'Pressure': pressure,
+        'Temperature': rng.random(n) * 300,
+    })
+
+
+class StatsAssertions:
+    def assertStatsAlmostEqual(self, first, second, path='stats'):
+        """Nested payloads equal, floats to 1e-9 relative"""
+        if isinstance(first, dict):
+            self.assertIsInstance(second, dict, path)
+            self.assertEqual(set(first), set(second), path)
+            for key in first:
+                self.assertStatsAlmostEqual(first[key], second[key], f'{path}.{key}')
+        elif isinstance(first, (list, tuple)):
+            self.assertEqual(len(first), len(second), path)
+            for i, (a, b) in enumerate(zip(first, second)):
+                self.assertStatsAlmostEqual(a, b, f'{path}[{i}]')
+        elif isinstance(first, float) and isinstance(second, float):
+            self.assertTrue(math.isclose(first, second, rel_tol=1e-9, abs_tol=1e-9),
+                            f'{path}: {first} != {second}')
+        else:
+            self.assertEqual(first, second, path)
+
+
+@override_settings(ANALYSIS_WORKERS=0)
+class ParallelAnalysisTests(StatsAssertions, SimpleTestCase):
+    def assertMatchesSerial(self, df):
+        serial = analyze_csv_data(df)
+        parallel = analyze_csv_data_parallel(df, workers=3, chunks=5)
+        self.assertStatsAlmostEqual(serial, parallel)
+
+    def test_matches_serial(self):
+        self.assertMatchesSerial(equipment_frame(20000))
+
+    def test_missing_types_match_serial(self):
+        self.assertMatchesSerial(equipment_frame(20000, missing_types=True))
+
+    def test_pool_is_shared(self):
+        # A caller asking for another size must not replace the pool in use
+        executor = get_executor(3)
+        with ThreadPoolExecutor(4) as threads:
+            pools = list(threads.map(get_executor, [1, 2, 3, 4]))
+        self.assertTrue(all(pool is executor for pool in pools))
+        self.assertEqual(executor.submit(abs, -1).result(), 1)
+
+
+MESSY_CSV = (
+    'Export 2024-01-01\n'
+    'Equipment Name;Type;Flowrate;Pressure;Temperature\n'
+    'Pump-1;Pump;10,5;5,0;110\n'
+    'Valve-1;Valve;abc;2,5;90\n'
+    'Pump-2;Pump;12,0;-1,0;105\n'
+    'broken;line;1;2;3;4\n'
+    'R\xe9acteur-1;Reactor;30,0;7,5;-300\n'
+    'Pump-3;Pump;11,0;5,5;100\n'
+    'Valve-2;Valve;8,0;2,0;95\n'
+).encode('latin-1')
+
+
+class IngestTests(SimpleTestCase):
+    def ingest(self, data, chunk_rows):
+        with mock.patch.object(ingest, 'CHUNK_ROWS', chunk_rows):
+            return ingest.ingest_csv(SimpleUploadedFile('upload.csv', data))
+
+    def test_report(self):
+        df, report, stored = self.ingest(MESSY_CSV, 100)
+        self.assertEqual((report['encoding'], report['delimiter'], report['decimal'], report['header_row']),
+                         ('latin-1', ';', ',', 1))
+        self.assertEqual(report['parsed_rows'], 6)
+        self.assertEqual(report['malformed_rows'], 1)
+        self.assertEqual(report['quarantined_rows'], 3)
+        self.assertEqual(report['valid_rows'], 3)
+        self.assertEqual(report['columns']['Flowrate'], {'coercion_errors': 1, 'out_of_range': 0})
+        self.assertEqual(report['columns']['Pressure'], {'coercion_errors': 0, 'out_of_range': 1})
+        self.assertEqual(report['columns']['Temperature'], {'coercion_errors': 0, 'out_of_range': 1})
+        self.assertEqual([(s['row'], s['column'], s['reason']) for s in report['quarantine']],
+                         [(1, 'Flowrate', 'not numeric'), (2, 'Pressure', 'out of range'),
+                          (3, 'Temperature', 'out of range')])
+        self.assertEqual(df['Equipment Name'].tolist(), ['Pump-1', 'Pump-3', 'Valve-2'])
+        self.assertEqual(df['Flowrate'].tolist(), [10.5, 11.0, 8.0])
+        self.assertTrue(report['cleaned'])
+        self.assertTrue(stored.startswith(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'))
+
+    def test_chunked_matches_single_chunk(self):
+        whole = self.ingest(MESSY_CSV, 100)
+        chunked = self.ingest(MESSY_CSV, 2)
+        pd.testing.assert_frame_equal(whole[0], chunked[0])
+        self.assertEqual(whole[1], chunked[1])
+        self.assertEqual(whole[2], chunked[2])
+
+    def test_clean_upload_is_stored_as_is(self):
+        data = equipment_frame(50).dropna().to_csv(index=False).encode()
+        df, report, stored = self.ingest(data, 7)
+        self.assertFalse(report['cleaned'])
+        self.assertEqual(report['valid_rows'], len(df))
+        self.assertEqual(stored, data)
+
+    def test_non_utf8_after_sniffed_prefix(self):
+        # The prefix sniffs as UTF-8; a latin-1 byte past it forces a latin-1 re-read
+        data = equipment_frame(3000).dropna().to_csv(index=False).encode()
+        self.assertGreater(len(data), SNIFF_BYTES)
+        data += 'R\xe9acteur-9,Reactor,30.0,7.5,300.0\n'.encode('latin-1')
+        for chunk_rows in (100, 100_000):
+            df, report, stored = self.ingest(data, chunk_rows)
+            self.assertEqual(report['encoding'], 'latin-1')
+            self.assertEqual(df['Equipment Name'].iloc[-1], 'R\xe9acteur-9')
+            self.assertTrue(report['cleaned'])
+            self.assertTrue(stored.endswith('R\xe9acteur-9,Reactor,30.0,7.5,300.0\n'.encode()))
+
+    def test_header_only(self):
+        df, report, stored = self.ingest(b'Equipment Name,Type,Flowrate\n', 10)
+        self.assertTrue(df.empty)
+        self.assertEqual(report['valid_rows'], 0)
+
+
+class APITestCase(TestCase):
+    """Authenticated client with uploads stored in a temporary MEDIA_ROOT"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Record ids repeat across tests; cached responses must not
+        caches['default'].clear()
+        response_cache._local.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        token = Token.objects.create(user=self.user)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+
+    def upload(self, data, name='upload.csv'):
+        response = self.client.post('/api/datasets/upload/',
+                                    {'file': SimpleUploadedFile(name, data)})
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['dataset']
+
+    def body(self, response):
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        authentication._local_cache.clear()
+        self.token = Token.objects.get(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return self.auth.authenticate(request)
+
+    def test_hit_runs_no_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_each_request_gets_its_own_user(self):
+        first, _ = self.authenticate()
+        first.first_name = 'changed'
+        second, token = self.authenticate()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, '')
+        self.assertIs(token.user, second)
+
+    def test_logout_invalidates(self):
+        self.authenticate()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_invalidates(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.key = Token.objects.get(user=self.user).key
+
+    async def test_keyword_is_case_insensitive(self):
+        df = equipment_frame(40).dropna()
+        response = await self.async_client.post(
+            '/api/async/datasets/upload/',
+            {'file': SimpleUploadedFile('upload.csv', df.to_csv(index=False).encode())},
+            headers={'Authorization': f'token {self.key}', 'X-Job-Id': 'async-job-1'})
+        self.assertEqual(response.status_code, 201, response.content)
+        events = [event['event'] for event in read_events('async-job-1', self.user.id)]
+        self.assertNotIn('bytes_received', events)
+        self.assertEqual(events[-1], 'done')
+        dataset_id = json.loads(response.content)['dataset']['id']
+
+        response = await self.async_client.get(f'/api/async/datasets/{dataset_id}/summary/',
+                                               headers={'Authorization': f'TOKEN {self.key}'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(json.loads(response.content)['total_records'], len(df))
+
+    async def test_rejected_credentials(self):
+        for header in ('', f'Bearer {self.key}', 'Token', 'Token not-a-key', f'Token {self.key} extra'):
+            response = await self.async_client.get('/api/async/datasets/1/summary/',
+                                                   headers={'Authorization': header})
+            self.assertEqual(response.status_code, 401, header)
+
+class ProgressTests(APITestCase):
+    def test_events_are_numbered_per_user(self):
+        ProgressReporter('job-00001', self.user.id)('rows_parsed', rows=10)
+        ProgressReporter('job-00001', self.user.id)('done', dataset_id=1)
+        ProgressReporter('job-00001', self.user.id + 1)('error', message='other user')
+        self.assertEqual([e['event'] for e in read_events('job-00001', self.user.id)], ['rows_parsed', 'done'])
+        self.assertEqual(read_events('job-00001', self.user.id, sent=1), [{'dataset_id': 1, 'event': 'done'}])
+        self.assertEqual([e['event'] for e in read_events('job-00001', self.user.id + 1)], ['error'])
+
+    def test_concurrent_writers_lose_no_events(self):
+        report = ProgressReporter('job-00002', self.user.id)
+        with ThreadPoolExecutor(4) as threads:
+            list(threads.map(lambda i: report('pdf_page', page=i), range(200)))
+        pages = [e['page'] for e in read_events('job-00002', self.user.id)]
+        self.assertEqual(sorted(pages), list(range(200)))
+
+    def test_sync_stream_closes_early(self):
+        ProgressReporter('job-00003', self.user.id)('rows_parsed', rows=10)
+        with mock.patch.object(progress, 'POLL_INTERVAL', 0.01):
+            messages = list(event_stream('job-00003', self.user.id, timeout=0.1))
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages[1].startswith('id: 1\nevent: rows_parsed\n'))
+
+    def test_endpoint_resumes_after_last_event_id(self):
+        report = ProgressReporter('job-00004', self.user.id)
+        for event in ('rows_parsed', 'stats_computed', 'done'):
+            report(event)
+        response = self.client.get('/api/jobs/job-00004/events/', HTTP_LAST_EVENT_ID='1')
+        self.assertEqual(response.status_code, 200)
+        body = self.body(response).decode()
+        self.assertNotIn('rows_parsed', body)
+        self.assertIn('id: 2\nevent: stats_computed', body)
+        self.assertIn('id: 3\nevent: done', body)
+
+        self.assertEqual(self.client.get('/api/jobs/bad!/events/').status_code, 404)
+
+def _lead_flight(lock_dir, key, result, started):
+    """Child process: compute `key` slowly while holding its lock"""
+    def compute():
+        started.set()
+        time.sleep(0.5)
+        return result
+    with override_settings(SINGLE_FLIGHT_LOCK_DIR=lock_dir):
+        singleflight.coalesce(key, compute)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_concurrently(self, func, callers=5):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return func()
+
+        def call():
+            try:
+                return singleflight.coalesce('key', compute)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(callers) as threads:
+            futures = [threads.submit(call) for _ in range(callers)]
+            time.sleep(0.2)
+            release.set()
+            return len(calls), [f.result() for f in futures]
+
+    def test_concurrent_callers_share_one_call(self):
+        calls, results = self.run_concurrently(lambda: {'rows': 3})
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [{'rows': 3}] * 5)
+
+    def test_error_reaches_every_caller(self):
+        calls, results = self.run_concurrently(lambda: 1 / 0)
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(isinstance(r, ZeroDivisionError) for r in results))
+
+    def test_workers_share_results_through_lock_dir(self):
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir, ignore_errors=True)
+        context = multiprocessing.get_context('fork')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'recomputed'
+
+        for key, result in (('json', {'page': [1, 2]}), ('other', {1, 2})):
+            started = context.Event()
+            child = context.Process(target=_lead_flight, args=(lock_dir, key, result, started))
+            child.start()
+            self.assertTrue(started.wait(10))
+            with override_settings(SINGLE_FLIGHT_LOCK_DIR=lock_dir):
+                shared = singleflight.coalesce(key, compute)
+            child.join(10)
+            if key == 'json':
+                # Waited for the other worker and read its JSON result
+                self.assertEqual((shared, calls), ({'page': [1, 2]}, []))
+            else:
+                # Not JSON: computed again once the lock was free
+                self.assertEqual((shared, calls), ('recomputed', [1]))
+
+    def test_result_files_are_checked(self):
+        path = os.path.join(tempfile.mkdtemp(), 'result.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        singleflight._write_result(os.path.dirname(path), path, 'key', [1])
+        self.assertEqual(singleflight._read_result(path, 'key', 0), (True, [1]))
+        self.assertEqual(singleflight._read_result(path, 'other', 0), (False, None))
+        self.assertEqual(singleflight._read_result(path, 'key', time.time() + 1), (False, None))
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        response_cache._counts.clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'computed': self.computed}
+
+    def test_tiers_and_metrics(self):
+        scope = response_cache.dataset_scope(1)
+        self.assertEqual(response_cache.cached('summary', scope, self.compute), {'computed': 1})
+        self.assertEqual(response_cache.cached('summary', scope, self.compute), {'computed': 1})
+        # Another worker: nothing local, served from the shared tier
+        response_cache._local.clear()
+        self.assertEqual(response_cache.cached('summary', scope, self.compute), {'computed': 1})
+        # Different params are a different entry
+        self.assertEqual(response_cache.cached('summary', scope, self.compute, type='Pump'), {'computed': 2})
+
+        counts = response_cache.metrics()['endpoints']['summary']
+        self.assertEqual((counts['local_hit'], counts['shared_hit'], counts['miss']), (1, 1, 2))
+        self.assertEqual(counts['hit_ratio'], 0.5)
+
+    def test_invalidate_drops_only_its_scope(self):
+        datasets, users = response_cache.dataset_scope(1), response_cache.user_scope(1)
+        response_cache.cached('summary', datasets, self.compute)
+        response_cache.cached('history', users, self.compute)
+        response_cache.invalidate(datasets)
+        self.assertEqual(response_cache.cached('summary', datasets, self.compute), {'computed': 3})
+        self.assertEqual(response_cache.cached('history', users, self.compute), {'computed': 2})
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/cache/metrics/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get('/api/datasets/history/')
+        response = self.client.get('/api/cache/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['endpoints']['history']['miss'], 1)
+
+    def history_ids(self):
+        return [d['id'] for d in self.client.get('/api/datasets/history/').json()['results']]
+
+    def test_no_stale_responses_after_writes(self):
+        data = equipment_frame(30).dropna().to_csv(index=False).encode()
+        self.assertEqual(self.history_ids(), [])
+        self.assertEqual(self.client.get('/api/auth/profile/').json()['datasets_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.upload(data)
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.upload(data, name='second.csv')
+        self.assertEqual(self.history_ids(), [second['id'], first['id']])
+        self.assertEqual(self.client.get('/api/auth/profile/').json()['datasets_count'], 2)
+        summary = self.client.get(f"/api/datasets/{first['id']}/summary/")
+        self.assertEqual(summary.json()['dataset_id'], first['id'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/datasets/{first['id']}/").status_code, 204)
+        self.assertEqual(self.history_ids(), [second['id']])
+        self.assertEqual(self.client.get('/api/auth/profile/').json()['datasets_count'], 1)
+        self.assertEqual(self.client.get(f"/api/datasets/{first['id']}/summary/").status_code, 404)
+
+class UserStatsTests(APITestCase):
+    def stats(self):
+        return UserStats.objects.values(*COUNTER_FIELDS).get(user=self.user)
+
+    def add_report(self, dataset_id, size):
+        return AnalysisReport.objects.create(dataset_id=dataset_id, user=self.user,
+                                             report_file='reports/r.pdf', file_size=size)
+
+    def test_signals_count_uploaded_bytes(self):
+        data = equipment_frame(2000).dropna().to_csv(index=False).encode()
+        first = self.upload(data)
+        self.assertLess(first['stored_size'], len(data))
+        self.upload(data, name='second.csv')
+        self.add_report(first['id'], 100)
+        self.assertEqual(self.stats(), {'dataset_count': 2, 'dataset_bytes': 2 * len(data),
+                                        'report_count': 1, 'report_bytes': 100})
+        self.assertEqual(self.stats(), compute(self.user.id))
+
+    def test_delete_paths(self):
+        data = equipment_frame(50).dropna().to_csv(index=False).encode()
+        ids = [self.upload(data, name=f'{i}.csv')['id'] for i in range(4)]
+        self.add_report(ids[0], 100)
+
+        # API delete, cascading to the report
+        self.assertEqual(self.client.delete(f'/api/datasets/{ids[0]}/').status_code, 204)
+        self.assertEqual(self.stats(), {'dataset_count': 3, 'dataset_bytes': 3 * len(data),
+                                        'report_count': 0, 'report_bytes': 0})
+        # Retention cleanup's bulk delete
+        cleanup_old_datasets(self.user, max_count=1)
+        self.assertEqual(self.stats(), {'dataset_count': 1, 'dataset_bytes': len(data),
+                                        'report_count': 0, 'report_bytes': 0})
+        self.assertEqual(self.stats(), compute(self.user.id))
+
+    def test_reconcile_fixes_drift(self):
+        data = equipment_frame(50).dropna().to_csv(index=False).encode()
+        self.upload(data)
+        expected = self.stats()
+        UserStats.objects.filter(user=self.user).update(dataset_count=7, report_bytes=5)
+
+        out = io.StringIO()
+        call_command('reconcile_user_stats', '--dry-run', stdout=out)
+        self.assertIn('owner: dataset_count 7 -> 1, report_bytes 5 -> 0', out.getvalue())
+        self.assertEqual(self.stats()['dataset_count'], 7)
+
+        call_command('reconcile_user_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), expected)
+
+        # A missing row is rebuilt on first read
+        UserStats.objects.filter(user=self.user).delete()
+        self.assertEqual(get_user_stats(self.user).dataset_bytes, len(data))
+
+class ShardedStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ShardedStorage(location=self.location)
+
+    def test_content_hashed_names(self):
+        digest = hashlib.sha256(b'a,b\n1,2\n').hexdigest()
+        name = self.storage.save('datasets/Upload.CSV', ContentFile(b'a,b\n1,2\n'))
+        self.assertEqual(name, f'datasets/{digest[:2]}/{digest[2:4]}/{digest}.csv')
+        self.assertTrue(is_sharded(name))
+        self.assertTrue(self.storage.save('datasets/x.csv.gz', ContentFile(b'z')).endswith('.csv.gz'))
+        # No temporary files left behind
+        self.assertEqual([n for n in os.listdir(os.path.join(self.location, 'datasets'))
+                          if n.startswith('.')], [])
+
+    def test_identical_content_gets_its_own_file(self):
+        first = self.storage.save('datasets/a.csv', ContentFile(b'same'))
+        second = self.storage.save('datasets/b.csv', ContentFile(b'same'))
+        self.assertEqual(second, first.replace('.csv', '-1.csv'))
+        self.storage.delete(first)
+        with self.storage.open(second) as f:
+            self.assertEqual(f.read(), b'same')
+
+    def test_relocate_links_the_existing_file(self):
+        os.makedirs(os.path.join(self.location, 'datasets'))
+        with open(os.path.join(self.location, 'datasets', 'old.csv'), 'wb') as f:
+            f.write(b'old')
+        name = self.storage.relocate('datasets/old.csv')
+        self.assertTrue(is_sharded(name))
+        self.assertEqual(os.stat(self.storage.path(name)).st_ino,
+                         os.stat(self.storage.path('datasets/old.csv')).st_ino)
+
+    def test_copy_without_hard_links(self):
+        with mock.patch('os.link', side_effect=OSError('EXDEV')):
+            name = self.storage.save('datasets/a.csv', ContentFile(b'copied'))
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'copied')
+
+
+class RelocateMediaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.media_root, 'datasets'), exist_ok=True)
+        self.old_names = []
+        for i in range(3):
+            name = f'datasets/old_{i}.csv'
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(f'a,b\n{i},{i}\n'.encode())
+            Dataset.objects.create(user=self.user, filename=f'old_{i}.csv', file=name)
+            self.old_names.append(name)
+        Dataset.objects.create(user=self.user, filename='gone.csv', file='datasets/gone.csv')
+
+    def names(self):
+        return list(Dataset.objects.order_by('pk').values_list('file', flat=True))
+
+    def relocate(self, *args):
+        out = io.StringIO()
+        call_command('relocate_media', *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_dry_run(self):
+        self.assertIn('Dataset: would move 3 files, 1 missing', self.relocate('--dry-run'))
+        self.assertEqual(self.names()[:3], self.old_names)
+        self.assertTrue(all(default_storage.exists(name) for name in self.old_names))
+
+    def test_limit_and_removal_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertIn('Dataset: moved 2 files', self.relocate('--limit', '2'))
+        names = self.names()
+        self.assertTrue(all(is_sharded(name) for name in names[:2]))
+        self.assertEqual(names[2], self.old_names[2])
+        # Old files stay until the new names are committed
+        self.assertTrue(all(default_storage.exists(name) for name in self.old_names))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(any(default_storage.exists(name) for name in self.old_names[:2]))
+        self.assertTrue(default_storage.exists(self.old_names[2]))
+        with default_storage.open(names[1]) as f:
+            self.assertEqual(f.read(), b'a,b\n1,1\n')
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.df = equipment_frame(300).dropna().reset_index(drop=True)
+        self.dataset = self.upload(self.df.to_csv(index=False).encode())
+        self.url = f"/api/datasets/{self.dataset['id']}/export/"
+
+    def fetch(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, getattr(response, 'content', b''))
+        return response, self.body(response)
+
+    def test_csv(self):
+        response, body = self.fetch(filter='Type == Pump', columns='Equipment Name,Pressure')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="upload.csv"', response['Content-Disposition'])
+        expected = self.df[self.df['Type'] == 'Pump'][['Equipment Name', 'Pressure']]
+        pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(body)), expected.reset_index(drop=True))
+
+    def test_csv_without_matches_is_header_only(self):
+        _, body = self.fetch(filter='Pressure > 1000', columns='Equipment Name,Pressure')
+        self.assertEqual(body, b'Equipment Name,Pressure\n')
+
+    def test_ndjson(self):
+        response, body = self.fetch(output='ndjson', filter='Type == Valve', columns='Equipment Name,Flowrate')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        expected = self.df[self.df['Type'] == 'Valve']
+        self.assertEqual([row['Equipment Name'] for row in rows], expected['Equipment Name'].tolist())
+        self.assertEqual(set(rows[0]), {'Equipment Name', 'Flowrate'})
+
+    def test_invalid_requests(self):
+        for params in ({'output': 'xlsx'}, {'sort': 'Pressure'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    @skipIf(export.pyarrow is not None, 'pyarrow is installed')
+    def test_parquet_requires_pyarrow(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'parquet'}).status_code, 400)
+
+    @skipUnless(export.pyarrow is not None, 'pyarrow is not installed')
+    def test_parquet(self):
+        _, body = self.fetch(output='parquet', filter='Type == Pump')
+        table = export.pyarrow.parquet.read_table(io.BytesIO(body))
+        expected = self.df[self.df['Type'] == 'Pump'].reset_index(drop=True)
+        self.assertEqual(table.column_names, list(self.df.columns))
+        self.assertEqual(table.column('Equipment Name').to_pylist(), expected['Equipment Name'].tolist())
+        np.testing.assert_allclose(table.column('Pressure').to_pylist(), expected['Pressure'], rtol=1e-12)
+
+    @skipUnless(export.pyarrow is not None, 'pyarrow is not installed')
+    def test_parquet_schema_is_fixed_up_front(self):
+        # No zone map and small chunks: the first chunk's Notes are all missing
+        df = equipment_frame(40).dropna().reset_index(drop=True)
+        df['Notes'] = [None] * 20 + ['checked'] * (len(df) - 20)
+        dataset = self.upload(df.to_csv(index=False).encode(), name='notes.csv')
+        Dataset.objects.filter(pk=dataset['id']).update(zone_map={})
+        with mock.patch.object(export, 'BLOCK_ROWS', 10):
+            response = self.client.get(f"/api/datasets/{dataset['id']}/export/", {'output': 'parquet'})
+            body = self.body(response)
+        table = export.pyarrow.parquet.read_table(io.BytesIO(body))
+        self.assertEqual(str(table.schema.field('Notes').type), 'string')
+        self.assertEqual(table.column('Notes').to_pylist(), [None] * 20 + ['checked'] * (len(df) - 20))
+        self.assertEqual(str(table.schema.field('Pressure').type), 'double')
+
+TIMESTAMP_CSV = b'Timestamp,Equipment Name,Type,Flowrate,Pressure,Temperature\n' + b''.join(
+    f'2024-01-{1 + i % 28:02d} 10:{i % 60:02d}:00,E{i},{"Pump" if i % 3 else "Valve"},'
+    f'{i % 50 + 1},{i % 10 + 0.5},{i % 90 + 20}\n'.encode()
+    for i in range(300)
+)
+
+
+def read_options_inferring_dates(dialect):
+    """read_options that parses Timestamp the way the pyarrow engine infers it"""
+    return dict(read_options(dialect), parse_dates=['Timestamp'])
+
+
+class TimestampColumnTests(APITestCase):
+    def check_reads(self, dataset):
+        base = f"/api/datasets/{dataset['id']}"
+
+        response = self.client.get(f'{base}/data/', {'filter': 'Type == Valve', 'page_size': 500})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['total_records'], 100)
+
+        response = self.client.get(f'{base}/data/', {'page': 2, 'page_size': 50})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data'][0]['Timestamp'], '2024-01-23 10:50:00')
+
+        response = self.client.get(f'{base}/summary/', {'type': 'Pump'})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.get(f'{base}/export/', {'filter': 'Type == Valve'})
+        self.assertEqual(response.status_code, 200)
+        exported = pd.read_csv(io.BytesIO(self.body(response)))
+        self.assertEqual(len(exported), 100)
+        self.assertEqual(exported['Timestamp'].iloc[0], '2024-01-01 10:00:00')
+
+        response = self.client.get(f'{base}/export/', {'output': 'ndjson', 'columns': 'Timestamp'})
+        rows = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual(len(rows), 300)
+
+    def test_upload_with_timestamps(self):
+        self.check_reads(self.upload(TIMESTAMP_CSV))
+
+    @mock.patch.object(ingest, 'read_options', read_options_inferring_dates)
+    def test_upload_with_inferred_timestamps(self):
+        dataset = self.upload(TIMESTAMP_CSV)
+        self.check_reads(dataset)
+
+
+class StoredSizeTests(APITestCase):
+    def test_file_size_is_upload_size(self):
+        data = equipment_frame(2000).dropna().to_csv(index=False).encode()
+        with override_settings(DATASET_COMPRESSION='gzip'):
+            dataset = self.upload(data)
+        self.assertEqual(dataset['file_size'], len(data))
+        self.assertLess(dataset['stored_size'], len(data))
+        profile = self.client.get('/api/auth/profile/').json()
+        self.assertEqual(profile['storage_bytes'], len(data))
+
+    def test_quota_counts_upload_sizes(self):
+        data = equipment_frame(500).dropna().to_csv(index=False).encode()
+        with override_settings(USER_STORAGE_QUOTA=len(data) + 10):
+            self.upload(data)
+            response = self.client.post('/api/datasets/upload/',
+                                        {'file': SimpleUploadedFile('again.csv', data)})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Storage quota exceeded')
+
+
+class MergeSummaryStatsTests(SimpleTestCase):
+    def part(self, values):
+        values = np.asarray(values, dtype=float)
+        return {'count': len(values), 'mean': values.mean(),
+                'std': values.std(ddof=1) if len(values) > 1 else 0.0,
+                'min': values.min(), 'max': values.max()}
+
+    def test_matches_combined_data(self):
+        values = np.random.default_rng(1).normal(50, 12, 1000)
+        parts = [self.part(values[a:b]) for a, b in ((0, 1), (1, 300), (300, 301), (301, 1000))]
+        merged = merge_summary_stats(parts)
+        self.assertEqual(merged['count'], 1000)
+        self.assertAlmostEqual(merged['mean'], values.mean(), places=9)
+        self.assertAlmostEqual(merged['std'], values.std(ddof=1), places=9)
+        self.assertEqual((merged['min'], merged['max']), (values.min(), values.max()))
+
+    def test_skips_empty_parts(self):
+        merged = merge_summary_stats([
+            {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None},
+            self.part([2.0, 4.0]),
+        ])
+        self.assertEqual((merged['count'], merged['mean'], merged['min'], merged['max']), (2, 3.0, 2.0, 4.0))
+
+    def test_nothing_to_merge(self):
+        self.assertEqual(merge_summary_stats([]),
+                         {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None})
+
+    def test_single_value_has_no_std(self):
+        self.assertIsNone(merge_summary_stats([self.part([7.0])])['std'])
+
+
+class QueryParsingTests(SimpleTestCase):
+    def test_parse_filter(self):
+        self.assertEqual(
+            parse_filter("Type == Pump and Pressure >= 5.5 AND 'Equipment Name' != \"P 1\""),
+            [('Type', '==', 'Pump'), ('Pressure', '>=', '5.5'), ('Equipment Name', '!=', 'P 1')])
+        self.assertEqual(parse_filter('Type in Pump, Valve ,'), [('Type', 'in', ['Pump', 'Valve'])])
+        self.assertEqual(parse_filter('Pressure<3'), [('Pressure', '<', '3')])
+
+    def test_parse_filter_rejects_malformed_clause(self):
+        with self.assertRaises(QueryError):
+            parse_filter('Type Pump')
+
+    def test_parse_sort_and_columns(self):
+        self.assertEqual(parse_sort('-Pressure, +Type,Flowrate,'),
+                         [('Pressure', False), ('Type', True), ('Flowrate', True)])
+        self.assertEqual(parse_columns(' Type , ,Pressure'), ['Type', 'Pressure'])
+
+    def test_referenced_columns(self):
+        clauses = [('Type', '==', 'Pump'), ('Pressure', '>', '1')]
+        self.assertEqual(referenced_columns(clauses, [('Flowrate', True), ('Type', False)], ['Pressure']),
+                         ['Pressure', 'Type', 'Flowrate'])
+        with self.assertRaises(QueryError):
+            validate_columns(['Type', 'Nope'], ['Type', 'Pressure'])
+
+
+class ApplyQueryTests(SimpleTestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Name': ['a', 'b', 'c', 'd', 'e'],
+            'Type': ['Pump', 'Valve', 'Pump', 'Reactor', 'Valve'],
+            'Pressure': [5.0, np.nan, 7.5, 1.0, 5.0],
+        })
+
+    def names(self, filter='', sort='', columns=''):
+        result = apply_query(self.df, parse_filter(filter) if filter else [],
+                             parse_sort(sort), parse_columns(columns))
+        return result['Name'].tolist() if 'Name' in result.columns else result
+
+    def test_numeric_comparisons_skip_missing_values(self):
+        self.assertEqual(self.names('Pressure >= 5'), ['a', 'c', 'e'])
+        self.assertEqual(self.names('Pressure < 5'), ['d'])
+        self.assertEqual(self.names('Pressure != 5'), ['b', 'c', 'd'])
+        self.assertEqual(self.names('Pressure in 1, 7.5'), ['c', 'd'])
+
+    def test_text_comparisons(self):
+        self.assertEqual(self.names('Type == Valve'), ['b', 'e'])
+        self.assertEqual(self.names('Type != Pump and Pressure > 0'), ['d', 'e'])
+        self.assertEqual(self.names('Type in Reactor,Pump'), ['a', 'c', 'd'])
+
+    def test_invalid_comparisons(self):
+        for expression in ('Pressure > high', 'Pressure in 1,x', 'Type > Pump'):
+            with self.assertRaises(QueryError, msg=expression):
+                self.names(expression)
+
+    def test_sort_is_stable_and_projection_ordered(self):
+        self.assertEqual(self.names(sort='-Pressure'), ['c', 'a', 'e', 'd', 'b'])
+        self.assertEqual(self.names(sort='Type,-Name'), ['c', 'a', 'd', 'e', 'b'])
+        projected = self.names('Type == Pump', columns='Pressure,Type')
+        self.assertEqual(projected.columns.tolist(), ['Pressure', 'Type'])
+        self.assertEqual(len(projected), 2)
+
+
+class DataQueryAPITests(APITestCase):
+    def test_filter_sort_and_project(self):
+        df = equipment_frame(500).dropna()
+        dataset = self.upload(df.to_csv(index=False).encode())
+        response = self.client.get(f"/api/datasets/{dataset['id']}/data/", {
+            'filter': 'Type == Pump and Pressure > 5', 'sort': '-Pressure',
+            'columns': 'Equipment Name,Pressure', 'page_size': 1000})
+        self.assertEqual(response.status_code, 200, response.content)
+        payload = response.json()
+        expected = df[(df['Type'] == 'Pump') & (df['Pressure'] > 5)].sort_values('Pressure', ascending=False)
+        self.assertEqual(payload['columns'], ['Equipment Name', 'Pressure'])
+        self.assertEqual(payload['total_records'], len(expected))
+        self.assertEqual([row['Equipment Name'] for row in payload['data']],
+                         expected['Equipment Name'].tolist())
+
+    def test_invalid_query(self):
+        dataset = self.upload(equipment_frame(20).dropna().to_csv(index=False).encode())
+        for params in ({'filter': 'Pressure >> 1'}, {'columns': 'Nope'}, {'filter': 'Pressure > x'}):
+            response = self.client.get(f"/api/datasets/{dataset['id']}/data/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertTrue(response.json()['error'].startswith('Invalid query'))
+
+
+class AggregateAPITests(APITestCase):
+    def test_last(self):
+        ids = [self.upload(equipment_frame(50, seed=seed).dropna().to_csv(index=False).encode())['id']
+               for seed in range(3)]
+        response = self.client.get('/api/datasets/aggregate/', {'metric': 'Pressure', 'last': 2})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['datasets'], ids[:0:-1])
+
+    def test_invalid_last(self):
+        self.upload(equipment_frame(20).dropna().to_csv(index=False).encode())
+        for last in ('-1', '0', 'x'):
+            response = self.client.get('/api/datasets/aggregate/', {'metric': 'Pressure', 'last': last})
+            self.assertEqual(response.status_code, 400, last)
+
+class ZoneMapTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        n = 100
+        self.df = pd.DataFrame({
+            'Equipment Name': [f'E{i}' for i in range(n)],
+            # Types change every 30 rows, so blocks of 25 hold one or two
+            'Type': [['Pump', 'Valve', 'Reactor', 'Pump'][i // 30] for i in range(n)],
+            'Pressure': np.arange(n, dtype=float),
+            'Temperature': rng.random(n) * 100,
+        })
+        self.df.loc[60:74, 'Temperature'] = np.nan
+        self.data = self.df.to_csv(index=False).encode()
+        self.zone_map = build_zone_map(self.data, self.df, block_rows=25)
+        self.path = self.write(self.data)
+
+    def write(self, data, suffix='.csv'):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/data{suffix}'
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_blocks(self):
+        blocks = self.zone_map['blocks']
+        self.assertEqual([(b['start'], b['rows']) for b in blocks], [(0, 25), (25, 25), (50, 25), (75, 25)])
+        self.assertEqual(self.data[:self.zone_map['header_length']], self.data.split(b'\n')[0] + b'\n')
+        for block in blocks:
+            first_line = self.data[block['offset']:].split(b'\n')[0]
+            self.assertTrue(first_line.startswith(f"E{block['start']},".encode()))
+        self.assertEqual(blocks[-1]['offset'] + blocks[-1]['length'], len(self.data))
+        self.assertEqual(blocks[1]['columns']['Pressure'], {'min': 25.0, 'max': 49.0, 'nulls': 0})
+        self.assertEqual(blocks[2]['columns']['Temperature']['nulls'], 15)
+        self.assertEqual(blocks[1]['types'], ['Pump', 'Valve'])
+
+    def test_no_zone_map_when_rows_span_lines(self):
+        df = pd.DataFrame({'Note': ['one\ntwo', 'three'], 'Pressure': [1.0, 2.0]})
+        self.assertEqual(build_zone_map(df.to_csv(index=False).encode(), df), {})
+
+    def test_pruning(self):
+        def blocks(expression):
+            return blocks_for_clauses(self.zone_map, parse_filter(expression))
+
+        self.assertEqual(blocks('Pressure > 60'), [2, 3])
+        self.assertEqual(blocks('Pressure <= 25'), [0, 1])
+        self.assertEqual(blocks('Pressure == 30'), [1])
+        self.assertEqual(blocks('Pressure in 3, 99'), [0, 3])
+        self.assertEqual(blocks('Pressure != 30'), [0, 1, 2, 3])
+        self.assertEqual(blocks('Type == Reactor'), [2, 3])
+        self.assertEqual(blocks('Type in Valve,Reactor and Pressure < 40'), [1])
+        self.assertEqual(blocks('Type != Pump'), [1, 2, 3])
+        self.assertEqual(blocks('Pressure > x'), [0, 1, 2, 3])
+        self.assertEqual(blocks_for_rows(self.zone_map, 20, 51), [0, 1, 2])
+
+    def test_all_missing_block_never_matches_comparisons(self):
+        df = pd.DataFrame({'Pressure': [np.nan, np.nan, 1.0, 2.0]})
+        zone_map = build_zone_map(df.to_csv(index=False).encode(), df, block_rows=2)
+        self.assertEqual(blocks_for_clauses(zone_map, parse_filter('Pressure > 0')), [1])
+        self.assertEqual(blocks_for_clauses(zone_map, parse_filter('Pressure != 1')), [0, 1])
+
+    def test_read_blocks(self):
+        df = read_blocks(self.path, self.zone_map, [1, 3])
+        pd.testing.assert_frame_equal(df, self.df.iloc[list(range(25, 50)) + list(range(75, 100))],
+                                      check_index_type=False)
+
+        # Adjacent blocks are one read; usecols are applied
+        df = read_blocks(self.path, self.zone_map, [1, 2], usecols=['Type', 'Pressure'])
+        self.assertEqual(df.columns.tolist(), ['Type', 'Pressure'])
+        self.assertEqual(df.index.tolist(), list(range(25, 75)))
+        self.assertEqual(df['Pressure'].tolist(), list(range(25, 75)))
+
+    def test_read_no_blocks_keeps_dtypes(self):
+        df = read_blocks(self.path, self.zone_map, [], usecols=['Pressure', 'Type'])
+        self.assertTrue(df.empty)
+        self.assertEqual(df.columns.tolist(), ['Pressure', 'Type'])
+        self.assertEqual(df['Pressure'].dtype, np.float64)
+
+
+@override_settings(DATASET_COMPRESSION='gzip')
+class CompressionTests(ZoneMapTests):
+    """Zone-map reads again on a gzip file, plus the frame layout itself"""
+
+    def setUp(self):
+        super().setUp()
+        stored, self.zone_map, extension = compress_csv(self.data, self.zone_map)
+        self.assertEqual(extension, '.gz')
+        self.stored = stored
+        self.path = self.write(stored, suffix='.csv.gz')
+
+    def test_frames(self):
+        self.assertEqual(compression.decompress('gzip', self.stored), self.data)
+        header_length = self.zone_map['header_frame_length']
+        self.assertEqual(compression.decompress('gzip', self.stored[:header_length]),
+                         self.data[:self.zone_map['header_length']])
+        position = header_length
+        for block in self.zone_map['blocks']:
+            self.assertEqual(block['frame_offset'], position)
+            frame = self.stored[position:position + block['frame_length']]
+            self.assertEqual(compression.decompress('gzip', frame),
+                             self.data[block['offset']:block['offset'] + block['length']])
+            position += block['frame_length']
+        self.assertEqual(position, len(self.stored))
+
+    def test_whole_file_reads(self):
+        pd.testing.assert_frame_equal(compression.read_csv(self.path), self.df)
+        self.assertEqual(b''.join(compression.iter_csv(self.path, chunk_size=100)), self.data)
+
+    def test_identical_content_compresses_identically(self):
+        self.assertEqual(compress_csv(self.data, self.zone_map)[0], self.stored)
+
+    def test_without_zone_map(self):
+        with mock.patch.object(compression, 'FALLBACK_FRAME_BYTES', 1000):
+            stored, zone_map, _ = compress_csv(self.data, {})
+        self.assertEqual(zone_map, {})
+        self.assertEqual(compression.decompress('gzip', stored), self.data)
+
+    @override_settings(DATASET_COMPRESSION='none')
+    def test_compression_off(self):
+        self.assertEqual(compress_csv(self.data, {'blocks': []}), (self.data, {'blocks': []}, ''))
+
+
+class ContentEncodingTests(SimpleTestCase):
+    def test_codec_for(self):
+        self.assertEqual(compression.codec_for('datasets/aa/bb/x.csv.gz'), 'gzip')
+        self.assertEqual(compression.codec_for('datasets/aa/bb/x.csv.zst'), 'zstd')
+        self.assertIsNone(compression.codec_for('datasets/x.csv'))
+
+    def test_accepts_encoding(self):
+        accepts = compression.accepts_encoding
+        self.assertTrue(accepts('gzip, deflate, br', 'gzip'))
+        self.assertTrue(accepts('br;q=1.0, GZIP;q=0.5', 'gzip'))
+        self.assertTrue(accepts('*', 'zstd'))
+        self.assertFalse(accepts('gzip;q=0', 'gzip'))
+        self.assertFalse(accepts('deflate', 'gzip'))
+        self.assertFalse(accepts('', 'gzip'))
+
+
+class RangeParsingTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 100))
+
+    def test_whole_file(self):
+        for header in ('', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1'):
+            self.assertIsNone(parse_range(header, 100), header)
+
+    def test_not_satisfiable(self):
+        for header, size in (('bytes=100-', 100), ('bytes=5-2', 100), ('bytes=-0', 100), ('bytes=-5', 0)):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, size)
+
+    def test_if_range(self):
+        factory = RequestFactory()
+        etag, last_modified = '"abc"', 1700000000.5
+        self.assertTrue(_if_range_passes(factory.get('/'), etag, last_modified))
+        self.assertTrue(_if_range_passes(factory.get('/', HTTP_IF_RANGE='"abc"'), etag, last_modified))
+        self.assertFalse(_if_range_passes(factory.get('/', HTTP_IF_RANGE='"old"'), etag, last_modified))
+        self.assertFalse(_if_range_passes(factory.get('/', HTTP_IF_RANGE='W/"abc"'), etag, last_modified))
+        date = http_date(1700000000)
+        self.assertTrue(_if_range_passes(factory.get('/', HTTP_IF_RANGE=date), etag, last_modified))
+        self.assertFalse(_if_range_passes(factory.get('/', HTTP_IF_RANGE=http_date(1600000000)),
+                                          etag, last_modified))
+
+
+class DownloadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = equipment_frame(300).dropna().to_csv(index=False).encode()
+        other = User.objects.create_user('other', password='secret')
+        self.other_client = self.client_class(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.anonymous = self.client_class()
+
+    def test_signed_url(self):
+        dataset = self.upload(self.data)
+        signed = dataset['file_url'].replace('http://testserver', '')
+        path, query = signed.split('?')
+        self.assertIn('signature=', query)
+
+        response = self.anonymous.get(signed, HTTP_ACCEPT_ENCODING='identity')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="upload.csv"')
+
+        self.assertEqual(self.anonymous.get(path).status_code, 404)
+        self.assertEqual(self.anonymous.get(f'{path}?signature=forged').status_code, 404)
+        self.assertEqual(self.other_client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(path, HTTP_ACCEPT_ENCODING='identity').status_code, 200)
+
+        # A signature is only valid for its own record and route
+        other = self.upload(self.data, name='second.csv')
+        self.assertEqual(self.anonymous.get(f"/api/datasets/{other['id']}/download/?{query}").status_code, 404)
+        self.assertEqual(self.anonymous.get(f"/api/reports/{dataset['id']}/download/?{query}").status_code, 404)
+
+        with override_settings(DOWNLOAD_URL_MAX_AGE=-1):
+            self.assertEqual(self.anonymous.get(signed).status_code, 404)
+
+    @override_settings(DATASET_COMPRESSION='none')
+    def test_ranges_and_conditional_requests(self):
+        path = f"/api/datasets/{self.upload(self.data)['id']}/download/"
+        response = self.client.get(path)
+        etag, size = response['ETag'], len(self.data)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get(path, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{size}')
+        self.assertEqual(self.body(response), self.data[10:20])
+
+        response = self.client.get(path, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(response), self.data[-5:])
+
+        response = self.client.get(path, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+        response = self.client.get(path, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(DATASET_COMPRESSION='gzip')
+    def test_content_encoding(self):
+        path = f"/api/datasets/{self.upload(self.data)['id']}/download/"
+        response = self.client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(self.body(response)), self.data)
+        encoded_etag = response['ETag']
+
+        response = self.client.get(path)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Accept-Ranges'], 'none')
+        self.assertEqual(self.body(response), self.data)
+        self.assertNotEqual(response['ETag'], encoded_etag)
+
+    @override_settings(DOWNLOAD_OFFLOAD='x-accel-redirect', DOWNLOAD_ACCEL_PREFIX='/protected/')
+    def test_offload(self):
+        dataset = Dataset.objects.get(pk=self.upload(self.data)['id'])
+        response = self.client.get(f'/api/datasets/{dataset.pk}/download/', HTTP_ACCEPT_ENCODING='gzip, zstd')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{dataset.file.name}')
+        self.assertEqual(response.content, b'')
+
+
+class BenchmarkTests(APITestCase):
+    def test_generate_equipment_csv(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = generate_equipment_csv(f'{directory}/a.csv', 250, numeric_columns=5,
+                                      type_cardinality=4, seed=3, chunk_size=100)
+        df = pd.read_csv(path)
+        self.assertEqual(df.columns.tolist(), ['Equipment Name', 'Type', 'Flowrate', 'Pressure',
+                                               'Temperature', 'Sensor_1', 'Sensor_2'])
+        self.assertEqual(len(df), 250)
+        self.assertEqual(df['Type'].nunique(), 4)
+        self.assertTrue(df['Equipment Name'].is_unique)
+
+        again = generate_equipment_csv(f'{directory}/b.csv', 250, numeric_columns=5,
+                                       type_cardinality=4, seed=3, chunk_size=100)
+        with open(path, 'rb') as a, open(again, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_compare_results(self):
+        baseline = {'results': {'100': {'analyze': {'median': 1.0}, 'upload': {'median': 2.0},
+                                        'file_size': 10}}}
+        current = {'results': {'100': {'analyze': {'median': 1.05}, 'upload': {'median': 2.5},
+                                       'read_csv': {'median': 1.0}, 'file_size': 10}}}
+        comparisons = {c['operation']: c for c in compare_results(baseline, current, threshold=0.1)}
+        self.assertEqual(set(comparisons), {'analyze', 'upload'})
+        self.assertFalse(comparisons['analyze']['regression'])
+        self.assertTrue(comparisons['upload']['regression'])
+        self.assertAlmostEqual(comparisons['upload']['ratio'], 1.25)
+
+        command = BenchmarkCommand(stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            command.report_comparison(baseline, current, 0.1)
+        command.report_comparison(baseline, current, 0.5)
+
+    def test_run_size_smoke(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = generate_equipment_csv(f'{directory}/equipment_100.csv', 100)
+        options = {
+            'operations': ['read_csv', 'analyze', 'report', 'upload', 'data_page', 'cleanup'],
+            'repeat': 1, 'page_size': 30, 'cleanup_datasets': 3,
+        }
+        command = BenchmarkCommand(stdout=io.StringIO())
+        results = command.run_size(path, 100, self.user, self.client, directory, options)
+        for name in ('read_csv', 'analyze', 'report', 'upload', 'data_page_first', 'data_page_last', 'cleanup'):
+            self.assertEqual(results[name]['runs'], 1, name)
+        self.assertFalse(Dataset.objects.filter(user=self.user).exists())
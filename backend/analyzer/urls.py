@@ -1,15 +1,30 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'datasets', views.DatasetViewSet, basename='dataset')
 router.register(r'reports', views.AnalysisReportViewSet, basename='report')
 
+# Async variants of the heavy dataset endpoints (ASGI)
+async_urlpatterns = [
+    path('datasets/upload/', async_views.upload, name='async-upload'),
+    path('datasets/<int:pk>/summary/', async_views.summary, name='async-summary'),
+    path('datasets/<int:pk>/data/', async_views.data, name='async-data'),
+    path('jobs/<str:job_id>/events/', async_views.job_events, name='async-job-events'),
+]
+
 urlpatterns = [
     path('', include(router.urls)),
+    path('async/', include(async_urlpatterns)),
+    path('jobs/<str:job_id>/events/', views.job_events, name='job-events'),
     path('auth/register/', views.register_user, name='register'),
     path('auth/login/', views.login_user, name='login'),
     path('auth/logout/', views.logout_user, name='logout'),
     path('auth/profile/', views.user_profile, name='profile'),
-]
\ No newline at end of file
+    path('cache/metrics/', views.cache_metrics, name='cache-metrics'),
+]
+
+if settings.ASYNC_DATASET_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
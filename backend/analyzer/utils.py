@@ -10,6 +10,29 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime
 import os
 from django.conf import settings
+from django.db import transaction
+
+
+# Version of the stats payload stored on Dataset and served to the clients.
+# Bump it whenever analyze_csv_data changes shape; older datasets are
+# re-analyzed on their next summary request.
+STATS_VERSION = 2
+
+
+def _finite(value):
+    """Convert to float, mapping NaN/inf to None so the payload stays valid JSON"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _histogram(values, max_bins=20, min_bins=5):
+    """Histogram counts and edges using the bin rule of the desktop charts"""
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {'counts': [], 'edges': []}
+    n_bins = min(max_bins, max(min_bins, len(values) // 3))
+    counts, edges = np.histogram(values, bins=n_bins)
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
 
 
 def analyze_csv_data(df):
@@ -20,53 +43,157 @@ def analyze_csv_data(df):
         df: pandas DataFrame
     
     Returns:
-        dict: Analysis results with summary stats and equipment types
+        dict: Versioned stats payload with summary stats, equipment types,
+              per-type stats and histograms
     """
-    analysis = {}
+    # Opt-in multiprocess path for very large frames (see parallel.py)
+    workers = getattr(settings, 'ANALYSIS_WORKERS', 0)
+    if workers > 1 and len(df) >= settings.PARALLEL_ANALYSIS_MIN_ROWS:
+        from .parallel import analyze_csv_data_parallel
+        return analyze_csv_data_parallel(df, workers=workers)
+    
+    analysis = {'stats_version': STATS_VERSION}
     
     # Basic info
     analysis['total_records'] = len(df)
     analysis['columns'] = df.columns.tolist()
     
-    # Summary statistics for numeric columns
+    # Summary statistics for numeric columns (one pass over each column)
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     summary_stats = {}
+    histograms = {}
     
-    for col in numeric_cols:
-        summary_stats[col] = {
-            'mean': float(df[col].mean()),
-            'median': float(df[col].median()),
-            'std': float(df[col].std()),
-            'min': float(df[col].min()),
-            'max': float(df[col].max()),
-            'count': int(df[col].count())
-        }
+    if numeric_cols:
+        aggregated = df[numeric_cols].agg(['mean', 'median', 'std', 'min', 'max', 'count'])
+        for col in numeric_cols:
+            summary_stats[col] = {
+                'mean': _finite(aggregated.at['mean', col]),
+                'median': _finite(aggregated.at['median', col]),
+                'std': _finite(aggregated.at['std', col]),
+                'min': _finite(aggregated.at['min', col]),
+                'max': _finite(aggregated.at['max', col]),
+                'count': int(aggregated.at['count', col])
+            }
+            histograms[col] = _histogram(df[col].to_numpy(dtype=float))
     
     analysis['summary_stats'] = summary_stats
+    analysis['histograms'] = histograms
     
     # Equipment type distribution (if 'Type' column exists)
     equipment_types = {}
+    type_stats = {}
     if 'Type' in df.columns:
         type_counts = df['Type'].value_counts().to_dict()
         equipment_types = {str(k): int(v) for k, v in type_counts.items()}
+        
+        # Per-type stats for numeric columns
+        if numeric_cols:
+            grouped = df.groupby('Type', sort=False)[numeric_cols].agg(['mean', 'std', 'min', 'max', 'count'])
+            for eq_type, row in grouped.iterrows():
+                type_stats[str(eq_type)] = {
+                    col: {
+                        'mean': _finite(row[(col, 'mean')]),
+                        'std': _finite(row[(col, 'std')]),
+                        'min': _finite(row[(col, 'min')]),
+                        'max': _finite(row[(col, 'max')]),
+                        'count': int(row[(col, 'count')])
+                    }
+                    for col in numeric_cols
+                }
     
     analysis['equipment_types'] = equipment_types
+    analysis['type_stats'] = type_stats
     
     return analysis
 
 
-def generate_pdf_report(dataset, df, user):
+def merge_summary_stats(parts):
+    """
+    Combine per-part statistics without the underlying rows
+    
+    count/mean/std/min/max merge exactly (std via the pairwise update of
+    Chan et al. on the sum of squared deviations); medians do not merge and
+    are left out.
+    
+    Args:
+        parts: Iterable of dicts with count, mean, std, min and max
+    
+    Returns:
+        dict: count, mean, std (sample), min and max of the combined data
+    """
+    count, mean, m2 = 0, 0.0, 0.0
+    low, high = None, None
+    
+    for part in parts:
+        n = part.get('count') or 0
+        if n == 0 or part.get('mean') is None:
+            continue
+        part_mean = part['mean']
+        part_m2 = (part.get('std') or 0.0) ** 2 * (n - 1)
+        
+        total = count + n
+        delta = part_mean - mean
+        mean += delta * n / total
+        m2 += part_m2 + delta ** 2 * count * n / total
+        count = total
+        
+        if part.get('min') is not None:
+            low = part['min'] if low is None else min(low, part['min'])
+        if part.get('max') is not None:
+            high = part['max'] if high is None else max(high, part['max'])
+    
+    return {
+        'count': count,
+        'mean': mean if count else None,
+        'std': _finite(np.sqrt(m2 / (count - 1))) if count > 1 else None,
+        'min': low,
+        'max': high,
+    }
+
+
+def refresh_dataset_stats(dataset):
+    """
+    Re-analyze a dataset whose stored stats predate STATS_VERSION
+    
+    Args:
+        dataset: Dataset model instance
+    
+    Returns:
+        Dataset: The same instance with current stats saved
+    """
+    if dataset.stats_version >= STATS_VERSION:
+        return dataset
+    
+    from .compression import read_csv
+    
+    df = read_csv(dataset.file.path)
+    analysis = analyze_csv_data(df)
+    dataset.apply_analysis(analysis)
+    dataset.save(update_fields=[
+        'total_records', 'columns', 'summary_stats', 'equipment_types',
+        'type_stats', 'histograms', 'stats_version'
+    ])
+    return dataset
+
+
+def generate_pdf_report(dataset, df, user, analysis=None, on_page=None):
     """
     Generate PDF report for a dataset
     
     Args:
         dataset: Dataset model instance
-        df: pandas DataFrame with data
+        df: pandas DataFrame with data (only the first rows are needed when
+            analysis is given)
         user: User model instance
+        analysis: Stats payload to report; computed from df when omitted
+        on_page: Optional callback receiving each page number as it is rendered
     
     Returns:
         str: Path to generated PDF file
     """
+    if analysis is None:
+        analysis = analyze_csv_data(df)
+    
     # Create reports directory if it doesn't exist
     reports_dir = os.path.join(settings.MEDIA_ROOT, 'reports')
     os.makedirs(reports_dir, exist_ok=True)
@@ -130,25 +257,18 @@ def generate_pdf_report(dataset, df, user):
     # Summary Statistics
     story.append(Paragraph("Summary Statistics", heading_style))
     
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    summary_stats = analysis['summary_stats']
+    numeric_cols = list(summary_stats)
     
     if numeric_cols:
         stats_data = [['Metric'] + numeric_cols]
         
-        for stat in ['Mean', 'Median', 'Std Dev', 'Min', 'Max']:
+        for stat, key in [('Mean', 'mean'), ('Median', 'median'), ('Std Dev', 'std'),
+                          ('Min', 'min'), ('Max', 'max')]:
             row = [stat]
             for col in numeric_cols:
-                if stat == 'Mean':
-                    val = df[col].mean()
-                elif stat == 'Median':
-                    val = df[col].median()
-                elif stat == 'Std Dev':
-                    val = df[col].std()
-                elif stat == 'Min':
-                    val = df[col].min()
-                else:  # Max
-                    val = df[col].max()
-                row.append(f"{val:.2f}")
+                val = summary_stats[col][key]
+                row.append(f"{val:.2f}" if val is not None else "N/A")
             stats_data.append(row)
         
         stats_table = Table(stats_data, colWidths=[1.5*inch] + [1.2*inch]*len(numeric_cols))
@@ -167,14 +287,13 @@ def generate_pdf_report(dataset, df, user):
         story.append(Spacer(1, 0.3*inch))
     
     # Equipment Type Distribution
-    if 'Type' in df.columns:
+    if analysis['equipment_types']:
         story.append(Paragraph("Equipment Type Distribution", heading_style))
         
-        type_counts = df['Type'].value_counts()
         type_data = [['Equipment Type', 'Count', 'Percentage']]
         
-        total = len(df)
-        for equip_type, count in type_counts.items():
+        total = analysis['total_records']
+        for equip_type, count in analysis['equipment_types'].items():
             percentage = (count / total) * 100
             type_data.append([str(equip_type), str(count), f"{percentage:.1f}%"])
         
@@ -219,33 +338,49 @@ def generate_pdf_report(dataset, df, user):
     story.append(preview_table)
     
     # Build PDF
-    doc.build(story)
+    if on_page:
+        def page_rendered(canvas, doc):
+            on_page(doc.page)
+        doc.build(story, onFirstPage=page_rendered, onLaterPages=page_rendered)
+    else:
+        doc.build(story)
     
     return filepath
 
 
+def _remove_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
+
 def cleanup_old_datasets(user, max_count=5):
     """
     Keep only the latest max_count datasets for a user
     
+    Rows are deleted in one transaction with a single DELETE; files are
+    removed only after it commits, so a rollback never leaves records
+    pointing at missing files.
+    
     Args:
         user: User model instance
         max_count: Maximum number of datasets to keep
     """
     from .models import Dataset
     
-    datasets = Dataset.objects.filter(user=user).order_by('-uploaded_at')
-    
-    if datasets.count() > max_count:
-        # Get datasets to delete
-        to_delete = datasets[max_count:]
+    with transaction.atomic():
+        stale = list(
+            Dataset.objects.filter(user=user)
+            .order_by('-uploaded_at')
+            .values_list('id', 'file')[max_count:]
+        )
+        if not stale:
+            return
+        
+        Dataset.objects.filter(id__in=[pk for pk, _ in stale]).delete()
         
-        # Delete files and database records
-        for dataset in to_delete:
-            if dataset.file:
-                try:
-                    if os.path.exists(dataset.file.path):
-                        os.remove(dataset.file.path)
-                except Exception:
-                    pass
-            dataset.delete()
\ No newline at end of file
+        paths = [os.path.join(settings.MEDIA_ROOT, name) for _, name in stale if name]
+        transaction.on_commit(lambda: _remove_files(paths))
@@ -1,14 +1,18 @@
 # analyzer/views.py
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
 from django.db.models import Count
-import pandas as pd
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
 import io
 import os
 
@@ -17,7 +21,21 @@ from .serializers import (
     DatasetSerializer, DatasetUploadSerializer, AnalysisReportSerializer,
     DataSummarySerializer, UserRegistrationSerializer, UserSerializer
 )
-from .utils import analyze_csv_data, generate_pdf_report, cleanup_old_datasets
+from .progress import (
+    EventStreamRenderer, ProgressReporter, ProgressUploadHandler, event_stream,
+    is_job_id, job_id_from, last_event_id, stream_headers
+)
+from .compression import read_csv
+from .counters import get_user_stats, storage_remaining
+from .downloads import has_valid_signature, serve_file
+from .export import EXPORT_FORMATS, check_export, export_rows
+from .query import QueryError
+from .response_cache import cached, dataset_scope, metrics, user_scope
+from .services import (
+    parse_data_query, process_upload, read_data_page, save_dataset, type_summary
+)
+from .singleflight import coalesce, flight_key
+from .utils import STATS_VERSION, generate_pdf_report, refresh_dataset_stats, merge_summary_stats
 
 
 class DatasetViewSet(viewsets.ModelViewSet):
@@ -27,60 +45,117 @@ class DatasetViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return datasets for the current user only"""
-        return Dataset.objects.filter(user=self.request.user)
+        queryset = Dataset.objects.filter(user=self.request.user)
+        
+        # Optional list filters (?type=Pump, ?column=Pressure), served by GIN indexes on PostgreSQL
+        if self.action == 'list':
+            equipment_type = self.request.query_params.get('type')
+            if equipment_type:
+                queryset = queryset.filter(equipment_types__has_key=equipment_type)
+            column = self.request.query_params.get('column')
+            if column:
+                queryset = queryset.filter(summary_stats__has_key=column)
+        
+        return queryset
     
     @action(detail=False, methods=['post'], serializer_class=DatasetUploadSerializer)
     def upload(self, request):
-        """Upload and analyze a CSV file"""
+        """Upload and analyze a CSV file (progress events with an X-Job-Id header)"""
+        progress = ProgressReporter(job_id_from(request), request.user.id)
+        request.upload_handlers.insert(0, ProgressUploadHandler(request, progress))
         serializer = DatasetUploadSerializer(data=request.data)
         
         if not serializer.is_valid():
+            progress('error', message='Invalid upload')
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         file = serializer.validated_data['file']
         
+        remaining = storage_remaining(request.user)
+        if remaining is not None and file.size > remaining:
+            progress('error', message='Storage quota exceeded')
+            return Response({
+                'error': 'Storage quota exceeded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            # Read and analyze CSV
-            df = pd.read_csv(file)
-            analysis_result = analyze_csv_data(df)
+            # Parse, validate and clean, then analyze the valid rows
+            upload = process_upload(file, progress)
+            if upload['analysis'] is None:
+                progress('error', message='CSV file contains no valid rows')
+                return Response({
+                    'error': 'CSV file contains no valid rows',
+                    'validation_report': upload['validation_report']
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Create dataset instance
-            dataset = Dataset.objects.create(
+            content = upload['content']
+            dataset = Dataset(
                 user=request.user,
                 filename=file.name,
-                file=file,
-                total_records=analysis_result['total_records'],
-                summary_stats=analysis_result['summary_stats'],
-                equipment_types=analysis_result['equipment_types'],
+                file=ContentFile(content, name=file.name + upload['extension']),
                 file_size=file.size,
-                columns=analysis_result['columns']
+                stored_size=len(content),
+                validation_report=upload['validation_report'],
+                zone_map=upload['zone_map']
             )
-            
-            # Cleanup old datasets (keep only last 5)
-            cleanup_old_datasets(request.user, max_count=settings.MAX_DATASET_HISTORY)
+            dataset.apply_analysis(upload['analysis'])
+            save_dataset(dataset, request.user)
+            progress('done', dataset_id=dataset.id)
             
             return Response({
                 'message': 'File uploaded and analyzed successfully',
                 'dataset': DatasetSerializer(dataset, context={'request': request}).data,
-                'summary': analysis_result
+                'summary': dataset.get_stats_payload()
             }, status=status.HTTP_201_CREATED)
         
         except Exception as e:
+            progress('error', message=str(e))
             return Response({
                 'error': f'Error processing CSV file: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
-        """Get detailed summary of a specific dataset"""
+        """
+        Get the stored stats payload of a specific dataset
+        
+        With ?type=<Type>, analyze only the rows of that equipment type,
+        reading just the blocks whose zone map lists it.
+        """
         dataset = self.get_object()
         
+        equipment_type = request.query_params.get('type')
+        if equipment_type:
+            try:
+                # Identical concurrent requests share one read and analysis
+                analysis_result = cached(
+                    'summary', dataset_scope(dataset.id),
+                    lambda: coalesce(flight_key(dataset, 'summary', type=equipment_type),
+                                     lambda: type_summary(dataset, equipment_type)),
+                    type=equipment_type)
+                if analysis_result is None:
+                    return Response({
+                        'error': 'Dataset has no Type column'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                return Response(analysis_result, status=status.HTTP_200_OK)
+            
+            except Exception as e:
+                return Response({
+                    'error': f'Error reading dataset: {str(e)}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            # Re-read CSV for fresh data
-            df = pd.read_csv(dataset.file.path)
-            analysis_result = analyze_csv_data(df)
+            def stats_payload():
+                # Stats are computed on upload; only outdated payloads re-read the CSV
+                current = dataset
+                if current.stats_version < STATS_VERSION:
+                    current = coalesce(flight_key(dataset, 'refresh'),
+                                       lambda: refresh_dataset_stats(dataset))
+                return current.get_stats_payload()
             
-            return Response(analysis_result, status=status.HTTP_200_OK)
+            return Response(cached('summary', dataset_scope(dataset.id), stats_payload),
+                            status=status.HTTP_200_OK)
         
         except Exception as e:
             return Response({
@@ -89,73 +164,223 @@ class DatasetViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def data(self, request, pk=None):
-        """Get raw data from the dataset with pagination"""
+        """
+        Get raw data from the dataset with pagination
+        
+        Optional query params (see analyzer/query.py): filter, sort and
+        columns. Only the referenced columns are parsed from the CSV.
+        """
         dataset = self.get_object()
         
         try:
-            df = pd.read_csv(dataset.file.path)
-            
+            query = parse_data_query(request.query_params, dataset.columns)
+        except QueryError as e:
+            return Response({
+                'error': f'Invalid query: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
             # Get pagination parameters
             page = int(request.query_params.get('page', 1))
             page_size = int(request.query_params.get('page_size', 100))
             
-            # Calculate pagination
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            
-            # Get paginated data
-            paginated_df = df.iloc[start_idx:end_idx]
-            
-            return Response({
-                'total_records': len(df),
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (len(df) + page_size - 1) // page_size,
-                'columns': df.columns.tolist(),
-                'data': paginated_df.to_dict('records')
-            }, status=status.HTTP_200_OK)
+            # Identical concurrent page requests share one read
+            key = flight_key(dataset, 'data', page=page, page_size=page_size,
+                             **{name: request.query_params.get(name, '')
+                                for name in ('filter', 'sort', 'columns')})
+            return Response(coalesce(key, lambda: read_data_page(dataset, query, page, page_size)),
+                            status=status.HTTP_200_OK)
         
+        except QueryError as e:
+            return Response({
+                'error': f'Invalid query: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'error': f'Error reading dataset: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream the (filtered, projected) rows as CSV, NDJSON or Parquet
+        
+        Query params: output (csv, ndjson or parquet; default csv), filter
+        and columns as for data. Rows are read and sent chunk by chunk, see
+        analyzer/export.py.
+        """
+        dataset = self.get_object()
+        output = request.query_params.get('output', 'csv')
+        
+        try:
+            query = parse_data_query(request.query_params, dataset.columns)
+            check_export(output, query)
+        except QueryError as e:
+            return Response({
+                'error': f'Invalid query: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not dataset.file or not os.path.exists(dataset.file.path):
+            return Response({
+                'error': 'Dataset file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        content_type, extension = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(export_rows(dataset, query, output),
+                                         content_type=content_type)
+        filename = os.path.splitext(dataset.filename)[0] + extension
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        # Rows go out as they are read; proxies should not buffer the file
+        return stream_headers(response)
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def download(self, request, pk=None):
+        """
+        Download the stored CSV (owner token or signed file_url)
+        
+        See analyzer/downloads.py for ranges, conditional requests,
+        front-server offload and Content-Encoding of compressed files.
+        """
+        dataset = _downloadable(request, Dataset.objects.all(), 'dataset-download', pk)
+        if dataset is None or not dataset.file:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return serve_file(request, dataset.file, dataset.filename, 'text/csv')
+        except FileNotFoundError:
+            return Response({
+                'error': 'Dataset file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+    
     @action(detail=False, methods=['get'])
     def history(self, request):
         """Get upload history for the current user"""
-        datasets = self.get_queryset()[:settings.MAX_DATASET_HISTORY]
-        serializer = self.get_serializer(datasets, many=True)
+        def history_payload():
+            datasets = self.get_queryset()[:settings.MAX_DATASET_HISTORY]
+            serializer = self.get_serializer(datasets, many=True)
+            return {
+                'count': datasets.count(),
+                'max_history': settings.MAX_DATASET_HISTORY,
+                'results': serializer.data
+            }
         
-        return Response({
-            'count': datasets.count(),
-            'max_history': settings.MAX_DATASET_HISTORY,
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        # File URLs are absolute, so the host is part of the key
+        return Response(cached('history', user_scope(request.user.id), history_payload,
+                               host=request.build_absolute_uri('/')),
+                        status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def aggregate(self, request):
+        """
+        Aggregate one metric across the user's datasets from their stored stats
+        
+        Query params: metric (required), group_by ('Type' or 'dataset'),
+        datasets (comma-separated ids), last (only the N most recent)
+        """
+        metric = request.query_params.get('metric')
+        group_by = request.query_params.get('group_by')
+        
+        if not metric:
+            return Response({'error': 'metric is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if group_by not in (None, 'Type', 'dataset'):
+            return Response({
+                'error': "group_by must be 'Type' or 'dataset'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        datasets = Dataset.objects.filter(
+            user=request.user, summary_stats__has_key=metric
+        ).only('id', 'filename', 'file', 'summary_stats', 'type_stats', 'stats_version')
+        
+        try:
+            ids = request.query_params.get('datasets')
+            if ids:
+                datasets = datasets.filter(id__in=[int(i) for i in ids.split(',') if i])
+            last = request.query_params.get('last')
+            if last:
+                last = int(last)
+                if last < 1:
+                    raise ValueError(last)
+                datasets = datasets[:last]
+        except ValueError:
+            return Response({
+                'error': 'datasets must be integers and last a positive integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            datasets = [refresh_dataset_stats(dataset) for dataset in datasets]
+        except Exception as e:
+            return Response({
+                'error': f'Error reading dataset: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = {
+            'metric': metric,
+            'group_by': group_by,
+            'datasets': [dataset.id for dataset in datasets],
+            'overall': merge_summary_stats(dataset.summary_stats[metric] for dataset in datasets),
+        }
+        
+        if group_by == 'dataset':
+            result['groups'] = {
+                str(dataset.id): dict(dataset.summary_stats[metric], filename=dataset.filename)
+                for dataset in datasets
+            }
+        elif group_by == 'Type':
+            parts = {}
+            for dataset in datasets:
+                for eq_type, stats in dataset.type_stats.items():
+                    if metric in stats:
+                        parts.setdefault(eq_type, []).append(stats[metric])
+            result['groups'] = {
+                eq_type: merge_summary_stats(type_parts)
+                for eq_type, type_parts in sorted(parts.items())
+            }
+        
+        return Response(result, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'])
     def generate_report(self, request, pk=None):
-        """Generate PDF report for a dataset"""
+        """Generate PDF report for a dataset (progress events with an X-Job-Id header)"""
         dataset = self.get_object()
+        progress = ProgressReporter(job_id_from(request), request.user.id)
         
-        try:
-            # Read CSV data
-            df = pd.read_csv(dataset.file.path)
+        remaining = storage_remaining(request.user)
+        if remaining is not None and remaining <= 0:
+            progress('error', message='Storage quota exceeded')
+            return Response({
+                'error': 'Storage quota exceeded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        def build_report():
+            # Stats come from the stored payload; only the preview rows are parsed
+            refresh_dataset_stats(dataset)
+            progress('stats_computed', columns=len(dataset.summary_stats))
+            df = read_csv(dataset.file.path, nrows=10)
             
             # Generate PDF report
-            report_path = generate_pdf_report(dataset, df, request.user)
+            report_path = generate_pdf_report(
+                dataset, df, request.user, analysis=dataset.get_stats_payload(),
+                on_page=lambda page: progress('pdf_page', page=page))
             
             # Create AnalysisReport instance
             with open(report_path, 'rb') as f:
                 report = AnalysisReport.objects.create(
                     dataset=dataset,
                     user=request.user,
-                    report_file=f,
-                    report_type='summary'
+                    report_file=File(f, name=os.path.basename(report_path)),
+                    report_type='summary',
+                    file_size=os.path.getsize(report_path)
                 )
             
             # Clean up temporary file
             if os.path.exists(report_path):
                 os.remove(report_path)
+            return report
+        
+        try:
+            # Clicks on "Generate Report" for the same dataset while one is
+            # being built get that report instead of rendering another
+            report = coalesce(flight_key(dataset, 'report'), build_report)
+            progress('done', report_id=report.id)
             
             return Response({
                 'message': 'Report generated successfully',
@@ -163,6 +388,7 @@ class DatasetViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_201_CREATED)
         
         except Exception as e:
+            progress('error', message=str(e))
             return Response({
                 'error': f'Error generating report: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -176,6 +402,31 @@ class AnalysisReportViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """Return reports for the current user only"""
         return AnalysisReport.objects.filter(user=self.request.user)
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def download(self, request, pk=None):
+        """Download the PDF of a report (owner token or signed report_url)"""
+        report = _downloadable(request, AnalysisReport.objects.select_related('dataset'),
+                               'report-download', pk)
+        if report is None or not report.report_file:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            filename = f"report_{report.dataset_id}_{report.generated_at:%Y%m%d_%H%M%S}.pdf"
+            return serve_file(request, report.report_file, filename, 'application/pdf')
+        except FileNotFoundError:
+            return Response({
+                'error': 'Report file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+
+def _downloadable(request, queryset, route, pk):
+    """The record behind a download URL if the owner or a valid signature asks for it"""
+    record = queryset.filter(pk=pk).first()
+    if record is None:
+        return None
+    if record.user_id == request.user.id or has_valid_signature(request, route, record.pk):
+        return record
+    return None
 
 
 @api_view(['POST'])
@@ -245,11 +496,41 @@ def logout_user(request):
 def user_profile(request):
     """Get current user profile"""
     user = request.user
-    datasets_count = Dataset.objects.filter(user=user).count()
-    reports_count = AnalysisReport.objects.filter(user=user).count()
     
-    return Response({
-        'user': UserSerializer(user).data,
-        'datasets_count': datasets_count,
-        'reports_count': reports_count
-    }, status=status.HTTP_200_OK)
+    def profile_payload():
+        stats = get_user_stats(user)
+        return {
+            'user': UserSerializer(user).data,
+            'datasets_count': stats.dataset_count,
+            'reports_count': stats.report_count,
+            'storage_bytes': stats.total_bytes
+        }
+    
+    return Response(cached('profile', user_scope(user.id), profile_payload),
+                    status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_metrics(request):
+    """Hit/miss counts of the response cache in this worker process"""
+    return Response(metrics(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def job_events(request, job_id):
+    """
+    Stream progress events of an upload or report job as Server-Sent Events
+    
+    The stream closes after SYNC_STREAM_TIMEOUT to free the worker thread;
+    clients reconnect with Last-Event-ID and continue from there.
+    """
+    if not is_job_id(job_id):
+        return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return stream_headers(StreamingHttpResponse(
+        event_stream(job_id, request.user.id, last_event_id(request)),
+        content_type='text/event-stream'
+    ))
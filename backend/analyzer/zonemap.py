@@ -0,0 +1,229 @@
+# analyzer/zonemap.py
+"""
+Block zone maps for stored CSV files
+
+A zone map splits a dataset file into blocks of BLOCK_ROWS rows and records,
+per block, its byte range in the file, min/max/null count for every numeric
+column and the distinct values of the Type column. Reads that filter on
+those columns, or that only need a page of rows, can then parse just the
+blocks that may contain matches instead of the whole file.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .compression import codec_for, read_block_range, read_header
+
+
+ZONE_MAP_VERSION = 1
+BLOCK_ROWS = 65536
+
+# Distinct Type values stored per block before the set is dropped (no pruning)
+MAX_BLOCK_TYPES = 256
+
+
+def _line_starts(data):
+    """Byte offsets where each line of the file starts"""
+    newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    return starts[starts < len(data)]
+
+
+def _csv_dtype(dtype):
+    """
+    dtype read_csv(dtype=...) can apply to a column parsed as `dtype`
+
+    read_csv only yields datetimes through parse_dates, and the C parser
+    (used by every later read of the stored file) leaves timestamps and
+    durations as text. The pyarrow parser used at upload infers them, so
+    such columns are read back as strings, as whole-file reads see them.
+    """
+    dtype = str(dtype)
+    if dtype.startswith(('datetime64', 'timedelta64')):
+        return 'str'
+    return dtype
+
+
+def _json_number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def build_zone_map(data, df, block_rows=BLOCK_ROWS):
+    """
+    Build the zone map for a CSV file
+
+    Args:
+        data: Raw bytes of the stored file
+        df: The file parsed with default read_csv options
+        block_rows: Rows per block
+
+    Returns:
+        dict: Zone map, or {} when rows do not map one-to-one onto lines
+              (quoted newlines, blank lines), in which case reads fall back
+              to parsing the whole file
+    """
+    starts = _line_starts(data)
+    if len(starts) - 1 != len(df) or len(df) == 0:
+        return {}
+
+    row_starts = starts[1:]
+    block_starts = np.arange(0, len(df), block_rows)
+    offsets = row_starts[block_starts]
+    ends = np.append(offsets[1:], len(data))
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    column_zones = {}
+    for col in numeric_cols:
+        values = df[col].to_numpy(dtype=float)
+        nulls = np.isnan(values)
+        # fmin/fmax ignore NaN; a block of only NaNs reduces to NaN
+        column_zones[col] = (
+            np.fmin.reduceat(values, block_starts),
+            np.fmax.reduceat(values, block_starts),
+            np.add.reduceat(nulls, block_starts),
+        )
+
+    type_codes, type_names = (None, None)
+    if 'Type' in df.columns:
+        type_codes, type_names = pd.factorize(df['Type'].astype(str))
+
+    blocks = []
+    for i, start in enumerate(block_starts):
+        stop = min(start + block_rows, len(df))
+        block = {
+            'start': int(start),
+            'rows': int(stop - start),
+            'offset': int(offsets[i]),
+            'length': int(ends[i] - offsets[i]),
+            'columns': {
+                col: {
+                    'min': _json_number(mins[i]),
+                    'max': _json_number(maxs[i]),
+                    'nulls': int(null_counts[i]),
+                }
+                for col, (mins, maxs, null_counts) in column_zones.items()
+            },
+        }
+        if type_codes is not None:
+            present = np.unique(type_codes[start:stop])
+            block['types'] = ([str(type_names[c]) for c in present]
+                              if len(present) <= MAX_BLOCK_TYPES else None)
+        blocks.append(block)
+
+    return {
+        'version': ZONE_MAP_VERSION,
+        'block_rows': block_rows,
+        'header_length': int(row_starts[0]),
+        'dtypes': {col: _csv_dtype(dtype) for col, dtype in df.dtypes.items()},
+        'blocks': blocks,
+    }
+
+
+def _numeric_may_match(zone, op, value):
+    low, high, nulls = zone['min'], zone['max'], zone['nulls']
+    if op == '!=':
+        # NaN != x is true, so only a block of one repeated value can be skipped
+        try:
+            target = float(value)
+        except ValueError:
+            return True
+        return nulls > 0 or low != target or high != target
+    if low is None:
+        return False  # all values missing; no comparison can match
+
+    try:
+        targets = [float(v) for v in value] if op == 'in' else [float(value)]
+    except ValueError:
+        return True  # let the query layer report the bad value
+
+    if op in ('==', 'in'):
+        return any(low <= t <= high for t in targets)
+    target = targets[0]
+    if op == '>':
+        return high > target
+    if op == '>=':
+        return high >= target
+    if op == '<':
+        return low < target
+    if op == '<=':
+        return low <= target
+    return True
+
+
+def _types_may_match(types, op, value):
+    if types is None:
+        return True
+    if op == '==':
+        return value in types
+    if op == 'in':
+        return any(v in types for v in value)
+    if op == '!=':
+        return types != [value]
+    return True
+
+
+def block_may_match(block, clauses):
+    """False when some clause provably rejects every row of the block"""
+    for column, op, value in clauses:
+        zone = block['columns'].get(column)
+        if zone is not None:
+            if not _numeric_may_match(zone, op, value):
+                return False
+        elif column == 'Type' and 'types' in block:
+            if not _types_may_match(block['types'], op, value):
+                return False
+    return True
+
+
+def blocks_for_clauses(zone_map, clauses):
+    """Indices of blocks that may contain rows matching every clause"""
+    return [i for i, block in enumerate(zone_map['blocks']) if block_may_match(block, clauses)]
+
+
+def blocks_for_rows(zone_map, start, stop):
+    """Indices of blocks overlapping rows [start, stop)"""
+    return [i for i, block in enumerate(zone_map['blocks'])
+            if block['start'] < stop and block['start'] + block['rows'] > start]
+
+
+def read_blocks(path, zone_map, indices, usecols=None):
+    """
+    Parse only the given blocks of a stored CSV
+
+    Adjacent blocks are read as one byte range (one run of frames in a
+    compressed file). The stored dtypes are applied so every block parses
+    the same way the whole file did.
+
+    Returns:
+        DataFrame: Rows of the selected blocks in file order (index is the
+                   row number in the full file)
+    """
+    blocks = zone_map['blocks']
+    # _csv_dtype again for zone maps stored before it was applied
+    dtypes = {col: _csv_dtype(dtype) for col, dtype in zone_map['dtypes'].items()
+              if usecols is None or col in usecols}
+    if not indices:
+        columns = usecols if usecols is not None else list(zone_map['dtypes'])
+        return pd.DataFrame({col: pd.Series(dtype=dtypes.get(col, 'object')) for col in columns})
+
+    # Merge runs of adjacent blocks into single reads
+    runs = []
+    for i in indices:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+
+    codec = codec_for(str(path))
+    frames = []
+    with open(path, 'rb') as f:
+        header = read_header(f, codec, zone_map)
+        for first, last in runs:
+            chunk = read_block_range(f, codec, zone_map, first, last)
+            frame = pd.read_csv(io.BytesIO(header + chunk), usecols=usecols, dtype=dtypes)
+            frame.index = pd.RangeIndex(blocks[first]['start'], blocks[first]['start'] + len(frame))
+            frames.append(frame)
+
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
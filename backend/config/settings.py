@@ -54,11 +54,46 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database: SQLite by default, PostgreSQL when DB_ENGINE=postgres
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'chemflow'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Django 4.2 has no connection pool (it arrives in 5.1), so each
+            # worker keeps its connection open for reuse. For a real pool put
+            # PgBouncer in front and set DB_CONN_MAX_AGE=0
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
     }
+
+# Applied to each new SQLite connection (analyzer/db.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -87,6 +122,17 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Dataset and report files are stored under sharded, content-hashed names
+# (analyzer/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'analyzer.storage.ShardedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS Settings
@@ -96,7 +142,7 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'analyzer.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -106,9 +152,85 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 100,
 }
 
+# Token authentication cache (analyzer/authentication.py): token -> user
+# entries kept for TOKEN_CACHE_TTL seconds. With REDIS_URL it uses the
+# "shared" cache, so a logout or deactivation reaches every worker at once;
+# otherwise each process has its own and other workers may accept a revoked
+# token until their entry expires, so the per-process TTL is kept short
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or ('shared' if os.environ.get('REDIS_URL') else None)
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300 if TOKEN_CACHE_ALIAS else 30))
+TOKEN_CACHE_SIZE = 10000
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Compression of stored dataset CSVs (analyzer/compression.py): 'auto' (zstd
+# when the zstandard package is installed, else gzip), 'zstd', 'gzip' or 'none'
+DATASET_COMPRESSION = os.environ.get('DATASET_COMPRESSION', 'auto')
+
+# Downloads (analyzer/downloads.py): lifetime of signed file_url/report_url
+# links (longer than RESPONSE_CACHE_TTL, which may serve them from cache), and
+# optional offload to the front server: 'x-accel-redirect' (nginx, with an
+# internal location DOWNLOAD_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'
+DOWNLOAD_URL_MAX_AGE = int(os.environ.get('DOWNLOAD_URL_MAX_AGE', 3600))
+DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD', '')
+DOWNLOAD_ACCEL_PREFIX = os.environ.get('DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+
+# Response cache for summary, history and profile (analyzer/response_cache.py):
+# a per-process LRU in front of RESPONSE_CACHE_ALIAS, which should be shared
+# (e.g. "shared" with REDIS_URL) when several workers serve requests
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+RESPONSE_CACHE_LOCAL_TTL = int(os.environ.get('RESPONSE_CACHE_LOCAL_TTL', 5))
+RESPONSE_CACHE_LOCAL_SIZE = 1000
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 
+# Maximum accepted size for an uploaded CSV file
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Upload validation: accepted (low, high) per column, None for an open bound;
+# rows outside the range or with non-numeric values are quarantined
+VALIDATION_RANGES = {
+    'Flowrate': (0, None),
+    'Pressure': (0, None),
+    'Temperature': (-273.15, None),
+}
+
+# Parallel analysis (analyzer/parallel.py): worker processes, 0 or 1 to disable,
+# and the row count from which it is used
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 0))
+PARALLEL_ANALYSIS_MIN_ROWS = int(os.environ.get('PARALLEL_ANALYSIS_MIN_ROWS', 2_000_000))
+
+# Async dataset views (analyzer/async_views.py) for ASGI deployments: thread
+# pools for file I/O and for CSV parsing/analysis. ASYNC_DATASET_VIEWS=1 serves
+# them at the regular upload/summary/data URLs; they are always under /api/async/
+ASYNC_DATASET_VIEWS = os.environ.get('ASYNC_DATASET_VIEWS') == '1'
+ASYNC_IO_WORKERS = int(os.environ.get('ASYNC_IO_WORKERS', 8))
+ASYNC_ANALYSIS_WORKERS = int(os.environ.get('ASYNC_ANALYSIS_WORKERS', os.cpu_count() or 1))
+
+# Cache holding upload/report progress events (analyzer/progress.py); must be
+# shared (e.g. "shared" with REDIS_URL) when several workers serve requests
+PROGRESS_CACHE_ALIAS = os.environ.get('PROGRESS_CACHE_ALIAS', 'default')
+
+# Directory for the file locks that let workers on one host share the result
+# of identical concurrent summary/data/report requests (analyzer/singleflight.py);
+# unset, requests are coalesced within each worker only
+SINGLE_FLIGHT_LOCK_DIR = os.environ.get('SINGLE_FLIGHT_LOCK_DIR') or None
+
+# Bytes of datasets (as uploaded, before compression) and reports each user
+# may store (analyzer/counters.py); 0 for no limit
+USER_STORAGE_QUOTA = int(os.environ.get('USER_STORAGE_QUOTA', 0))
+
 # Maximum number of datasets to keep in history
 MAX_DATASET_HISTORY = 5
\ No newline at end of file
@@ -1,8 +1,12 @@
 # desktop/api/client.py
 
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, Tuple
+import json
 import os
+import tempfile
+import time
+import uuid
 
 class APIClient:
     def __init__(self, base_url="http://127.0.0.1:8000/api"):
@@ -112,8 +116,8 @@ class APIClient:
     # -------------------------
     # DATASETS
     # -------------------------
-    def upload_csv(self, file_path: str) -> Dict[str, Any]:
-        """Upload CSV file using the /upload/ endpoint"""
+    def upload_csv(self, file_path: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Upload CSV file using the /upload/ endpoint (progress under job_id, if given)"""
         # Use the correct upload endpoint!
         url = f"{self.base_url}/datasets/upload/"
         
@@ -132,6 +136,8 @@ class APIClient:
                 headers = {}
                 if self.token:
                     headers["Authorization"] = f"Token {self.token}"
+                if job_id:
+                    headers["X-Job-Id"] = job_id
                 
                 response = self.session.post(
                     url, 
@@ -219,19 +225,146 @@ class APIClient:
                 raise Exception("Dataset not found")
             raise Exception(f"HTTP Error: {e.response.status_code}")
 
+    def get_dataset_rows(self, dataset_id: int, page: int = 1, page_size: int = 100,
+                         filter: Optional[str] = None, sort: Optional[str] = None,
+                         columns: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a page of dataset rows, filtered/sorted/projected on the server
+
+        Example: filter="Type == Pump and Pressure > 50", sort="-Pressure",
+        columns="Equipment Name,Pressure"
+        """
+        url = f"{self.base_url}/datasets/{dataset_id}/data/"
+        params = {"page": page, "page_size": page_size}
+        for key, value in (("filter", filter), ("sort", sort), ("columns", columns)):
+            if value:
+                params[key] = value
+        try:
+            response = self.session.get(url, params=params, headers=self._auth_headers(), timeout=30)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            raise Exception("Cannot connect to backend server")
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401:
+                raise Exception("Authentication required")
+            elif e.response.status_code == 404:
+                raise Exception("Dataset not found")
+            try:
+                error = e.response.json().get("error")
+            except ValueError:
+                error = None
+            raise Exception(error or f"HTTP Error: {e.response.status_code}")
+
+    def get_dataset_summary(self, dataset_id: int) -> Dict[str, Any]:
+        """Get the server-computed stats payload for a dataset"""
+        url = f"{self.base_url}/datasets/{dataset_id}/summary/"
+        try:
+            response = self.session.get(url, headers=self._auth_headers(), timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            raise Exception("Cannot connect to backend server")
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401:
+                raise Exception("Authentication required")
+            elif e.response.status_code == 404:
+                raise Exception("Dataset not found")
+            raise Exception(f"HTTP Error: {e.response.status_code}")
+
+    def aggregate(self, metric: str, group_by: Optional[str] = None,
+                  last: Optional[int] = None) -> Dict[str, Any]:
+        """Aggregate a metric across the user's datasets on the server"""
+        url = f"{self.base_url}/datasets/aggregate/"
+        params = {"metric": metric}
+        if group_by:
+            params["group_by"] = group_by
+        if last:
+            params["last"] = last
+        try:
+            response = self.session.get(url, params=params, headers=self._auth_headers(), timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            raise Exception("Cannot connect to backend server")
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401:
+                raise Exception("Authentication required")
+            try:
+                error = e.response.json().get("error")
+            except ValueError:
+                error = None
+            raise Exception(error or f"HTTP Error: {e.response.status_code}")
+
+    def export_dataset(self, dataset_id: int, dest_path: str, output: str = "csv",
+                       filter: Optional[str] = None, columns: Optional[str] = None,
+                       progress=None) -> int:
+        """
+        Save a (filtered, projected) export of a dataset to dest_path
+
+        output is "csv", "ndjson" or "parquet". The response is written to
+        disk as it arrives, never held in memory; dest_path only appears
+        once the download is complete. progress, if given, is called with
+        the number of bytes written so far. Runs on its own connection, so
+        it can be called from a worker thread.
+
+        Returns:
+            int: Bytes written
+        """
+        url = f"{self.base_url}/datasets/{dataset_id}/export/"
+        params = {"output": output}
+        for key, value in (("filter", filter), ("columns", columns)):
+            if value:
+                params[key] = value
+
+        directory = os.path.dirname(os.path.abspath(dest_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".export-")
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as f, requests.get(
+                    url, params=params, headers=self._auth_headers(),
+                    stream=True, timeout=(10, 60)) as response:
+                if not response.ok:
+                    # Read the (small) JSON error before the stream is closed
+                    response.content
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=256 * 1024):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(written)
+            os.replace(tmp_path, dest_path)
+            return written
+        except requests.exceptions.ConnectionError:
+            raise Exception("Cannot connect to backend server")
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 401:
+                raise Exception("Authentication required")
+            elif e.response.status_code == 404:
+                raise Exception("Dataset not found")
+            try:
+                error = e.response.json().get("error")
+            except ValueError:
+                error = None
+            raise Exception(error or f"HTTP Error: {e.response.status_code}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     # -------------------------
     # REPORTS
     # -------------------------
-    def generate_report(self, dataset_id: int) -> Dict[str, Any]:
-        """Generate PDF report for dataset"""
-        url = f"{self.base_url}/reports/"
-        payload = {"dataset_id": dataset_id}
+    def generate_report(self, dataset_id: int, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate PDF report for dataset (progress under job_id, if given)"""
+        url = f"{self.base_url}/datasets/{dataset_id}/generate_report/"
+        headers = self._auth_headers()
+        if job_id:
+            headers["X-Job-Id"] = job_id
         
         try:
             response = self.session.post(
                 url, 
-                json=payload, 
-                headers=self._auth_headers(),
+                headers=headers,
                 timeout=30
             )
             response.raise_for_status()
@@ -260,3 +393,57 @@ class APIClient:
             if e.response.status_code == 401:
                 raise Exception("Authentication required")
             raise Exception(f"HTTP Error: {e.response.status_code}")
+
+    # -------------------------
+    # PROGRESS
+    # -------------------------
+    # Seconds to wait before reopening a progress stream the server closed
+    PROGRESS_RECONNECT_DELAY = 0.5
+
+    @staticmethod
+    def new_job_id() -> str:
+        """Id to send with an upload or report request and to follow its progress"""
+        return uuid.uuid4().hex
+
+    def stream_progress(self, job_id: str, stop=None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (event, data) progress events of an upload or report job
+
+        Reads the server's Server-Sent Events stream until the job reports
+        "done" or "error", or `stop` (a threading.Event) is set. The server
+        closes long streams; the client reconnects with Last-Event-ID and
+        continues after the last event it received. Runs on its own
+        connection, so it can be read from another thread while the job
+        request is in flight.
+        """
+        url = f"{self.base_url}/jobs/{job_id}/events/"
+        headers = dict(self._auth_headers(), Accept="text/event-stream")
+
+        try:
+            while stop is None or not stop.is_set():
+                # The server sends a keep-alive at least every 15 s
+                with requests.get(url, headers=headers, stream=True, timeout=(10, 60)) as response:
+                    response.raise_for_status()
+                    event, data = None, []
+                    for line in response.iter_lines(decode_unicode=True):
+                        if stop is not None and stop.is_set():
+                            return
+                        if line.startswith("id:"):
+                            headers["Last-Event-ID"] = line[3:].strip()
+                        elif line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data.append(line[5:].strip())
+                        elif not line and event:
+                            yield event, json.loads("\n".join(data)) if data else {}
+                            if event in ("done", "error"):
+                                return
+                            event, data = None, []
+                if stop is not None:
+                    stop.wait(self.PROGRESS_RECONNECT_DELAY)
+                else:
+                    time.sleep(self.PROGRESS_RECONNECT_DELAY)
+        except requests.exceptions.ConnectionError:
+            raise Exception("Cannot connect to backend server")
+        except requests.exceptions.HTTPError as e:
+            raise Exception(f"Progress stream failed: {e.response.status_code}")
@@ -1,8 +1,10 @@
 # desktop/gui/animated_background.py
 
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QPainter, QLinearGradient, QRadialGradient, QColor, QBrush
+from PyQt5.QtCore import QTimer, Qt, QRectF
+from PyQt5.QtGui import (
+    QPainter, QLinearGradient, QRadialGradient, QColor, QPixmap, QFont
+)
 import math
 import time
 
@@ -11,85 +13,215 @@ class AnimatedBackground(QWidget):
     """
     Animated, flowy gradient background inspired by the React iridescent shader.
     Uses QPainter (no OpenGL) so normal Qt widgets can sit on top.
+
+    The gradient layers are rendered once per size into cached pixmaps; each
+    frame only blits them and moves the spotlight layer. The frame rate adapts
+    to how long painting takes, and animation pauses while the widget is
+    hidden, minimized or not exposed.
     """
 
-    def __init__(self, parent=None):
+    # Defaults for every instance; main.py overrides them from the command line
+    default_mode = "animated"      # "animated" or "static"
+    max_fps = 30
+    min_fps = 8
+    show_stats = False
+
+    IDLE_POLL_MS = 500             # how often to re-check a paused window
+
+    def __init__(self, parent=None, mode=None, show_stats=None):
         super().__init__(parent)
         self.start_time = time.time()
+        self.mode = mode or self.default_mode
+        self.stats_enabled = self.show_stats if show_stats is None else show_stats
+
+        # Cached layers, rebuilt when the widget size changes
+        self._cache_size = None
+        self._base_layer = None
+        self._spot_layer = None
+        self._glow_layer = None
+        self._spot_radius = 0.0
+
+        # Adaptive frame rate and readout bookkeeping
+        self.fps = self.max_fps
+        self._paint_ms = 0.0
+        self._frames = 0
+        self._measured_fps = 0.0
+        self._cpu_percent = 0.0
+        self._stats_wall = time.perf_counter()
+        self._stats_cpu = time.process_time()
 
-        # Smooth animation timer (~60 fps)
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(16)
+        self.timer.timeout.connect(self._tick)
 
         # We want to paint behind child widgets
         self.setAttribute(Qt.WA_OpaquePaintEvent, False)
         self.setAutoFillBackground(False)
 
-    def paintEvent(self, event):
-        w = max(1, self.width())
-        h = max(1, self.height())
-
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # Time parameter
-        t = time.time() - self.start_time
-
-        # --------------------------
-        # 1) Base diagonal gradient
-        # --------------------------
-        base = QLinearGradient(0, 0, w, h)
-
+    # ------------------------------------------------------------
+    # Animation control
+    # ------------------------------------------------------------
+    def set_mode(self, mode):
+        """Switch between "animated" and "static" rendering"""
+        self.mode = mode
+        if mode == "static":
+            self.timer.stop()
+        elif self.isVisible():
+            self._start_timer()
+        self.update()
+
+    def _start_timer(self):
+        if self.mode == "animated":
+            self.timer.start(int(1000 / self.fps))
+
+    def _is_paused(self):
+        """True when nothing the user can see would change"""
+        window = self.window()
+        if window.isMinimized():
+            return True
+        handle = window.windowHandle()
+        if handle is not None and not handle.isExposed():
+            return True
+        return self.visibleRegion().isEmpty()
+
+    def _tick(self):
+        if self._is_paused():
+            # Keep polling slowly so animation resumes on restore
+            if self.timer.interval() != self.IDLE_POLL_MS:
+                self.timer.setInterval(self.IDLE_POLL_MS)
+            return
+
+        interval = int(1000 / self.fps)
+        if self.timer.interval() != interval:
+            self.timer.setInterval(interval)
+        self.update()
+
+    def _adapt_fps(self, paint_ms):
+        """Lower the frame rate when painting eats into the frame budget"""
+        self._paint_ms = 0.8 * self._paint_ms + 0.2 * paint_ms
+        budget_ms = 1000 / self.fps
+
+        if self._paint_ms > budget_ms * 0.25 and self.fps > self.min_fps:
+            self.fps = max(self.min_fps, self.fps - 2)
+        elif self._paint_ms < budget_ms * 0.1 and self.fps < self.max_fps:
+            self.fps = min(self.max_fps, self.fps + 1)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._start_timer()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._cache_size = None
+
+    # ------------------------------------------------------------
+    # Cached layers
+    # ------------------------------------------------------------
+    def _new_layer(self, w, h):
+        layer = QPixmap(w, h)
+        layer.fill(Qt.transparent)
+        return layer
+
+    def _build_layers(self, w, h):
+        """Pre-render the gradient layers for the current size"""
         # Colors tuned to match your hero:
         # deep navy, indigo, blue, cyan
-        c1 = QColor("#020617")   # very dark blue
-        c2 = QColor("#0f172a")   # slate/blue
-        c3 = QColor("#1e3a8a")   # indigo
-        c4 = QColor("#2563eb")   # bright blue
-        c5 = QColor("#38bdf8")   # cyan
-
-        # Animate stops slightly so it looks alive
-        osc1 = 0.05 * math.sin(t * 0.3)
-        osc2 = 0.05 * math.cos(t * 0.4)
-        osc3 = 0.05 * math.sin(t * 0.25 + 1.0)
-
-        base.setColorAt(0.0 + osc1, c1)
-        base.setColorAt(0.25 + osc2, c2)
-        base.setColorAt(0.55 + osc3, c3)
-        base.setColorAt(0.78, c4)
-        base.setColorAt(1.0, c5)
-
-        painter.fillRect(self.rect(), base)
-
-        # ---------------------------------------
-        # 2) Soft "beam" overlays like your hero
-        # ---------------------------------------
+        base = QLinearGradient(0, 0, w, h)
+        base.setColorAt(0.0, QColor("#020617"))   # very dark blue
+        base.setColorAt(0.25, QColor("#0f172a"))  # slate/blue
+        base.setColorAt(0.55, QColor("#1e3a8a"))  # indigo
+        base.setColorAt(0.78, QColor("#2563eb"))  # bright blue
+        base.setColorAt(1.0, QColor("#38bdf8"))   # cyan
+
         # Wide diagonal light band
         band = QLinearGradient(0, h * 0.3, w, h * 0.7)
         band.setColorAt(0.0, QColor(59, 130, 246, 40))   # blue, low alpha
         band.setColorAt(0.5, QColor(129, 140, 248, 90))  # indigo-ish
-        band.setColorAt(1.0, QColor(56, 189, 248, 40))   # cyan, low alpha)
-        painter.fillRect(self.rect(), band)
+        band.setColorAt(1.0, QColor(56, 189, 248, 40))   # cyan, low alpha
 
-        # Moving spotlight that slowly drifts
-        cx = w * (0.3 + 0.15 * math.sin(t * 0.2))
-        cy = h * (0.7 + 0.1 * math.cos(t * 0.27))
-        radius = max(w, h) * 0.6
+        self._base_layer = self._new_layer(w, h)
+        painter = QPainter(self._base_layer)
+        painter.fillRect(0, 0, w, h, base)
+        painter.fillRect(0, 0, w, h, band)
+        painter.end()
 
-        radial = QRadialGradient(cx, cy, radius)
+        # Spotlight rendered once, then moved by drawing at an offset
+        radius = max(w, h) * 0.6
+        size = int(radius * 2) + 1
+        radial = QRadialGradient(radius, radius, radius)
         radial.setColorAt(0.0, QColor(148, 163, 253, 120))  # soft light
         radial.setColorAt(0.5, QColor(59, 130, 246, 40))
         radial.setColorAt(1.0, QColor(15, 23, 42, 0))
 
-        painter.fillRect(self.rect(), radial)
+        self._spot_radius = radius
+        self._spot_layer = self._new_layer(size, size)
+        painter = QPainter(self._spot_layer)
+        painter.fillRect(0, 0, size, size, radial)
+        painter.end()
 
-        # ---------------------------------------
-        # 3) Subtle top-left glow (hero highlight)
-        # ---------------------------------------
+        # Subtle top-left glow (hero highlight)
         glow = QRadialGradient(w * 0.1, h * 0.1, w * 0.6)
         glow.setColorAt(0.0, QColor(59, 130, 246, 80))
         glow.setColorAt(1.0, QColor(15, 23, 42, 0))
-        painter.fillRect(self.rect(), glow)
 
+        self._glow_layer = self._new_layer(w, h)
+        painter = QPainter(self._glow_layer)
+        painter.fillRect(0, 0, w, h, glow)
         painter.end()
+
+        self._cache_size = (w, h)
+
+    # ------------------------------------------------------------
+    # Painting
+    # ------------------------------------------------------------
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        w = max(1, self.width())
+        h = max(1, self.height())
+
+        if self._cache_size != (w, h):
+            self._build_layers(w, h)
+
+        # Spotlight drifts slowly; the static mode freezes it at t=0
+        t = time.time() - self.start_time if self.mode == "animated" else 0.0
+        cx = w * (0.3 + 0.15 * math.sin(t * 0.2))
+        cy = h * (0.7 + 0.1 * math.cos(t * 0.27))
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._base_layer)
+        painter.drawPixmap(QRectF(cx - self._spot_radius, cy - self._spot_radius,
+                                  self._spot_layer.width(), self._spot_layer.height()),
+                           self._spot_layer, QRectF(self._spot_layer.rect()))
+        painter.drawPixmap(0, 0, self._glow_layer)
+
+        if self.stats_enabled:
+            self._draw_stats(painter, w)
+
+        painter.end()
+
+        if self.mode == "animated":
+            self._adapt_fps((time.perf_counter() - started) * 1000)
+
+    def _draw_stats(self, painter, w):
+        """FPS / paint time / process CPU readout for tuning"""
+        self._frames += 1
+        now = time.perf_counter()
+        elapsed = now - self._stats_wall
+        if elapsed >= 1.0:
+            cpu = time.process_time()
+            self._measured_fps = self._frames / elapsed
+            self._cpu_percent = 100.0 * (cpu - self._stats_cpu) / elapsed
+            self._frames = 0
+            self._stats_wall = now
+            self._stats_cpu = cpu
+
+        text = (f"{self._measured_fps:4.1f} fps (target {self.fps})  "
+                f"paint {self._paint_ms:.1f} ms  CPU {self._cpu_percent:.0f}%")
+        font = QFont()
+        font.setPointSize(9)
+        painter.setFont(font)
+        painter.setPen(QColor(226, 232, 240, 200))
+        painter.drawText(QRectF(0, 6, w - 12, 20), Qt.AlignRight | Qt.AlignVCenter, text)
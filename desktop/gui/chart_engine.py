@@ -0,0 +1,578 @@
+# desktop/gui/chart_engine.py
+"""
+Retained-mode Matplotlib charts for ChartsWidget.
+
+Each chart type owns its own Figure and canvas. Axes and artists are created
+once per layout and then updated in place (set_height, set_data, ...) when the
+data changes, so switching chart types or reloading a dataset does not rebuild
+the figure. Data artists are drawn with blitting when the axes limits and
+labels are unchanged.
+
+Statistics are reduced with the helpers in gui.chart_lod before anything is
+drawn, so render cost stays flat as datasets grow to millions of rows.
+"""
+import matplotlib
+matplotlib.use('Qt5Agg')
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.colors import LogNorm
+from matplotlib.path import Path
+from PyQt5.QtWidgets import QSizePolicy
+import numpy as np
+
+from gui.chart_lod import (
+    SCATTER_LIMIT, box_stats, density_grid, grouped_box_stats, histogram, type_codes
+)
+
+
+BACKGROUND = '#1e293b'
+PALETTE = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
+METRIC_COLORS = {'Flowrate': '#3b82f6', 'Pressure': '#10b981', 'Temperature': '#f59e0b'}
+
+BOX_STYLE = dict(
+    patch_artist=True,
+    boxprops=dict(alpha=0.8, edgecolor='white', linewidth=1.5),
+    whiskerprops=dict(color='white', linewidth=1.5),
+    capprops=dict(color='white', linewidth=1.5),
+    medianprops=dict(color='#fbbf24', linewidth=2),
+)
+
+
+def style_axes(ax, grid_axis='both'):
+    """Apply the dark dashboard look to an axes"""
+    ax.set_facecolor(BACKGROUND)
+    ax.tick_params(colors='#cbd5e1', labelsize=8)
+    if grid_axis:
+        ax.grid(alpha=0.2, color='#475569', axis=grid_axis)
+    for spine in ['top', 'right']:
+        ax.spines[spine].set_visible(False)
+    ax.spines['left'].set_color('#475569')
+    ax.spines['bottom'].set_color('#475569')
+
+
+class BlitManager:
+    """Redraws only the animated data artists over a cached background"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add(self, *artists):
+        for artist in artists:
+            artist.set_animated(True)
+            self.artists.append(artist)
+
+    def reset(self):
+        self.artists = []
+        self.background = None
+
+    def on_draw(self, event):
+        """Capture the static background after every full draw"""
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            if artist.figure is not None:
+                figure.draw_artist(artist)
+
+    def update(self):
+        """Blit the data artists, falling back to a full draw"""
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class ChartView:
+    """A figure, its canvas and the retained artists for one chart type"""
+
+    def __init__(self):
+        self.figure = Figure(figsize=(12, 8), facecolor=BACKGROUND, dpi=80)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setStyleSheet(f"background: {BACKGROUND};")
+        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.canvas.setMinimumHeight(400)
+        self.blitter = BlitManager(self.canvas)
+        self.data_key = None
+        self.layout_key = None
+
+    # Subclass hooks -------------------------------------------------
+    def message(self, df):
+        """Return a (text, color) placeholder when the chart cannot be drawn"""
+        return None
+
+    def layout_for(self, df):
+        """Key describing the axes structure needed for df"""
+        return ()
+
+    def build(self, df):
+        """Create axes and static decorations for a new layout"""
+
+    def update(self, df):
+        """Update artists in place; return True if labels or artists changed"""
+        return False
+
+    # Rendering --------------------------------------------------------
+    def render(self, df, data_key):
+        """Bring the figure up to date with df (no-op if already current)"""
+        if data_key == self.data_key:
+            return
+        self.data_key = data_key
+
+        if df is None or df.empty:
+            self.show_message('No data available\nUpload a CSV file to see charts', '#94a3b8')
+            return
+
+        placeholder = self.message(df)
+        if placeholder:
+            self.show_message(*placeholder)
+            return
+
+        structural = False
+        layout_key = self.layout_for(df)
+        if layout_key != self.layout_key:
+            self.figure.clear()
+            self.blitter.reset()
+            self.build(df)
+            self.layout_key = layout_key
+            structural = True
+
+        limits_before = self._limits()
+        structural = self.update(df) or structural
+
+        if structural or self._limits() != limits_before:
+            self.canvas.draw()
+        else:
+            self.blitter.update()
+
+    def show_message(self, text, color, fontsize=14):
+        """Replace the chart with a centered message"""
+        self.figure.clear()
+        self.blitter.reset()
+        self.layout_key = None
+        ax = self.figure.add_subplot(111)
+        ax.set_facecolor(BACKGROUND)
+        ax.text(0.5, 0.5, text, ha='center', va='center', transform=ax.transAxes,
+                color=color, fontsize=fontsize)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        self.canvas.draw()
+
+    def invalidate(self):
+        """Force the next render to update even for the same data"""
+        self.data_key = None
+
+    def _limits(self):
+        return [(ax.get_xlim(), ax.get_ylim()) for ax in self.figure.axes]
+
+
+def _autoscale_y(ax, top, headroom=1.1):
+    """Grow or shrink the y-limit only when the data no longer fits well"""
+    bottom, current = ax.get_ylim()
+    if top > current or top < current * 0.5:
+        ax.set_ylim(0, max(top * headroom, 1))
+
+
+def _set_tick_labels(ax, positions, labels, **kwargs):
+    """Set x tick labels; return True if they changed"""
+    current = [t.get_text() for t in ax.get_xticklabels()]
+    if list(ax.get_xticks()) == list(positions) and current == list(labels):
+        return False
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels, **kwargs)
+    return True
+
+
+def _box_paths(stats, position, width):
+    """Geometry of one box plot element as (box verts, line data) tuples"""
+    x0, x1 = position - width / 2, position + width / 2
+    cap = width / 4
+    box = [(x0, stats['q1']), (x1, stats['q1']), (x1, stats['q3']),
+           (x0, stats['q3']), (x0, stats['q1'])]
+    return {
+        'box': box,
+        'median': ([x0, x1], [stats['med'], stats['med']]),
+        'whiskers': [([position, position], [stats['q1'], stats['whislo']]),
+                     ([position, position], [stats['q3'], stats['whishi']])],
+        'caps': [([position - cap, position + cap], [stats['whislo'], stats['whislo']]),
+                 ([position - cap, position + cap], [stats['whishi'], stats['whishi']])],
+        'fliers': ([position] * len(stats['fliers']), stats['fliers']),
+    }
+
+
+class BoxGroup:
+    """Box plot artists for a fixed number of boxes, updatable in place"""
+
+    def __init__(self, ax, stats, positions, width, colors, flier_size, blitter):
+        self.ax = ax
+        self.positions = list(positions)
+        self.width = width
+        self.artists = ax.bxp(
+            stats, positions=self.positions, widths=width,
+            flierprops=dict(marker='o', markerfacecolor='#ef4444', markersize=flier_size, alpha=0.7),
+            **BOX_STYLE
+        )
+        for i, patch in enumerate(self.artists['boxes']):
+            patch.set_facecolor(colors[i % len(colors)])
+        for artists in self.artists.values():
+            blitter.add(*artists)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def set_stats(self, stats):
+        for i, (s, position) in enumerate(zip(stats, self.positions)):
+            geometry = _box_paths(s, position, self.width)
+            self.artists['boxes'][i].set_path(Path(geometry['box'], closed=True))
+            self.artists['medians'][i].set_data(*geometry['median'])
+            for j in range(2):
+                self.artists['whiskers'][2 * i + j].set_data(*geometry['whiskers'][j])
+                self.artists['caps'][2 * i + j].set_data(*geometry['caps'][j])
+            self.artists['fliers'][i].set_data(*geometry['fliers'])
+
+    def remove(self):
+        for artists in self.artists.values():
+            for artist in artists:
+                artist.remove()
+
+
+class DistributionView(ChartView):
+    """Equipment type counts as a bar chart"""
+
+    def __init__(self):
+        super().__init__()
+        self.bars = []
+        self.labels = []
+
+    def message(self, df):
+        if 'Type' not in df.columns:
+            return ('No "Type" column found in data', '#f59e0b')
+
+    def build(self, df):
+        self.ax = self.figure.add_subplot(111)
+        style_axes(self.ax, grid_axis='y')
+        self.ax.tick_params(labelsize=9)
+        self.ax.set_xlabel('Equipment Type', fontsize=11, fontweight='bold', color='#e2e8f0', labelpad=10)
+        self.ax.set_ylabel('Count', fontsize=11, fontweight='bold', color='#e2e8f0', labelpad=10)
+        self.ax.set_title('Equipment Type Distribution', fontsize=13, fontweight='bold',
+                          pad=15, color='white')
+        self.bars = []
+        self.labels = []
+
+    def update(self, df):
+        type_counts = df['Type'].value_counts()
+        counts = type_counts.values
+        structural = False
+
+        if len(self.bars) != len(counts):
+            for artist in self.bars + self.labels:
+                artist.remove()
+            bar_colors = [PALETTE[i % len(PALETTE)] for i in range(len(counts))]
+            self.bars = list(self.ax.bar(range(len(counts)), counts, color=bar_colors,
+                                         edgecolor='white', linewidth=1, alpha=0.9))
+            self.labels = [
+                self.ax.text(bar.get_x() + bar.get_width() / 2., 0, '', ha='center', va='bottom',
+                             fontweight='bold', color='white', fontsize=9)
+                for bar in self.bars
+            ]
+            self.blitter.reset()
+            self.blitter.add(*self.bars, *self.labels)
+            self.ax.set_xlim(-0.6, len(counts) - 0.4)
+            structural = True
+
+        for bar, label, count in zip(self.bars, self.labels, counts):
+            bar.set_height(count)
+            label.set_position((bar.get_x() + bar.get_width() / 2., count + 0.1))
+            label.set_text(f'{int(count)}')
+
+        _autoscale_y(self.ax, counts.max() if len(counts) else 1)
+        structural = _set_tick_labels(
+            self.ax, range(len(counts)), [str(t) for t in type_counts.index],
+            rotation=30, ha='right', color='#cbd5e1', fontsize=9
+        ) or structural
+
+        if structural:
+            self.figure.tight_layout(pad=2.0)
+        return structural
+
+
+class MetricView(ChartView):
+    """Histogram, box plot and per-type box plots for one metric"""
+
+    def __init__(self, metric):
+        super().__init__()
+        self.metric = metric
+        self.color = METRIC_COLORS.get(metric, '#3b82f6')
+
+    def message(self, df):
+        if self.metric not in df.columns:
+            return (f'No "{self.metric}" column found in data', '#f59e0b')
+        if df[self.metric].count() == 0:
+            return (f'No valid data for {self.metric}', '#f59e0b')
+
+    def layout_for(self, df):
+        return ('Type' in df.columns,)
+
+    def build(self, df):
+        metric = self.metric
+        has_type = 'Type' in df.columns
+
+        if has_type:
+            # 2 rows: top row has histogram and boxplot, bottom row has by-type comparison
+            self.ax_hist = self.figure.add_axes([0.08, 0.58, 0.38, 0.35])
+            self.ax_box = self.figure.add_axes([0.55, 0.58, 0.38, 0.35])
+            self.ax_type = self.figure.add_axes([0.08, 0.10, 0.85, 0.38])
+        else:
+            # Just 2 plots side by side
+            self.ax_hist = self.figure.add_axes([0.08, 0.15, 0.40, 0.75])
+            self.ax_box = self.figure.add_axes([0.55, 0.15, 0.40, 0.75])
+            self.ax_type = None
+
+        style_axes(self.ax_hist)
+        self.ax_hist.set_xlabel(metric, fontsize=9, fontweight='bold', color='#e2e8f0')
+        self.ax_hist.set_ylabel('Frequency', fontsize=9, fontweight='bold', color='#e2e8f0')
+        self.ax_hist.set_title(f'{metric} Distribution', fontsize=10, fontweight='bold', color='white', pad=8)
+
+        style_axes(self.ax_box, grid_axis='y')
+        self.ax_box.set_ylabel(metric, fontsize=9, fontweight='bold', color='#e2e8f0')
+        self.ax_box.set_title(f'{metric} Box Plot', fontsize=10, fontweight='bold', color='white', pad=8)
+
+        if self.ax_type is not None:
+            style_axes(self.ax_type, grid_axis='y')
+            self.ax_type.set_xlabel('Equipment Type', fontsize=9, fontweight='bold', color='#e2e8f0')
+            self.ax_type.set_ylabel(metric, fontsize=9, fontweight='bold', color='#e2e8f0')
+            self.ax_type.set_title(f'{metric} by Equipment Type', fontsize=10, fontweight='bold',
+                                   color='white', pad=8)
+
+        self.hist_bars = []
+        self.box = None
+        self.type_boxes = None
+        self.flier_note = self.ax_box.text(0.02, 0.98, '', transform=self.ax_box.transAxes,
+                                           ha='left', va='top', color='#94a3b8', fontsize=8)
+
+    def _register_artists(self):
+        self.blitter.reset()
+        self.blitter.add(*self.hist_bars, self.flier_note)
+        for group in (self.box, self.type_boxes):
+            if group is not None:
+                for artists in group.artists.values():
+                    self.blitter.add(*artists)
+
+    def update(self, df):
+        data = df[self.metric].dropna().to_numpy(dtype=float)
+        structural = False
+
+        # Plot 1: Histogram (bins precomputed, one bar artist per bin)
+        counts, edges = histogram(data)
+        if len(self.hist_bars) != len(counts):
+            for bar in self.hist_bars:
+                bar.remove()
+            self.hist_bars = list(self.ax_hist.bar(
+                edges[:-1], counts, width=np.diff(edges), align='edge',
+                color=self.color, edgecolor='white', alpha=0.85, linewidth=1
+            ))
+            structural = True
+        else:
+            for bar, left, width, count in zip(self.hist_bars, edges[:-1], np.diff(edges), counts):
+                bar.set_x(left)
+                bar.set_width(width)
+                bar.set_height(count)
+        span = edges[-1] - edges[0] or 1.0
+        self.ax_hist.set_xlim(edges[0] - span * 0.05, edges[-1] + span * 0.05)
+        _autoscale_y(self.ax_hist, counts.max())
+
+        # Plot 2: Box plot (statistics precomputed, outlier markers capped)
+        stats = [box_stats(data)]
+        if self.box is None:
+            self.box = BoxGroup(self.ax_box, stats, [1], 0.5, [self.color], 5, self.blitter)
+            self.ax_box.set_xticks([1])
+            self.ax_box.set_xticklabels(['All Data'], color='#cbd5e1', fontsize=8)
+            structural = True
+        else:
+            self.box.set_stats(stats)
+        self._fit_y(self.ax_box, stats)
+        shown, total = len(stats[0]['fliers']), stats[0]['n_fliers']
+        self.flier_note.set_text(f'{shown:,} of {total:,} outliers shown' if shown < total else '')
+
+        # Plot 3: By equipment type (if available)
+        if self.ax_type is not None:
+            codes, names = type_codes(df, self.data_key)
+            values = df[self.metric].to_numpy(dtype=float)
+            valid = (codes >= 0) & ~np.isnan(values)
+            grouped = grouped_box_stats(codes[valid], values[valid], len(names))
+            type_stats = [s for _, s in grouped]
+            type_names = [str(names[code])[:12] for code, _ in grouped]  # Truncate long names
+
+            if type_stats:
+                positions = range(1, len(type_stats) + 1)
+                if self.type_boxes is None or len(self.type_boxes) != len(type_stats):
+                    if self.type_boxes is not None:
+                        self.type_boxes.remove()
+                    self.type_boxes = BoxGroup(self.ax_type, type_stats, positions, 0.6,
+                                               PALETTE, 4, self.blitter)
+                    self.ax_type.set_xlim(0.5, len(type_stats) + 0.5)
+                    structural = True
+                else:
+                    self.type_boxes.set_stats(type_stats)
+                structural = _set_tick_labels(
+                    self.ax_type, list(positions), type_names,
+                    rotation=20, ha='right', color='#cbd5e1', fontsize=8
+                ) or structural
+                self._fit_y(self.ax_type, type_stats)
+
+        if structural:
+            self._register_artists()
+        return structural
+
+    def _fit_y(self, ax, stats):
+        values = [s['whislo'] for s in stats] + [s['whishi'] for s in stats]
+        values += [v for s in stats for v in s['fliers']]
+        low, high = min(values), max(values)
+        pad = (high - low) * 0.05 or 1.0
+        bottom, top = ax.get_ylim()
+        if low < bottom or high > top or (high - low) < (top - bottom) * 0.5:
+            ax.set_ylim(low - pad, high + pad)
+
+
+class CorrelationView(ChartView):
+    """Correlation heatmap for up to six numeric columns"""
+
+    def _columns(self, df):
+        numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+        # Limit columns to prevent crowding
+        return list(numeric_cols)[:6]
+
+    def message(self, df):
+        if len(self._columns(df)) < 2:
+            return ('Not enough numeric columns\nfor correlation analysis', '#f59e0b')
+
+    def layout_for(self, df):
+        return tuple(self._columns(df))
+
+    def build(self, df):
+        display_cols = self._columns(df)
+        n = len(display_cols)
+
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_facecolor(BACKGROUND)
+        self.image = self.ax.imshow(np.zeros((n, n)), cmap='RdYlBu_r', aspect='auto', vmin=-1, vmax=1)
+
+        self.ax.set_xticks(np.arange(n))
+        self.ax.set_yticks(np.arange(n))
+        col_labels = [str(c)[:10] for c in display_cols]
+        self.ax.set_xticklabels(col_labels, rotation=45, ha='right', color='#cbd5e1', fontsize=9)
+        self.ax.set_yticklabels(col_labels, color='#cbd5e1', fontsize=9)
+
+        cbar = self.figure.colorbar(self.image, ax=self.ax, shrink=0.8, pad=0.02)
+        cbar.set_label('Correlation', rotation=270, labelpad=15, color='#e2e8f0', fontsize=10)
+        cbar.ax.tick_params(colors='#cbd5e1', labelsize=8)
+
+        # Correlation values
+        self.cells = [[self.ax.text(j, i, '', ha='center', va='center', fontsize=9, fontweight='bold')
+                       for j in range(n)] for i in range(n)]
+
+        self.ax.set_title('Correlation Heatmap', fontsize=13, fontweight='bold', pad=15, color='white')
+        self.figure.tight_layout(pad=2.0)
+
+        self.blitter.add(self.image, *[cell for row in self.cells for cell in row])
+
+    def update(self, df):
+        corr_matrix = df[self._columns(df)].corr().values
+        self.image.set_data(corr_matrix)
+        for i, row in enumerate(self.cells):
+            for j, cell in enumerate(row):
+                value = corr_matrix[i, j]
+                cell.set_text(f'{value:.2f}')
+                cell.set_color('white' if abs(value) > 0.5 else 'black')
+        return False
+
+
+class DensityView(ChartView):
+    """
+    One metric against another: a scatter plot for small datasets and a 2-D
+    density grid once the point count exceeds SCATTER_LIMIT
+    """
+
+    def __init__(self, x_metric, y_metric):
+        super().__init__()
+        self.x_metric = x_metric
+        self.y_metric = y_metric
+
+    def message(self, df):
+        missing = [m for m in (self.x_metric, self.y_metric) if m not in df.columns]
+        if missing:
+            return (f'No "{missing[0]}" column found in data', '#f59e0b')
+
+    def _points(self, df):
+        points = df[[self.x_metric, self.y_metric]].dropna()
+        return points[self.x_metric].to_numpy(dtype=float), points[self.y_metric].to_numpy(dtype=float)
+
+    def layout_for(self, df):
+        return ('density' if len(df) > SCATTER_LIMIT else 'scatter',)
+
+    def build(self, df):
+        self.ax = self.figure.add_subplot(111)
+        style_axes(self.ax)
+        self.ax.tick_params(labelsize=9)
+        self.ax.set_xlabel(self.x_metric, fontsize=11, fontweight='bold', color='#e2e8f0', labelpad=10)
+        self.ax.set_ylabel(self.y_metric, fontsize=11, fontweight='bold', color='#e2e8f0', labelpad=10)
+        self.ax.set_title(f'{self.x_metric} vs {self.y_metric}', fontsize=13, fontweight='bold',
+                          pad=15, color='white')
+
+        if self.layout_for(df)[0] == 'density':
+            self.scatter = None
+            self.image = self.ax.imshow(np.ones((2, 2)), origin='lower', aspect='auto',
+                                        cmap='viridis', norm=LogNorm(vmin=1, vmax=10),
+                                        interpolation='nearest')
+            cbar = self.figure.colorbar(self.image, ax=self.ax, shrink=0.8, pad=0.02)
+            cbar.set_label('Points per cell', rotation=270, labelpad=15, color='#e2e8f0', fontsize=10)
+            cbar.ax.tick_params(colors='#cbd5e1', labelsize=8)
+            self.blitter.add(self.image)
+        else:
+            self.image = None
+            self.scatter = self.ax.scatter([], [], s=18, color='#3b82f6', alpha=0.7,
+                                           edgecolors='white', linewidths=0.3)
+            self.blitter.add(self.scatter)
+        self.figure.tight_layout(pad=2.0)
+
+    def update(self, df):
+        x, y = self._points(df)
+        if len(x) == 0:
+            return False
+
+        if self.image is not None:
+            counts, extent = density_grid(x, y)
+            # Empty cells are masked so they show the axes background
+            self.image.set_data(np.ma.masked_equal(counts, 0))
+            self.image.set_extent(extent)
+            self.image.norm.vmax = max(counts.max(), 2)
+            self.ax.set_xlim(extent[0], extent[1])
+            self.ax.set_ylim(extent[2], extent[3])
+            return True
+
+        self.scatter.set_offsets(np.column_stack([x, y]))
+        x_pad = (x.max() - x.min()) * 0.05 or 1.0
+        y_pad = (y.max() - y.min()) * 0.05 or 1.0
+        self.ax.set_xlim(x.min() - x_pad, x.max() + x_pad)
+        self.ax.set_ylim(y.min() - y_pad, y.max() + y_pad)
+        return False
+
+
+def create_view(chart_type):
+    """Build the retained view for a chart type name from the selector"""
+    if chart_type == "Equipment Distribution":
+        return DistributionView()
+    if chart_type == "Correlation Heatmap":
+        return CorrelationView()
+    if " vs " in chart_type:
+        return DensityView(*chart_type.split(" vs ", 1))
+    metric = chart_type.replace(" Analysis", "")
+    return MetricView(metric)
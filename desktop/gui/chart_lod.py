@@ -0,0 +1,129 @@
+# desktop/gui/chart_lod.py
+"""
+Level-of-detail helpers for charts over large datasets.
+
+Everything here reduces a column of any length to a small, fixed-size summary
+(histogram counts, box statistics with a capped set of outliers, 2-D density
+grids) using NumPy, so the number of artists Matplotlib draws does not grow
+with the row count.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Outlier markers drawn per box before they are sampled down
+MAX_FLIERS = 200
+
+# Point counts above which scatter plots switch to a density grid
+SCATTER_LIMIT = 5000
+DENSITY_BINS = 60
+
+
+def histogram(values, max_bins=20, min_bins=5):
+    """Return (counts, edges) with the bin rule the charts have always used"""
+    n_bins = min(max_bins, max(min_bins, len(values) // 3))
+    return np.histogram(values, bins=n_bins)
+
+
+def sample_fliers(fliers, limit=MAX_FLIERS):
+    """
+    Reduce outliers to at most `limit` points spread across their range
+
+    The extremes are always kept and the rest are evenly spaced quantiles, so
+    the sampled markers still show where outliers cluster.
+    """
+    if len(fliers) <= limit:
+        return fliers
+    return np.quantile(fliers, np.linspace(0, 1, limit))
+
+
+def box_stats(values, whis=1.5, max_fliers=MAX_FLIERS):
+    """
+    Box plot statistics in the format accepted by Axes.bxp
+
+    Args:
+        values: 1-D array without NaNs
+        whis: Whisker reach as a multiple of the IQR
+        max_fliers: Cap on the outliers returned for drawing
+
+    Returns:
+        dict: med/q1/q3/whislo/whishi/fliers plus the total outlier count
+    """
+    values = np.asarray(values, dtype=float)
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low, high = q1 - whis * iqr, q3 + whis * iqr
+
+    inside = values[(values >= low) & (values <= high)]
+    whislo = inside.min() if len(inside) else q1
+    whishi = inside.max() if len(inside) else q3
+    fliers = values[(values < low) | (values > high)]
+
+    return {
+        'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+        'whislo': whislo, 'whishi': whishi,
+        'mean': values.mean(),
+        'fliers': sample_fliers(fliers, max_fliers),
+        'n_fliers': len(fliers),
+        'n': len(values),
+    }
+
+
+# Single-entry cache so the three metric views factorize Type only once per dataset
+_type_codes_cache = {'key': None, 'value': None}
+
+
+def type_codes(df, data_key):
+    """
+    Integer codes and names for the Type column (first-appearance order)
+
+    Args:
+        df: DataFrame with a Type column
+        data_key: Dataset version the caller is rendering, used as cache key
+    """
+    key = (data_key, id(df), len(df))
+    if _type_codes_cache['key'] != key:
+        codes, names = pd.factorize(df['Type'], sort=False)
+        _type_codes_cache['key'] = key
+        _type_codes_cache['value'] = (codes, names)
+    return _type_codes_cache['value']
+
+
+def grouped_box_stats(codes, values, n_groups, max_fliers=MAX_FLIERS):
+    """
+    Box statistics per group from integer group codes in a single sort
+
+    Args:
+        codes: Integer group code per value (as from pandas.factorize)
+        values: Values aligned with codes, without NaNs
+        n_groups: Number of distinct codes
+
+    Returns:
+        list: (code, stats) for every group that has at least one value
+    """
+    # Small integer codes let NumPy use a linear-time radix sort
+    if n_groups < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16, copy=False)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(n_groups + 1))
+
+    result = []
+    for code in range(n_groups):
+        start, end = bounds[code], bounds[code + 1]
+        if end > start:
+            result.append((code, box_stats(sorted_values[start:end], max_fliers=max_fliers)))
+    return result
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """
+    2-D point density for metric-vs-metric views
+
+    Returns:
+        tuple: (counts with rows indexed by y, extent for imshow)
+    """
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    extent = (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1])
+    return counts.T, extent
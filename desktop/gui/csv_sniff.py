@@ -0,0 +1,24 @@
+# desktop/gui/csv_sniff.py
+"""
+CSV dialect sniffing, shared with the backend
+
+The code lives in backend/analyzer/csv_sniff.py so local loads and uploads
+always agree on the dialect. It has no Django dependency and is loaded here
+by path, without importing the rest of the backend package.
+"""
+import importlib.util
+import os
+
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     os.pardir, os.pardir, 'backend', 'analyzer', 'csv_sniff.py')
+
+_spec = importlib.util.spec_from_file_location('chemflow_csv_sniff', os.path.normpath(_PATH))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+SNIFF_BYTES = _module.SNIFF_BYTES
+check_decoded = _module.check_decoded
+fallback_dialect = _module.fallback_dialect
+is_default_dialect = _module.is_default_dialect
+read_options = _module.read_options
+sniff = _module.sniff
@@ -5,38 +5,123 @@ from PyQt5.QtWidgets import (
     QPushButton, QLabel, QTabWidget, QMessageBox,
     QFileDialog, QTableWidget, QTableWidgetItem,
     QHeaderView, QStatusBar, QAction, QStackedWidget,
-    QScrollArea, QFrame, QSizePolicy
+    QScrollArea, QFrame, QSizePolicy, QProgressBar
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
-import pandas as pd
 import sys
+import threading
 import traceback
 import os
 
 from api.client import APIClient
 from gui.login_dialog import LoginDialog
-from gui.stats_widget import StatsWidget
-from gui.charts_widget import ChartsWidget
 from gui.animated_background import AnimatedBackground
 from gui.index_page import IndexPage
 
+# pandas and the stats/charts widgets (which pull in matplotlib) are imported
+# on first use so the landing page can paint without loading them
 
-class UploadThread(QThread):
-    """Background thread for uploading files"""
+
+class JobThread(QThread):
+    """
+    Background thread for a server job that reports progress
+
+    The request runs under a fresh job id while a second thread reads the
+    job's progress stream and re-emits each event as `progress`.
+    """
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
+    progress = pyqtSignal(str, dict)
 
-    def __init__(self, api_client, file_path):
+    # Seconds to wait for the stream's last events once the request returned
+    PROGRESS_GRACE = 2
+
+    def __init__(self, api_client):
         super().__init__()
         self.api_client = api_client
-        self.file_path = file_path
 
     def run(self):
+        job_id = self.api_client.new_job_id()
+        stop = threading.Event()
+        listener = threading.Thread(target=self.forward_progress, args=(job_id, stop), daemon=True)
+        listener.start()
         try:
-            result = self.api_client.upload_csv(self.file_path)
+            result = self.run_job(job_id)
+        except Exception as e:
+            result, error = None, str(e)
+
+        # The server sent "done" or "error" before responding; let the
+        # listener deliver it, unless the job never reached the server
+        listener.join(self.PROGRESS_GRACE)
+        stop.set()
+
+        if result is None:
+            self.error.emit(error)
+        else:
             self.finished.emit(result)
+
+    def forward_progress(self, job_id, stop):
+        try:
+            for event, data in self.api_client.stream_progress(job_id, stop):
+                self.progress.emit(event, data)
+        except Exception as e:
+            print(f"Progress stream error: {e}")
+
+    def run_job(self, job_id):
+        raise NotImplementedError
+
+
+class UploadThread(JobThread):
+    """Background thread for uploading files"""
+
+    def __init__(self, api_client, file_path):
+        super().__init__(api_client)
+        self.file_path = file_path
+
+    def run_job(self, job_id):
+        return self.api_client.upload_csv(self.file_path, job_id=job_id)
+
+
+class ReportThread(JobThread):
+    """Background thread for generating a PDF report"""
+
+    def __init__(self, api_client, dataset_id):
+        super().__init__(api_client)
+        self.dataset_id = dataset_id
+
+    def run_job(self, job_id):
+        return self.api_client.generate_report(self.dataset_id, job_id=job_id)
+
+
+class ExportThread(QThread):
+    """Background thread saving a dataset export straight to disk"""
+    finished = pyqtSignal(str, int)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
+
+    def __init__(self, api_client, dataset_id, dest_path, output):
+        super().__init__()
+        self.api_client = api_client
+        self.dataset_id = dataset_id
+        self.dest_path = dest_path
+        self.output = output
+
+    def run(self):
+        try:
+            written = self.api_client.export_dataset(
+                self.dataset_id, self.dest_path, self.output, progress=self.progress.emit)
         except Exception as e:
             self.error.emit(str(e))
+        else:
+            self.finished.emit(self.dest_path, written)
+
+
+# Save dialog filter -> export output format
+EXPORT_FILTERS = {
+    "CSV Files (*.csv)": "csv",
+    "NDJSON Files (*.ndjson)": "ndjson",
+    "Parquet Files (*.parquet)": "parquet",
+}
 
 
 class MainWindow(QMainWindow):
@@ -68,16 +153,23 @@ class MainWindow(QMainWindow):
             }
         """)
 
+        # Job progress (uploads, reports), shown while a job runs
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(220)
+        self.progress_bar.setMaximumHeight(14)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        self.status_bar.addPermanentWidget(self.progress_bar)
+
         # Stacked widget
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
 
-        # Pages
+        # Pages (the dashboard is built the first time it is needed)
         self.index_page = IndexPage(self)
-        self.dashboard_page = self.create_dashboard_page()
+        self.dashboard_page = None
 
         self.stacked_widget.addWidget(self.index_page)
-        self.stacked_widget.addWidget(self.dashboard_page)
 
         # Menu bar
         self.create_menu_bar()
@@ -106,9 +198,16 @@ class MainWindow(QMainWindow):
         self.menuBar().hide()
         self.status_bar.hide()
 
+    def ensure_dashboard_page(self):
+        """Build the dashboard page on first use"""
+        if self.dashboard_page is None:
+            self.dashboard_page = self.create_dashboard_page()
+            self.stacked_widget.addWidget(self.dashboard_page)
+        return self.dashboard_page
+
     def show_dashboard_page(self):
         """Show dashboard"""
-        self.stacked_widget.setCurrentWidget(self.dashboard_page)
+        self.stacked_widget.setCurrentWidget(self.ensure_dashboard_page())
         self.menuBar().show()
         self.status_bar.show()
         self.update_ui_state()
@@ -118,6 +217,9 @@ class MainWindow(QMainWindow):
 
     def create_dashboard_page(self):
         """Create dashboard with properly centered and spaced tabs"""
+        from gui.stats_widget import StatsWidget
+        from gui.charts_widget import ChartsWidget
+
         root_container = QWidget()
         root_layout = QVBoxLayout(root_container)
         root_layout.setContentsMargins(0, 0, 0, 0)
@@ -251,6 +353,34 @@ class MainWindow(QMainWindow):
         """)
         upload_layout.addWidget(self.generate_report_btn)
 
+        self.export_btn = QPushButton("💾 Export")
+        self.export_btn.setMinimumHeight(40)
+        self.export_btn.setMinimumWidth(120)
+        self.export_btn.setCursor(Qt.PointingHandCursor)
+        self.export_btn.clicked.connect(self.export_dataset)
+        self.export_btn.setEnabled(False)
+        self.export_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+                    stop:0 #8b5cf6, stop:1 #7c3aed);
+                color: white;
+                border-radius: 8px;
+                padding: 8px 20px;
+                font-size: 13px;
+                font-weight: 600;
+                border: none;
+            }
+            QPushButton:hover {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+                    stop:0 #7c3aed, stop:1 #6d28d9);
+            }
+            QPushButton:disabled {
+                background: #4b5563;
+                color: #9ca3af;
+            }
+        """)
+        upload_layout.addWidget(self.export_btn)
+
         upload_layout.addStretch()
         content_layout.addWidget(controls_frame)
 
@@ -479,6 +609,7 @@ class MainWindow(QMainWindow):
             user = dialog.user_data
             if user:
                 self.user = user
+                self.ensure_dashboard_page()
                 username = user.get('username', 'User')
                 self.user_label.setText(f"Welcome, {username}")
                 self.logout_btn.setVisible(True)
@@ -491,6 +622,7 @@ class MainWindow(QMainWindow):
 
     def logout(self):
         """Logout"""
+        self.ensure_dashboard_page()
         try:
             self.api_client.logout()
         except Exception as e:
@@ -503,6 +635,7 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Logged out")
         self.current_dataset_id = None
         self.generate_report_btn.setEnabled(False)
+        self.export_btn.setEnabled(False)
 
     def update_ui_state(self):
         """Update UI state"""
@@ -525,18 +658,26 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
+        import pandas as pd
+        from gui.csv_sniff import SNIFF_BYTES, check_decoded, fallback_dialect, read_options, sniff
+        self.ensure_dashboard_page()
+
         # Normalize path for cross-platform compatibility
         file_path = os.path.normpath(file_path)
         
         try:
-            # Read CSV with error handling
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except UnicodeDecodeError:
+            # Sniff the dialect from the start of the file, then parse once
+            with open(file_path, 'rb') as f:
+                dialect = sniff(f.read(SNIFF_BYTES))
             try:
-                df = pd.read_csv(file_path, encoding='latin-1')
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to read CSV:\n\n{str(e)}")
-                return
+                df = pd.read_csv(file_path, **read_options(dialect))
+                check_decoded(df)
+            except UnicodeDecodeError as e:
+                # Not UTF-8 past the sniffed prefix: read it again as latin-1
+                fallback = fallback_dialect(dialect, e)
+                if fallback is None:
+                    raise
+                df = pd.read_csv(file_path, **read_options(fallback))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load CSV:\n\n{str(e)}")
             return
@@ -565,24 +706,64 @@ class MainWindow(QMainWindow):
         self.upload_thread = UploadThread(self.api_client, file_path)
         self.upload_thread.finished.connect(self.on_upload_finished)
         self.upload_thread.error.connect(self.on_upload_error)
+        self.upload_thread.progress.connect(self.on_job_progress)
+        self.start_progress()
         self.upload_thread.start()
 
+    def start_progress(self):
+        """Show the progress bar as busy until the first event arrives"""
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+
+    def on_job_progress(self, event, data):
+        """Show a server progress event in the status bar"""
+        if event == "bytes_received" and data.get("total"):
+            percent = min(100, data["bytes"] * 100 // data["total"])
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+            self.status_bar.showMessage(f"Uploading to server... {percent}%")
+        elif event == "rows_parsed":
+            self.progress_bar.setRange(0, 0)
+            self.status_bar.showMessage(f"Server parsed {data.get('rows', 0):,} rows, computing statistics...")
+        elif event == "stats_computed":
+            self.status_bar.showMessage("Statistics computed")
+        elif event == "pdf_page":
+            self.status_bar.showMessage(f"Rendering report page {data.get('page')}...")
+        elif event in ("done", "error"):
+            self.progress_bar.hide()
+
     def on_upload_finished(self, result):
         """Upload finished"""
         self.upload_btn.setEnabled(True)
+        self.progress_bar.hide()
         dataset = result.get("dataset", {})
         self.current_dataset_id = dataset.get("id")
         
         if self.current_dataset_id:
             self.generate_report_btn.setEnabled(True)
+            self.export_btn.setEnabled(True)
+
+        # Show the server's stats so both clients agree on the numbers
+        summary = result.get("summary")
+        if summary:
+            self.stats_widget.update_summary(summary)
         
         self.status_bar.showMessage("Upload successful! Data synced with server.")
         self.load_history()
-        QMessageBox.information(self, "Success", "File uploaded and synced successfully!")
+
+        message = "File uploaded and synced successfully!"
+        report = dataset.get("validation_report") or {}
+        skipped = report.get("malformed_rows", 0) + report.get("quarantined_rows", 0)
+        if skipped:
+            message += (f"\n\n{skipped} row(s) were excluded by server validation "
+                        f"({report.get('malformed_rows', 0)} malformed, "
+                        f"{report.get('quarantined_rows', 0)} with invalid values).")
+        QMessageBox.information(self, "Success", message)
 
     def on_upload_error(self, error_msg):
         """Upload error"""
         self.upload_btn.setEnabled(True)
+        self.progress_bar.hide()
         self.status_bar.showMessage("Upload failed - data saved locally only")
         QMessageBox.warning(
             self, 
@@ -590,11 +771,16 @@ class MainWindow(QMainWindow):
             f"Failed to upload to server:\n\n{error_msg}\n\nYour data is still available locally."
         )
 
-    def display_data(self, df):
+    def display_data(self, df, summary=None):
         """Display data in all tabs"""
+        import pandas as pd
+
         try:
-            # Update stats widget
-            self.stats_widget.update_stats(df)
+            # Update stats widget, preferring the server payload when there is one
+            if summary:
+                self.stats_widget.update_summary(summary)
+            else:
+                self.stats_widget.update_stats(df)
             
             # Update charts widget
             self.charts_widget.update_charts(df)
@@ -703,19 +889,27 @@ class MainWindow(QMainWindow):
             
         try:
             self.status_bar.showMessage("Loading dataset...")
+            summary = self.api_client.get_dataset_summary(dataset_id)
+            self.ensure_dashboard_page()
+            self.stats_widget.update_summary(summary)
+            self.current_dataset_id = dataset_id
+            self.generate_report_btn.setEnabled(True)
+            self.export_btn.setEnabled(True)
+
             result = self.api_client.get_dataset_data(dataset_id)
             data = result.get("data", result.get("rows", []))
             
             if not data:
-                QMessageBox.information(self, "No Data", "Dataset is empty.")
+                # Statistics come from the summary payload; rows are only needed for charts and the table
+                self.tabs.setCurrentIndex(0)
+                self.status_bar.showMessage(f"Loaded statistics for {summary.get('total_records', 0)} records")
                 return
             
+            import pandas as pd
             df = pd.DataFrame(data)
             if not df.empty:
                 self.current_data = df
-                self.current_dataset_id = dataset_id
-                self.display_data(df)
-                self.generate_report_btn.setEnabled(True)
+                self.display_data(df, summary)
                 self.tabs.setCurrentIndex(0)
                 self.status_bar.showMessage(f"Loaded dataset with {len(df)} records")
 
@@ -733,22 +927,75 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Login Required", "Please login to generate reports.")
             return
 
-        try:
-            self.status_bar.showMessage("Generating report...")
-            self.generate_report_btn.setEnabled(False)
-            
-            result = self.api_client.generate_report(self.current_dataset_id)
-            report = result.get("report", {})
-            report_url = report.get("report_url", report.get("url", "Report generated"))
+        self.status_bar.showMessage("Generating report...")
+        self.generate_report_btn.setEnabled(False)
 
-            self.generate_report_btn.setEnabled(True)
-            self.status_bar.showMessage("Report generated successfully!")
-            QMessageBox.information(self, "Success", f"Report generated!\n\n{report_url}")
+        self.report_thread = ReportThread(self.api_client, self.current_dataset_id)
+        self.report_thread.finished.connect(self.on_report_finished)
+        self.report_thread.error.connect(self.on_report_error)
+        self.report_thread.progress.connect(self.on_job_progress)
+        self.start_progress()
+        self.report_thread.start()
+
+    def on_report_finished(self, result):
+        """Report generated"""
+        self.generate_report_btn.setEnabled(True)
+        self.progress_bar.hide()
+        report = result.get("report", {})
+        report_url = report.get("report_url", report.get("url", "Report generated"))
+
+        self.status_bar.showMessage("Report generated successfully!")
+        QMessageBox.information(self, "Success", f"Report generated!\n\n{report_url}")
+
+    def on_report_error(self, error_msg):
+        """Report generation failed"""
+        self.generate_report_btn.setEnabled(True)
+        self.progress_bar.hide()
+        self.status_bar.showMessage("Report generation failed")
+        QMessageBox.critical(self, "Error", f"Failed to generate report:\n\n{error_msg}")
+
+    def export_dataset(self):
+        """Save the current dataset as CSV, NDJSON or Parquet"""
+        if not self.current_dataset_id:
+            QMessageBox.warning(self, "No Dataset", "Please upload a file first.")
+            return
 
-        except Exception as e:
-            self.generate_report_btn.setEnabled(True)
-            self.status_bar.showMessage("Report generation failed")
-            QMessageBox.critical(self, "Error", f"Failed to generate report:\n\n{str(e)}")
+        if not self.api_client.token:
+            QMessageBox.warning(self, "Login Required", "Please login to export datasets.")
+            return
+
+        dest_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Dataset", f"dataset_{self.current_dataset_id}.csv",
+            ";;".join(EXPORT_FILTERS)
+        )
+        if not dest_path:
+            return
+
+        output = EXPORT_FILTERS.get(selected_filter, "csv")
+        if not os.path.splitext(dest_path)[1]:
+            dest_path += f".{output}"
+
+        self.status_bar.showMessage("Exporting dataset...")
+        self.export_btn.setEnabled(False)
+
+        self.export_thread = ExportThread(self.api_client, self.current_dataset_id,
+                                          os.path.normpath(dest_path), output)
+        self.export_thread.finished.connect(self.on_export_finished)
+        self.export_thread.error.connect(self.on_export_error)
+        self.export_thread.progress.connect(
+            lambda written: self.status_bar.showMessage(f"Exporting dataset... {written / 1e6:.1f} MB"))
+        self.export_thread.start()
+
+    def on_export_finished(self, dest_path, written):
+        """Export saved"""
+        self.export_btn.setEnabled(True)
+        self.status_bar.showMessage(f"Exported {written / 1e6:.1f} MB to {dest_path}")
+
+    def on_export_error(self, error_msg):
+        """Export failed"""
+        self.export_btn.setEnabled(True)
+        self.status_bar.showMessage("Export failed")
+        QMessageBox.critical(self, "Error", f"Failed to export dataset:\n\n{error_msg}")
 
     def show_about(self):
         """About dialog"""
@@ -1,347 +1,482 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                            QGridLayout, QFrame, QSizePolicy, QListView,
+                            QStyledItemDelegate, QAbstractItemView)
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRectF
+from PyQt5.QtGui import QFont, QColor, QPainter
+from typing import TYPE_CHECKING
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QGridLayout, QFrame, QSizePolicy)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+PALETTE = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
+
+# Detailed statistics rows: (label, pandas aggregation, color)
+STAT_ROWS = [
+    ('Mean', 'mean', "#10b981"),
+    ('Median', 'median', "#3b82f6"),
+    ('Std Dev', 'std', "#f59e0b"),
+    ('Min', 'min', "#ef4444"),
+    ('Max', 'max', "#8b5cf6"),
+]
+
+# Limit columns to prevent overflow
+MAX_DETAIL_COLUMNS = 5
+
+
+def summarize_dataframe(df):
+    """
+    Build the server stats payload shape from a local DataFrame
+
+    Used for files opened without a backend connection; datasets synced with
+    the server are shown from the payload returned by /summary/ instead.
+    """
+    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+    summary_stats = {}
+    if numeric_cols:
+        aggregated = df[numeric_cols].agg([func for _, func, _ in STAT_ROWS] + ['count'])
+        summary_stats = {col: aggregated[col].to_dict() for col in numeric_cols}
+
+    equipment_types = {}
+    if 'Type' in df.columns:
+        equipment_types = {str(k): int(v) for k, v in df['Type'].value_counts().items()}
+
+    return {
+        'total_records': len(df),
+        'columns': df.columns.tolist(),
+        'summary_stats': summary_stats,
+        'equipment_types': equipment_types,
+    }
+
+
+def darken_color(color):
+    """Darken a hex color for gradient effect"""
+    color = color.lstrip('#')
+    rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
+    darkened = tuple(max(0, c - 40) for c in rgb)
+    return f"#{darkened[0]:02x}{darkened[1]:02x}{darkened[2]:02x}"
 
 
 class StatCard(QFrame):
     """A card widget to display a single statistic"""
-    
-    def __init__(self, title, value, icon="", color="#3b82f6"):
+
+    # Accent colors; each gets a gradient rule in StatsWidget.STYLESHEET
+    ACCENTS = {
+        'blue': "#3b82f6",
+        'green': "#10b981",
+        'amber': "#f59e0b",
+        'violet': "#8b5cf6",
+    }
+
+    def __init__(self, title, value="", icon="", accent="blue"):
         super().__init__()
-        darker = self.darken_color(color)
-        self.setStyleSheet(f"""
-            StatCard {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {color}, 
-                    stop:1 {darker});
-                border-radius: 10px;
-                border: 1px solid rgba(255, 255, 255, 0.15);
-            }}
-        """)
-        
+        self.setProperty("accent", accent)
+
         layout = QVBoxLayout(self)
         layout.setContentsMargins(16, 14, 16, 14)
         layout.setSpacing(6)
-        
+
         # Icon + Title row
         header_layout = QHBoxLayout()
         header_layout.setSpacing(8)
-        
+
         if icon:
             icon_label = QLabel(icon)
-            icon_label.setStyleSheet("color: rgba(255, 255, 255, 0.9); font-size: 20px; background: transparent;")
+            icon_label.setObjectName("cardIcon")
             header_layout.addWidget(icon_label)
-        
+
         title_label = QLabel(title)
-        title_label.setStyleSheet("""
-            color: rgba(255, 255, 255, 0.9); 
-            font-size: 12px; 
-            font-weight: 600;
-            background: transparent;
-        """)
+        title_label.setObjectName("cardTitle")
         header_layout.addWidget(title_label)
         header_layout.addStretch()
-        
+
         layout.addLayout(header_layout)
-        
+
         # Value
-        value_label = QLabel(str(value))
+        self.value_label = QLabel(str(value))
+        self.value_label.setObjectName("cardValue")
         value_font = QFont()
         value_font.setPointSize(24)
         value_font.setBold(True)
-        value_label.setFont(value_font)
-        value_label.setStyleSheet("color: white; background: transparent;")
-        layout.addWidget(value_label)
-        
+        self.value_label.setFont(value_font)
+        layout.addWidget(self.value_label)
+
         self.setMinimumHeight(90)
         self.setMaximumHeight(100)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-    
-    def darken_color(self, color):
-        """Darken a hex color for gradient effect"""
-        color = color.lstrip('#')
-        rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-        darkened = tuple(max(0, c - 40) for c in rgb)
-        return f"#{darkened[0]:02x}{darkened[1]:02x}{darkened[2]:02x}"
+
+    def set_value(self, value):
+        """Update the displayed value in place"""
+        text = str(value)
+        if self.value_label.text() != text:
+            self.value_label.setText(text)
+
+
+class TypeDistributionModel(QAbstractListModel):
+    """(type, count, percentage) rows for the equipment distribution list"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            eq_type, count, percentage = self.rows[index.row()]
+            return f"{eq_type}: {count} ({percentage:.1f}%)"
+        if role == Qt.UserRole:
+            return self.rows[index.row()]
+        return None
+
+
+class TypeDistributionDelegate(QStyledItemDelegate):
+    """Paints a distribution row (name, count, bar, percentage) without widgets"""
+
+    ROW_HEIGHT = 24
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(12)
+        self.small_font = QFont()
+        self.small_font.setPixelSize(11)
+        self.colors = [QColor(c) for c in PALETTE]
+        self.count_color = QColor("#e2e8f0")
+        self.pct_color = QColor("#94a3b8")
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        eq_type, count, percentage = index.data(Qt.UserRole)
+        color = self.colors[index.row() % len(self.colors)]
+        rect = option.rect
+        y, h = rect.y(), rect.height()
+        x = rect.x()
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Type name
+        painter.setFont(self.font)
+        painter.setPen(color)
+        name_rect = QRectF(x, y, 160, h)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         painter.fontMetrics().elidedText(f"● {eq_type}", Qt.ElideRight, 160))
+
+        # Count
+        painter.setPen(self.count_color)
+        painter.drawText(QRectF(x + 170, y, 50, h), Qt.AlignCenter, str(count))
+
+        # Progress bar
+        bar_width = min(percentage * 1.5, 150)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(QRectF(x + 230, y + (h - 14) / 2, bar_width, 14), 4, 4)
+
+        # Percentage
+        painter.setFont(self.small_font)
+        painter.setPen(self.pct_color)
+        painter.drawText(QRectF(x + 390, y, 60, h), Qt.AlignRight | Qt.AlignVCenter, f"{percentage:.1f}%")
+
+        painter.restore()
 
 
 class StatsWidget(QWidget):
-    """Widget to display summary statistics"""
-    
+    """
+    Widget to display summary statistics
+
+    All child widgets are created once; updates only change label text and
+    visibility. Styling lives in one class-level stylesheet keyed by object
+    names, and the type distribution is a virtualized list view, so thousands
+    of equipment types cost no more than the rows on screen.
+    """
+
+    # Visible rows of the type distribution before it scrolls
+    MAX_VISIBLE_TYPES = 12
+
+    STYLESHEET = """
+        QFrame#panel {
+            background: rgba(30, 41, 59, 0.7);
+            border-radius: 8px;
+        }
+        QLabel { background: transparent; }
+        QLabel#title, QLabel#sectionTitle { color: white; }
+        QLabel#subtitle { color: #94a3b8; font-size: 12px; }
+        QLabel#noData { color: #94a3b8; font-size: 14px; padding: 30px; }
+        QLabel#cardIcon { color: rgba(255, 255, 255, 0.9); font-size: 20px; }
+        QLabel#cardTitle {
+            color: rgba(255, 255, 255, 0.9);
+            font-size: 12px;
+            font-weight: 600;
+        }
+        QLabel#cardValue { color: white; }
+        QLabel#statHeader {
+            font-weight: bold;
+            color: #3b82f6;
+            padding: 6px 4px;
+            font-size: 11px;
+        }
+        QLabel#statValue { padding: 4px; color: #e2e8f0; font-size: 11px; }
+        QLabel#statValue[missing="true"] { color: #64748b; }
+        QListView#typeList { background: transparent; border: none; }
+    """ + "".join(f"""
+        StatCard[accent="{name}"] {{
+            background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+                stop:0 {color},
+                stop:1 {darken_color(color)});
+            border-radius: 10px;
+            border: 1px solid rgba(255, 255, 255, 0.15);
+        }}
+    """ for name, color in StatCard.ACCENTS.items()) + "".join(f"""
+        QLabel#statName[row="{i}"] {{
+            font-weight: 600;
+            color: {color};
+            padding: 4px;
+            font-size: 11px;
+        }}
+    """ for i, (_, _, color) in enumerate(STAT_ROWS))
+
     def __init__(self):
         super().__init__()
-        self.setStyleSheet("background: transparent;")
+        self.setStyleSheet(self.STYLESHEET)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.init_ui()
-    
+
+    def _panel(self):
+        frame = QFrame()
+        frame.setObjectName("panel")
+        return frame
+
+    def _section_title(self, text):
+        label = QLabel(text)
+        label.setObjectName("sectionTitle")
+        font = QFont()
+        font.setPointSize(14)
+        font.setBold(True)
+        label.setFont(font)
+        return label
+
     def init_ui(self):
         """Initialize UI"""
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(8, 8, 8, 8)
         self.main_layout.setSpacing(16)
-        
+
         # Title section
-        title_frame = QFrame()
-        title_frame.setStyleSheet("""
-            QFrame {
-                background: rgba(30, 41, 59, 0.7);
-                border-radius: 8px;
-            }
-        """)
+        title_frame = self._panel()
         title_layout = QVBoxLayout(title_frame)
         title_layout.setContentsMargins(16, 12, 16, 12)
         title_layout.setSpacing(4)
-        
+
         title = QLabel("📊 Summary Statistics")
+        title.setObjectName("title")
         title_font = QFont()
         title_font.setPointSize(16)
         title_font.setBold(True)
         title.setFont(title_font)
-        title.setStyleSheet("color: white; background: transparent;")
         title_layout.addWidget(title)
-        
+
         subtitle = QLabel("Overview of your dataset metrics")
-        subtitle.setStyleSheet("color: #94a3b8; font-size: 12px; background: transparent;")
+        subtitle.setObjectName("subtitle")
         title_layout.addWidget(subtitle)
-        
+
         self.main_layout.addWidget(title_frame)
-        
-        # Stats cards container
+
+        # No data placeholder
+        self.no_data_label = QLabel("No data to display")
+        self.no_data_label.setObjectName("noData")
+        self.no_data_label.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.no_data_label)
+
+        # Stats cards (fixed pool, 2 columns for better fit)
         self.cards_widget = QWidget()
-        self.cards_widget.setStyleSheet("background: transparent;")
         self.cards_layout = QGridLayout(self.cards_widget)
         self.cards_layout.setSpacing(12)
         self.cards_layout.setContentsMargins(0, 0, 0, 0)
+        self.cards = {
+            'records': StatCard("Total Records", icon="📝", accent='blue'),
+            'columns': StatCard("Columns", icon="📋", accent='green'),
+            'types': StatCard("Equipment Types", icon="⚙️", accent='amber'),
+            'numeric': StatCard("Numeric Fields", icon="🔢", accent='violet'),
+        }
         self.main_layout.addWidget(self.cards_widget)
-        
-        # Detailed stats container
-        self.details_widget = QWidget()
-        self.details_widget.setStyleSheet("background: transparent;")
-        self.details_layout = QVBoxLayout(self.details_widget)
-        self.details_layout.setSpacing(12)
-        self.details_layout.setContentsMargins(0, 0, 0, 0)
-        self.main_layout.addWidget(self.details_widget)
-        
+
+        self.init_details()
+        self.init_type_distribution()
+
         self.main_layout.addStretch()
-    
-    def clear_layout(self, layout):
-        """Clear all widgets from a layout"""
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-    
-    def update_stats(self, df: pd.DataFrame):
-        """Update statistics display with new data"""
-        # Clear existing widgets
-        self.clear_layout(self.cards_layout)
-        self.clear_layout(self.details_layout)
-        
-        if df is None or df.empty:
-            no_data_label = QLabel("No data to display")
-            no_data_label.setAlignment(Qt.AlignCenter)
-            no_data_label.setStyleSheet("color: #94a3b8; font-size: 14px; padding: 30px; background: transparent;")
-            self.cards_layout.addWidget(no_data_label, 0, 0)
-            return
-        
-        # Create stat cards
-        cards = [
-            ("Total Records", len(df), "📝", "#3b82f6"),
-            ("Columns", len(df.columns), "📋", "#10b981"),
-        ]
-        
-        # Check for Type column
-        if 'Type' in df.columns:
-            cards.append(("Equipment Types", df['Type'].nunique(), "⚙️", "#f59e0b"))
-        
-        # Add numeric columns count
-        numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-        cards.append(("Numeric Fields", len(numeric_cols), "🔢", "#8b5cf6"))
-        
-        # Create cards in grid (2 columns for better fit)
-        for i, (title, value, icon, color) in enumerate(cards):
-            card = StatCard(title, value, icon, color)
-            row = i // 2
-            col = i % 2
-            self.cards_layout.addWidget(card, row, col)
-        
-        # Detailed statistics section
-        if len(numeric_cols) > 0:
-            self.add_detailed_stats(df, numeric_cols)
-        
-        # Equipment type distribution
-        if 'Type' in df.columns:
-            self.add_type_distribution(df)
-    
-    def add_detailed_stats(self, df, numeric_cols):
-        """Add detailed statistics table"""
-        details_frame = QFrame()
-        details_frame.setStyleSheet("""
-            QFrame {
-                background: rgba(30, 41, 59, 0.7);
-                border-radius: 8px;
-            }
-        """)
-        details_layout = QVBoxLayout(details_frame)
+        self.show_empty()
+
+    def init_details(self):
+        """Build the detailed statistics grid once"""
+        self.details_frame = self._panel()
+        details_layout = QVBoxLayout(self.details_frame)
         details_layout.setContentsMargins(16, 12, 16, 12)
         details_layout.setSpacing(12)
-        
-        # Title
-        details_title = QLabel("📈 Detailed Statistics")
-        details_font = QFont()
-        details_font.setPointSize(14)
-        details_font.setBold(True)
-        details_title.setFont(details_font)
-        details_title.setStyleSheet("color: white; background: transparent;")
-        details_layout.addWidget(details_title)
-        
-        # Stats table
+        details_layout.addWidget(self._section_title("📈 Detailed Statistics"))
+
         stats_grid = QGridLayout()
         stats_grid.setSpacing(6)
         stats_grid.setContentsMargins(0, 0, 0, 0)
-        
-        # Limit columns to prevent overflow
-        display_cols = list(numeric_cols)[:5]
-        
-        # Headers
-        headers = ['Metric'] + [str(col)[:12] for col in display_cols]
-        for j, header in enumerate(headers):
-            label = QLabel(header)
-            label.setStyleSheet("""
-                font-weight: bold; 
-                color: #3b82f6;
-                padding: 6px 4px;
-                font-size: 11px;
-                background: transparent;
-            """)
-            label.setAlignment(Qt.AlignCenter if j > 0 else Qt.AlignLeft)
+
+        metric_header = QLabel("Metric")
+        metric_header.setObjectName("statHeader")
+        stats_grid.addWidget(metric_header, 0, 0)
+
+        self.column_headers = []
+        for j in range(1, MAX_DETAIL_COLUMNS + 1):
+            label = QLabel()
+            label.setObjectName("statHeader")
+            label.setAlignment(Qt.AlignCenter)
             stats_grid.addWidget(label, 0, j)
-        
-        # Stats rows
-        stat_configs = [
-            ('Mean', lambda col: df[col].mean(), "#10b981"),
-            ('Median', lambda col: df[col].median(), "#3b82f6"),
-            ('Std Dev', lambda col: df[col].std(), "#f59e0b"),
-            ('Min', lambda col: df[col].min(), "#ef4444"),
-            ('Max', lambda col: df[col].max(), "#8b5cf6"),
-        ]
-        
-        for i, (stat_name, stat_func, color) in enumerate(stat_configs, 1):
+            self.column_headers.append(label)
+
+        self.value_labels = []
+        for i, (stat_name, _, _) in enumerate(STAT_ROWS):
             name_label = QLabel(stat_name)
-            name_label.setStyleSheet(f"""
-                font-weight: 600; 
-                color: {color};
-                padding: 4px;
-                font-size: 11px;
-                background: transparent;
-            """)
-            stats_grid.addWidget(name_label, i, 0)
-            
-            for j, col in enumerate(display_cols, 1):
-                try:
-                    value = stat_func(col)
-                    if abs(value) >= 1000:
-                        text = f"{value:.1f}"
-                    else:
-                        text = f"{value:.2f}"
-                    value_label = QLabel(text)
-                    value_label.setStyleSheet("""
-                        padding: 4px;
-                        color: #e2e8f0;
-                        font-size: 11px;
-                        background: transparent;
-                    """)
-                    value_label.setAlignment(Qt.AlignCenter)
-                    stats_grid.addWidget(value_label, i, j)
-                except:
-                    value_label = QLabel("N/A")
-                    value_label.setStyleSheet("padding: 4px; color: #64748b; font-size: 11px; background: transparent;")
-                    value_label.setAlignment(Qt.AlignCenter)
-                    stats_grid.addWidget(value_label, i, j)
-        
+            name_label.setObjectName("statName")
+            name_label.setProperty("row", i)
+            stats_grid.addWidget(name_label, i + 1, 0)
+
+            row = []
+            for j in range(1, MAX_DETAIL_COLUMNS + 1):
+                value_label = QLabel()
+                value_label.setObjectName("statValue")
+                value_label.setAlignment(Qt.AlignCenter)
+                stats_grid.addWidget(value_label, i + 1, j)
+                row.append(value_label)
+            self.value_labels.append(row)
+
         details_layout.addLayout(stats_grid)
-        self.details_layout.addWidget(details_frame)
-    
-    def add_type_distribution(self, df):
-        """Add equipment type distribution"""
-        type_frame = QFrame()
-        type_frame.setStyleSheet("""
-            QFrame {
-                background: rgba(30, 41, 59, 0.7);
-                border-radius: 8px;
-            }
-        """)
-        type_layout = QVBoxLayout(type_frame)
+        self.main_layout.addWidget(self.details_frame)
+
+    def init_type_distribution(self):
+        """Build the virtualized equipment type list once"""
+        self.type_frame = self._panel()
+        type_layout = QVBoxLayout(self.type_frame)
         type_layout.setContentsMargins(16, 12, 16, 12)
         type_layout.setSpacing(10)
-        
-        # Title
-        type_title = QLabel("⚙️ Equipment Distribution")
-        type_font = QFont()
-        type_font.setPointSize(14)
-        type_font.setBold(True)
-        type_title.setFont(type_font)
-        type_title.setStyleSheet("color: white; background: transparent;")
-        type_layout.addWidget(type_title)
-        
-        # Distribution
-        type_counts = df['Type'].value_counts()
-        total = len(df)
-        colors = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
-        
-        for i, (eq_type, count) in enumerate(type_counts.items()):
-            percentage = (count / total) * 100
-            color = colors[i % len(colors)]
-            
-            row_widget = QWidget()
-            row_widget.setStyleSheet("background: transparent;")
-            row_layout = QHBoxLayout(row_widget)
-            row_layout.setContentsMargins(0, 2, 0, 2)
-            row_layout.setSpacing(10)
-            
-            # Type name
-            type_label = QLabel(f"● {eq_type}")
-            type_label.setStyleSheet(f"color: {color}; font-size: 12px; min-width: 120px; background: transparent;")
-            row_layout.addWidget(type_label)
-            
-            # Count
-            count_label = QLabel(str(count))
-            count_label.setStyleSheet("color: #e2e8f0; font-size: 12px; min-width: 40px; background: transparent;")
-            count_label.setAlignment(Qt.AlignCenter)
-            row_layout.addWidget(count_label)
-            
-            # Progress bar
-            bar_container = QWidget()
-            bar_container.setStyleSheet("background: transparent;")
-            bar_container.setMinimumWidth(150)
-            bar_layout = QHBoxLayout(bar_container)
-            bar_layout.setContentsMargins(0, 0, 0, 0)
-            bar_layout.setSpacing(6)
-            
-            bar = QFrame()
-            bar_width = int(min(percentage * 1.5, 150))
-            bar.setFixedSize(bar_width, 14)
-            bar.setStyleSheet(f"""
-                QFrame {{
-                    background: {color};
-                    border-radius: 4px;
-                }}
-            """)
-            bar_layout.addWidget(bar)
-            bar_layout.addStretch()
-            
-            row_layout.addWidget(bar_container)
-            
-            # Percentage
-            pct_label = QLabel(f"{percentage:.1f}%")
-            pct_label.setStyleSheet("color: #94a3b8; font-size: 11px; min-width: 50px; background: transparent;")
-            pct_label.setAlignment(Qt.AlignRight)
-            row_layout.addWidget(pct_label)
-            
-            row_layout.addStretch()
-            type_layout.addWidget(row_widget)
-        
-        self.details_layout.addWidget(type_frame)
+        type_layout.addWidget(self._section_title("⚙️ Equipment Distribution"))
+
+        self.type_model = TypeDistributionModel()
+        self.type_list = QListView()
+        self.type_list.setObjectName("typeList")
+        self.type_list.setModel(self.type_model)
+        self.type_list.setItemDelegate(TypeDistributionDelegate(self.type_list))
+        self.type_list.setUniformItemSizes(True)
+        self.type_list.setSelectionMode(QAbstractItemView.NoSelection)
+        self.type_list.setFocusPolicy(Qt.NoFocus)
+        self.type_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        type_layout.addWidget(self.type_list)
+
+        self.main_layout.addWidget(self.type_frame)
+
+    def show_empty(self):
+        """Show the placeholder instead of statistics"""
+        self.no_data_label.show()
+        self.cards_widget.hide()
+        self.details_frame.hide()
+        self.type_frame.hide()
+
+    def _place_cards(self, keys):
+        """Lay out the visible cards in a 2-column grid"""
+        for key, card in self.cards.items():
+            if key in keys:
+                i = keys.index(key)
+                self.cards_layout.addWidget(card, i // 2, i % 2)
+                card.show()
+            else:
+                self.cards_layout.removeWidget(card)
+                card.hide()
+
+    def update_stats(self, df: "pd.DataFrame"):
+        """Update statistics display with new local data"""
+        if df is None or df.empty:
+            self.show_empty()
+            return
+        self.update_summary(summarize_dataframe(df))
+
+    def update_summary(self, summary):
+        """Update statistics display from a server stats payload"""
+        if not summary or not summary.get('total_records'):
+            self.show_empty()
+            return
+
+        self.no_data_label.hide()
+        self.cards_widget.show()
+
+        summary_stats = summary.get('summary_stats') or {}
+        equipment_types = summary.get('equipment_types') or {}
+        has_type = 'Type' in (summary.get('columns') or []) or bool(equipment_types)
+
+        # Stat cards
+        self.cards['records'].set_value(summary['total_records'])
+        self.cards['columns'].set_value(len(summary.get('columns') or []))
+        self.cards['numeric'].set_value(len(summary_stats))
+        if has_type:
+            self.cards['types'].set_value(len(equipment_types))
+        self._place_cards(['records', 'columns', 'types', 'numeric'] if has_type
+                          else ['records', 'columns', 'numeric'])
+
+        # Detailed statistics section
+        if summary_stats:
+            self.update_detailed_stats(summary_stats)
+            self.details_frame.show()
+        else:
+            self.details_frame.hide()
+
+        # Equipment type distribution
+        if has_type:
+            self.update_type_distribution(equipment_types, summary['total_records'])
+            self.type_frame.show()
+        else:
+            self.type_frame.hide()
+
+    def update_detailed_stats(self, summary_stats):
+        """Fill the statistics grid in place"""
+        display_cols = list(summary_stats)[:MAX_DETAIL_COLUMNS]
+
+        for j, header in enumerate(self.column_headers):
+            visible = j < len(display_cols)
+            header.setVisible(visible)
+            if visible:
+                header.setText(str(display_cols[j])[:12])
+
+            for i, (_, func, _) in enumerate(STAT_ROWS):
+                label = self.value_labels[i][j]
+                label.setVisible(visible)
+                if not visible:
+                    continue
+                value = summary_stats[display_cols[j]].get(func)
+                missing = value is None or value != value  # None or NaN
+                if missing:
+                    text = "N/A"
+                elif abs(value) >= 1000:
+                    text = f"{value:.1f}"
+                else:
+                    text = f"{value:.2f}"
+                label.setText(text)
+                if label.property("missing") != missing:
+                    label.setProperty("missing", missing)
+                    label.style().unpolish(label)
+                    label.style().polish(label)
+
+    def update_type_distribution(self, equipment_types, total):
+        """Refresh the equipment type list model"""
+        counts = sorted(equipment_types.items(), key=lambda item: item[1], reverse=True)
+        rows = [(str(eq_type), int(count), (count / total) * 100 if total else 0.0)
+                for eq_type, count in counts]
+        self.type_model.set_rows(rows)
+
+        visible = min(len(rows), self.MAX_VISIBLE_TYPES)
+        self.type_list.setFixedHeight(visible * TypeDistributionDelegate.ROW_HEIGHT + 4)
@@ -1,13 +1,39 @@
 import sys
+import time
+
+_START_TIME = time.perf_counter()
+
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from gui.main_window import MainWindow
+from gui.animated_background import AnimatedBackground
+from startup_profiler import StartupProfiler
+
+
 def main():
+    # Optional startup timing report: python main.py --profile-startup
+    profiler = None
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        profiler = StartupProfiler(_START_TIME)
+        profiler.mark("imports")
+
+    # Background rendering: --static-background disables the animation,
+    # --background-stats shows an FPS/CPU readout for tuning
+    if '--static-background' in sys.argv:
+        sys.argv.remove('--static-background')
+        AnimatedBackground.default_mode = "static"
+    if '--background-stats' in sys.argv:
+        sys.argv.remove('--background-stats')
+        AnimatedBackground.show_stats = True
+
     # Enable high DPI scaling
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
     
     app = QApplication(sys.argv)
+    if profiler:
+        profiler.mark("QApplication")
     
     # Set global stylesheet matching your web app
     app.setStyleSheet("""
@@ -222,7 +248,13 @@ def main():
     app.setOrganizationName("ChemFlow Analytics")
     
     window = MainWindow()
+    if profiler:
+        profiler.mark("main window")
+        profiler.watch_first_paint(window.index_page)
+
     window.show()
+    if profiler:
+        profiler.mark("show")
     
     sys.exit(app.exec_())
 
@@ -0,0 +1,56 @@
+# desktop/startup_profiler.py
+
+import sys
+import time
+
+from PyQt5.QtCore import QObject, QEvent
+
+
+# Modules whose import cost dominates cold start; reported so it is easy to
+# see which of them were pulled in before the first frame was drawn
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "requests"]
+
+
+class StartupProfiler(QObject):
+    """
+    Records named checkpoints from process start to the first paint of the
+    landing page and prints a timing report (enabled with --profile-startup).
+    """
+
+    def __init__(self, start_time=None):
+        super().__init__()
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.marks = []
+        self._watched = None
+
+    def mark(self, label):
+        """Record a checkpoint relative to process start"""
+        self.marks.append((label, time.perf_counter() - self.start_time))
+
+    def watch_first_paint(self, widget):
+        """Report as soon as the given widget paints for the first time"""
+        self._watched = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self._watched and event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self._watched = None
+            self.mark("first paint")
+            self.report()
+        return False
+
+    def report(self, stream=None):
+        """Print the checkpoint table and which heavy modules are loaded"""
+        stream = stream or sys.stderr
+        print("\nStartup profile", file=stream)
+        print("-" * 44, file=stream)
+
+        previous = 0.0
+        for label, elapsed in self.marks:
+            print(f"{label:<24}{elapsed * 1000:9.1f} ms  (+{(elapsed - previous) * 1000:.1f})", file=stream)
+            previous = elapsed
+
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        print("-" * 44, file=stream)
+        print(f"Heavy modules loaded: {', '.join(loaded) if loaded else 'none'}", file=stream)
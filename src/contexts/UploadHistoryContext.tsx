@@ -7,6 +7,7 @@ type UploadRecord = {
   uploadedAt: string;
   rowCount: number;
   data: EquipmentData[];
+  datasetId?: number;
 };
 
 type UploadHistoryContextValue = {
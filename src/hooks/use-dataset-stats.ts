@@ -0,0 +1,52 @@
+import { useEffect, useMemo, useState } from "react";
+import { DatasetStatsPayload, EquipmentData, EquipmentStats } from "@/types/equipment";
+import { datasetAPI } from "@/services/api";
+import { calculateStats, statsFromPayload } from "@/utils/statsCalculator";
+
+/**
+ * Dashboard stats for a dataset: the backend payload when the dataset is
+ * synced, otherwise computed locally from the rows.
+ */
+export function useDatasetStats(datasetId: number | undefined, data: EquipmentData[] | undefined) {
+  const [payload, setPayload] = useState<DatasetStatsPayload | null>(null);
+  const [failed, setFailed] = useState(false);
+
+  useEffect(() => {
+    setPayload(null);
+    setFailed(false);
+    if (!datasetId) {
+      return;
+    }
+
+    let cancelled = false;
+    datasetAPI
+      .getSummary(datasetId)
+      .then((result: DatasetStatsPayload) => {
+        if (!cancelled) {
+          setPayload(result);
+        }
+      })
+      .catch((error) => {
+        console.warn("Falling back to local stats", error);
+        if (!cancelled) {
+          setFailed(true);
+        }
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [datasetId]);
+
+  const stats = useMemo<EquipmentStats | null>(() => {
+    if (payload) {
+      return statsFromPayload(payload);
+    }
+    // Skip the local pass while the server payload is on its way
+    if (!data || (datasetId && !failed)) {
+      return null;
+    }
+    return calculateStats(data);
+  }, [payload, data, datasetId, failed]);
+
+  return { stats, payload };
+}
@@ -1,5 +1,5 @@
 // src/pages/Dashboard.tsx
-import { useCallback, useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { EquipmentData } from "@/types/equipment";
 import DashboardLayout from "@/components/dashboard/DashboardLayout";
@@ -9,7 +9,7 @@ import { CSVUploader } from "@/components/CSVUploader";
 import { StatsCards } from "@/components/StatsCards";
 import { Charts } from "@/components/Charts";
 import { EquipmentTable } from "@/components/EquipmentTable";
-import { calculateStats } from "@/utils/statsCalculator";
+import { useDatasetStats } from "@/hooks/use-dataset-stats";
 import { useUploadHistory } from "@/contexts/UploadHistoryContext";
 import Iridescence from "@/components/Iridescence";
 import { datasetAPI, authAPI } from "@/services/api";
@@ -34,7 +34,7 @@ const Dashboard = () => {
     }
   }, [selectedRecord, history.length]);
 
-  const stats = useMemo(() => calculateStats(equipmentData), [equipmentData]);
+  const { stats } = useDatasetStats(selectedRecord?.datasetId, equipmentData);
 
   const handleDataLoaded = useCallback(
     async ({ data, fileName, file }: { data: EquipmentData[]; fileName: string; file?: File }) => {
@@ -162,8 +162,12 @@ const Dashboard = () => {
           </div>
           {equipmentData.length > 0 ? (
             <div className="space-y-6">
-              <StatsCards stats={stats} />
-              <Charts data={equipmentData} stats={stats} />
+              {stats && (
+                <>
+                  <StatsCards stats={stats} />
+                  <Charts data={equipmentData} stats={stats} />
+                </>
+              )}
               <EquipmentTable data={equipmentData} />
             </div>
           ) : (
@@ -1,4 +1,3 @@
-import { useMemo } from "react";
 import { FileText, PauseCircle, PlayCircle, Trash2 } from "lucide-react";
 import { format } from "date-fns";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
@@ -9,12 +8,12 @@ import { Charts } from "@/components/Charts";
 import Iridescence from "@/components/Iridescence";
 import { useUploadHistory } from "@/contexts/UploadHistoryContext";
 import { useToast } from "@/components/ui/use-toast";
-import { calculateStats } from "@/utils/statsCalculator";
+import { useDatasetStats } from "@/hooks/use-dataset-stats";
 
 const History = () => {
   const { history, selectedRecord, selectRecord, removeRecord, paused, togglePause, clearHistory } = useUploadHistory();
   const { toast } = useToast();
-  const stats = useMemo(() => (selectedRecord ? calculateStats(selectedRecord.data) : null), [selectedRecord]);
+  const { stats } = useDatasetStats(selectedRecord?.datasetId, selectedRecord?.data);
 
   return (
     <div className="relative min-h-screen overflow-hidden bg-slate-950 text-white">
@@ -19,3 +19,36 @@ export interface EquipmentStats {
   maxTemperature: number;
   typeDistribution: Record<string, number>;
 }
+
+export interface MetricSummary {
+  mean: number | null;
+  median: number | null;
+  std: number | null;
+  min: number | null;
+  max: number | null;
+  count: number;
+}
+
+export interface TypeMetricSummary {
+  mean: number | null;
+  min: number | null;
+  max: number | null;
+  count: number;
+}
+
+export interface Histogram {
+  counts: number[];
+  edges: number[];
+}
+
+// Stats payload computed by the backend on upload (GET /datasets/{id}/summary/)
+export interface DatasetStatsPayload {
+  stats_version: number;
+  dataset_id: number;
+  total_records: number;
+  columns: string[];
+  summary_stats: Record<string, MetricSummary>;
+  equipment_types: Record<string, number>;
+  type_stats: Record<string, Record<string, TypeMetricSummary>>;
+  histograms: Record<string, Histogram>;
+}
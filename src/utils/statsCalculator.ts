@@ -1,42 +1,82 @@
-import { EquipmentData, EquipmentStats } from "@/types/equipment";
+import { DatasetStatsPayload, EquipmentData, EquipmentStats } from "@/types/equipment";
 
+const emptyStats = (): EquipmentStats => ({
+  count: 0,
+  avgFlowrate: 0,
+  avgPressure: 0,
+  avgTemperature: 0,
+  minFlowrate: 0,
+  maxFlowrate: 0,
+  minPressure: 0,
+  maxPressure: 0,
+  minTemperature: 0,
+  maxTemperature: 0,
+  typeDistribution: {},
+});
+
+// Map the backend stats payload onto the shape the dashboard components use
+export const statsFromPayload = (payload: DatasetStatsPayload): EquipmentStats => {
+  const metric = (column: string, key: "mean" | "min" | "max") =>
+    payload.summary_stats[column]?.[key] ?? 0;
+
+  return {
+    count: payload.total_records,
+    avgFlowrate: metric("Flowrate", "mean"),
+    avgPressure: metric("Pressure", "mean"),
+    avgTemperature: metric("Temperature", "mean"),
+    minFlowrate: metric("Flowrate", "min"),
+    maxFlowrate: metric("Flowrate", "max"),
+    minPressure: metric("Pressure", "min"),
+    maxPressure: metric("Pressure", "max"),
+    minTemperature: metric("Temperature", "min"),
+    maxTemperature: metric("Temperature", "max"),
+    typeDistribution: payload.equipment_types,
+  };
+};
+
+// Local fallback for uploads that never reached the backend.
+// Single pass without spreading arrays into Math.min/Math.max, which
+// overflows the call stack on large files.
 export const calculateStats = (data: EquipmentData[]): EquipmentStats => {
   if (data.length === 0) {
-    return {
-      count: 0,
-      avgFlowrate: 0,
-      avgPressure: 0,
-      avgTemperature: 0,
-      minFlowrate: 0,
-      maxFlowrate: 0,
-      minPressure: 0,
-      maxPressure: 0,
-      minTemperature: 0,
-      maxTemperature: 0,
-      typeDistribution: {},
-    };
+    return emptyStats();
   }
 
-  const flowrates = data.map((d) => d.Flowrate);
-  const pressures = data.map((d) => d.Pressure);
-  const temperatures = data.map((d) => d.Temperature);
-
+  let sumFlowrate = 0;
+  let sumPressure = 0;
+  let sumTemperature = 0;
+  let minFlowrate = Infinity;
+  let maxFlowrate = -Infinity;
+  let minPressure = Infinity;
+  let maxPressure = -Infinity;
+  let minTemperature = Infinity;
+  let maxTemperature = -Infinity;
   const typeDistribution: Record<string, number> = {};
-  data.forEach((item) => {
+
+  for (const item of data) {
+    sumFlowrate += item.Flowrate;
+    sumPressure += item.Pressure;
+    sumTemperature += item.Temperature;
+    if (item.Flowrate < minFlowrate) minFlowrate = item.Flowrate;
+    if (item.Flowrate > maxFlowrate) maxFlowrate = item.Flowrate;
+    if (item.Pressure < minPressure) minPressure = item.Pressure;
+    if (item.Pressure > maxPressure) maxPressure = item.Pressure;
+    if (item.Temperature < minTemperature) minTemperature = item.Temperature;
+    if (item.Temperature > maxTemperature) maxTemperature = item.Temperature;
     typeDistribution[item.Type] = (typeDistribution[item.Type] || 0) + 1;
-  });
+  }
 
   return {
     count: data.length,
-    avgFlowrate: flowrates.reduce((a, b) => a + b, 0) / data.length,
-    avgPressure: pressures.reduce((a, b) => a + b, 0) / data.length,
-    avgTemperature: temperatures.reduce((a, b) => a + b, 0) / data.length,
-    minFlowrate: Math.min(...flowrates),
-    maxFlowrate: Math.max(...flowrates),
-    minPressure: Math.min(...pressures),
-    maxPressure: Math.max(...pressures),
-    minTemperature: Math.min(...temperatures),
-    maxTemperature: Math.max(...temperatures),
+    avgFlowrate: sumFlowrate / data.length,
+    avgPressure: sumPressure / data.length,
+    avgTemperature: sumTemperature / data.length,
+    minFlowrate,
+    maxFlowrate,
+    minPressure,
+    maxPressure,
+    minTemperature,
+    maxTemperature,
     typeDistribution,
   };
 };